@@ -0,0 +1,135 @@
+# calculation.py
+
+# Calculate button. Everything the window shows after a calculation is computed here, off the UI thread, into a
+# CalculationResult that holds plain arrays only, so it can be handed back to Tk in one piece.
+import copy
+import numpy as np
+import criteria
+import material_properties as mp
+
+# Stages reported through progress(stage, STAGES)
+STAGES = 3
+
+
+class CalculationResult:
+    def __init__(self, angles, on_axis_stresses, failure_indices, modes, off_axis_A_matrix, off_axis_B_matrix,
+                 off_axis_D_matrix, compliance_matrices, ply_index, layer_side, material, material_properties,
+                 strength_properties, on_axis_Q_matrix, on_axis_S_matrix, off_axis_Q_matrix, off_axis_S_matrix,
+                 off_axis_strain, on_axis_strain, on_axis_stress, profile, worst_z, criterion, strength_ratios,
+                 environment=None, revision=None):
+        # Failure of every ply at the worst of its sample points through the thickness: max-stress FI, the strength
+        # ratio under the chosen criterion and its failure mode
+        self.angles = angles
+        self.on_axis_stresses = on_axis_stresses
+        self.failure_indices = failure_indices
+        self.modes = modes
+        self.criterion = criterion
+        self.strength_ratios = strength_ratios
+        self.profile = profile  # laminate.ThroughThicknessProfile
+        self.worst_z = worst_z
+        self.environment = environment  # (ΔT, ΔM) the loads were applied in, None for none
+        self.revision = revision  # LaminateModel.revision of the layup it was calculated for
+
+        # Laminate stiffness and the blocks of its full inverse
+        self.off_axis_A_matrix = off_axis_A_matrix
+        self.off_axis_B_matrix = off_axis_B_matrix
+        self.off_axis_D_matrix = off_axis_D_matrix
+        self.off_axis_a_matrix, self.off_axis_b_matrix, self.off_axis_d_matrix = compliance_matrices
+
+        # The ply on display (0 = bottom ply) at its layer side
+        self.ply_index = ply_index
+        self.layer_side = layer_side
+        self.material = material
+        self.material_properties = material_properties
+        self.strength_properties = strength_properties
+        self.on_axis_Q_matrix = on_axis_Q_matrix
+        self.on_axis_S_matrix = on_axis_S_matrix
+        self.off_axis_Q_matrix = off_axis_Q_matrix
+        self.off_axis_S_matrix = off_axis_S_matrix
+        self.off_axis_strain = off_axis_strain
+        self.on_axis_strain = on_axis_strain
+        self.on_axis_stress = on_axis_stress
+
+    @property
+    def ply_count(self):
+        return len(self.angles)
+
+
+class Cancelled(Exception):
+    pass
+
+
+def calculate(model, loads, ply_index, layer_side, points=3, criterion="Max stress", progress=None, cancel=None,
+              environment=None):
+    """ Failure table, A/a/B/b/D/d and the properties of one ply of a laminate under loads (N₁, N₂, N₆, M₁, M₂, M₆)
+    in an environment (ΔT, ΔM), checking every ply at points sample points through its thickness against one of
+    criteria.CRITERIA.
+
+    progress(stage, STAGES) is called after every stage and Cancelled is raised between stages once
+    cancel.is_set() returns True. """
+    def advance(stage):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        if progress is not None:
+            progress(stage, STAGES)
+
+    advance(0)
+
+    profile, on_axis_stresses, failure_indices, modes, strength_ratios, worst_z = failure_table(
+        model, loads, points, criterion, environment)
+    advance(1)
+
+    off_axis_A_matrix, off_axis_B_matrix, off_axis_D_matrix = model.a_matrix(), model.b_matrix(), model.d_matrix()
+    compliance_matrices = model.compliance_matrices()
+    advance(2)
+
+    # The ply on display is read off the profile at its layer side
+    material = model.ply_materials()[ply_index]
+    z = model.ply_z(layer_side)[ply_index]
+    result = CalculationResult(
+        model.plies["angle"].copy(), on_axis_stresses, failure_indices, modes, off_axis_A_matrix,
+        off_axis_B_matrix, off_axis_D_matrix, compliance_matrices, ply_index, layer_side, material,
+        mp.get_material_properties(material), mp.get_strength_properties(material),
+        model.on_axis_q_matrices()[ply_index], model.on_axis_s_matrices()[ply_index],
+        model.off_axis_q_matrices()[ply_index], model.off_axis_s_matrices()[ply_index],
+        profile.at("off_axis_strain", ply_index, z), profile.at("on_axis_strain", ply_index, z),
+        profile.at("on_axis_stress", ply_index, z), profile, worst_z, criterion, strength_ratios, environment,
+        model.revision)
+    advance(3)
+
+    return result
+
+
+def failure_table(model, loads, points, criterion, environment=None):
+    """ Through-thickness profile and, at the worst sample point of every ply, its on-axis stresses, max-stress FI,
+    mode codes, strength ratio and z-coordinate """
+    # All plies are checked at all sample points in a single product with the model's influence matrices
+    profile = model.through_thickness(loads, points, environment)
+    stresses = profile.values("on_axis_stress")
+    ratios, modes = criteria.strength_ratio(stresses, model.strengths()[:, None, :], criterion)
+
+    # The worst point of a ply is the one with the lowest strength ratio
+    plies = np.arange(len(stresses))
+    worst_points = np.argmin(ratios, axis=1)
+    failure_indices, _, worst_z = profile.worst(worst_points)
+    strength_ratios = ratios[plies, worst_points]
+    modes = np.where(strength_ratios <= 1, modes[plies, worst_points], 0)
+    return profile, stresses[plies, worst_points], failure_indices, modes, strength_ratios, worst_z
+
+
+def reload(result, model, loads, environment=None):
+    """ The result of calculate for new loads or a new environment on the layup it was calculated for. Only what
+    depends on the loads is worked out again, from the influence matrices the model keeps between edits """
+    if result.revision != model.revision:
+        raise ValueError("The layup has changed since the calculation.")
+
+    result = copy.copy(result)
+    (result.profile, result.on_axis_stresses, result.failure_indices, result.modes, result.strength_ratios,
+     result.worst_z) = failure_table(model, loads, len(result.profile.fractions), result.criterion, environment)
+
+    z = model.ply_z(result.layer_side)[result.ply_index]
+    result.off_axis_strain = result.profile.at("off_axis_strain", result.ply_index, z)
+    result.on_axis_strain = result.profile.at("on_axis_strain", result.ply_index, z)
+    result.on_axis_stress = result.profile.at("on_axis_stress", result.ply_index, z)
+    result.environment = environment
+    return result
@@ -0,0 +1,132 @@
+# criteria.py
+
+# Ply failure criteria as NumPy kernels. Every criterion takes on-axis stresses (σₓ, σᵧ, σₛ) in MPa stacked on the
+# last axis, with any leading axes such as load cases x plies x points, and strengths (X_t, Y_t, X_c, Y_c, S_c)
+# that broadcast against them. It returns the strength ratio R, the factor on the stresses at which the ply fails
+# (the failure index is 1 / R), and the code of the governing failure mode into laminate.FAILURE_MODES.
+#
+# R is found in closed form: criteria that are homogeneous in the stresses give R = 1 / f(σ), the ones with linear
+# terms (Tsai-Wu, Hashin matrix compression) take the positive root of a R² + b R = 1. Tension and compression are
+# picked with np.where over whole arrays rather than per element, so a criterion runs at NumPy speed.
+import numpy as np
+
+# Tsai-Wu interaction term F₁₂ as a fraction of sqrt(F₁₁ F₂₂)
+TSAI_WU_INTERACTION = -0.5
+
+# Puck inclination parameters p⊥∥(+) and p⊥∥(-), as recommended for carbon/epoxy
+PUCK_INCLINATION = (0.35, 0.30)
+
+# Failure mode codes, see laminate.FAILURE_MODES
+LT, LC, TT, TC, S = 1, 2, 3, 4, 5
+
+
+def _split(stress, strengths):
+    return (stress[..., 0], stress[..., 1], stress[..., 2]) + tuple(strengths[..., i] for i in range(5))
+
+
+def _quadratic_ratio(a, b):
+    # Positive root of a R² + b R = 1, written so that a = 0 does not cancel
+    return 2 / (b + np.sqrt(b * b + 4 * a))
+
+
+def _dominant_mode(sigma_x, sigma_y, FI_x, FI_y, FI_s):
+    # Stress component with the highest max-stress index, tension or compression by its sign
+    return np.where(FI_x >= np.maximum(FI_y, FI_s), LT + (sigma_x <= 0),
+                    np.where(FI_y >= FI_s, TT + (sigma_y <= 0), S)).astype(np.int8)
+
+
+def _max_stress_indices(sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c):
+    return (np.maximum(sigma_x / X_t, -sigma_x / X_c), np.maximum(sigma_y / Y_t, -sigma_y / Y_c),
+            np.abs(sigma_s) / S_c)
+
+
+def max_stress(stress, strengths):
+    sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c = _split(stress, strengths)
+    FI_x, FI_y, FI_s = _max_stress_indices(sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c)
+    return 1 / np.maximum(np.maximum(FI_x, FI_y), FI_s), _dominant_mode(sigma_x, sigma_y, FI_x, FI_y, FI_s)
+
+
+def tsai_wu(stress, strengths):
+    sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c = _split(stress, strengths)
+
+    F_xx = 1 / (X_t * X_c)
+    F_yy = 1 / (Y_t * Y_c)
+    F_xy = TSAI_WU_INTERACTION * np.sqrt(F_xx * F_yy)
+    a = F_xx * sigma_x ** 2 + 2 * F_xy * sigma_x * sigma_y + F_yy * sigma_y ** 2 + (sigma_s / S_c) ** 2
+    b = (1 / X_t - 1 / X_c) * sigma_x + (1 / Y_t - 1 / Y_c) * sigma_y
+
+    FI = _max_stress_indices(sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c)
+    return _quadratic_ratio(a, b), _dominant_mode(sigma_x, sigma_y, *FI)
+
+
+def tsai_hill(stress, strengths):
+    sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c = _split(stress, strengths)
+
+    X = np.where(sigma_x >= 0, X_t, X_c)
+    Y = np.where(sigma_y >= 0, Y_t, Y_c)
+    f = (sigma_x / X) ** 2 - sigma_x * sigma_y / X ** 2 + (sigma_y / Y) ** 2 + (sigma_s / S_c) ** 2
+
+    FI = _max_stress_indices(sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c)
+    return 1 / np.sqrt(f), _dominant_mode(sigma_x, sigma_y, *FI)
+
+
+def hashin(stress, strengths):
+    """ Hashin (1980), plane stress, with the in-plane shear strength standing in for the transverse one """
+    sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c = _split(stress, strengths)
+    shear = (sigma_s / S_c) ** 2
+
+    fibre = 1 / np.where(sigma_x >= 0, np.sqrt((sigma_x / X_t) ** 2 + shear), -sigma_x / X_c)
+
+    matrix_tension = 1 / np.sqrt((sigma_y / Y_t) ** 2 + shear)
+    matrix_compression = _quadratic_ratio((sigma_y / (2 * S_c)) ** 2 + shear,
+                                          ((Y_c / (2 * S_c)) ** 2 - 1) * sigma_y / Y_c)
+    matrix = np.where(sigma_y >= 0, matrix_tension, matrix_compression)
+
+    modes = np.where(fibre <= matrix, LT + (sigma_x < 0), TT + (sigma_y < 0)).astype(np.int8)
+    return np.minimum(fibre, matrix), modes
+
+
+def puck(stress, strengths):
+    """ Puck, plane stress: fibre failure and inter-fibre failure modes A, B and C """
+    sigma_x, sigma_y, sigma_s, X_t, Y_t, X_c, Y_c, S_c = _split(stress, strengths)
+    p_tension, p_compression = PUCK_INCLINATION
+
+    # Fracture resistance of the action plane against transverse compression and the matching inclination
+    R_A = S_c / (2 * p_compression) * (np.sqrt(1 + 2 * p_compression * Y_c / S_c) - 1)
+    p_transverse = p_compression * R_A / S_c
+    tau_c = S_c * np.sqrt(1 + 2 * p_transverse)
+
+    fibre = np.maximum(sigma_x / X_t, -sigma_x / X_c)
+
+    mode_A = (np.sqrt((sigma_s / S_c) ** 2 + ((1 - p_tension * Y_t / S_c) * sigma_y / Y_t) ** 2)
+              + p_tension * sigma_y / S_c)
+    mode_B = (np.sqrt(sigma_s ** 2 + (p_compression * sigma_y) ** 2) + p_compression * sigma_y) / S_c
+    mode_C = ((sigma_s / (2 * (1 + p_transverse) * S_c)) ** 2 + (sigma_y / Y_c) ** 2) * Y_c / -sigma_y
+
+    # Mode B holds while the compression stays small against the shear on the action plane
+    tension = sigma_y >= 0
+    shear_dominated = -sigma_y * tau_c <= R_A * np.abs(sigma_s)
+    inter_fibre = np.where(tension, mode_A, np.where(shear_dominated, mode_B, mode_C))
+    inter_fibre_mode = np.where(tension, TT, np.where(shear_dominated, S, TC))
+
+    modes = np.where(fibre >= inter_fibre, LT + (sigma_x <= 0), inter_fibre_mode).astype(np.int8)
+    return 1 / np.maximum(fibre, inter_fibre), modes
+
+
+CRITERIA = {"Max stress": max_stress, "Tsai-Wu": tsai_wu, "Tsai-Hill": tsai_hill, "Hashin": hashin, "Puck": puck}
+
+
+def strength_ratio(stress, strengths, criterion="Max stress"):
+    """ Strength ratio R (...) and governing mode codes of on-axis stresses (..., 3) under one of the CRITERIA.
+    R is infinite where a ply is not loaded """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown failure criterion {criterion}")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return CRITERIA[criterion](np.asarray(stress, dtype=float), np.asarray(strengths, dtype=float))
+
+
+def failure_index(stress, strengths, criterion="Max stress"):
+    """ Failure index 1 / R and mode codes, which are only set where FI >= 1 like laminate.max_stress_failure """
+    ratio, modes = strength_ratio(stress, strengths, criterion)
+    return 1 / ratio, np.where(ratio <= 1, modes, 0).astype(np.int8)
@@ -0,0 +1,87 @@
+# envelope.py
+
+# First-ply-failure envelopes. Stresses are linear in the applied load, so the load factor to first-ply failure
+# along any load direction is the lowest strength ratio over the plies (see criteria) for a unit load in that
+# direction. All directions of a resultant plane are evaluated at once through LaminateModel.load_case_stresses.
+import csv
+import numpy as np
+import criteria
+import laminate
+
+# Resultant planes, given as the indices of the two axes in (N₁, N₂, N₆, M₁, M₂, M₆)
+PLANES = {"N1-N2": (0, 1), "N1-N6": (0, 2), "M1-M2": (3, 4)}
+
+# Axis labels for each load component
+LOAD_LABELS = ("N₁ (N/m)", "N₂ (N/m)", "N₆ (N/m)", "M₁ (N)", "M₂ (N)", "M₆ (N)")
+
+# Directions evaluated between checks for cancellation
+CHUNK_SIZE = 1000
+
+
+class FailureEnvelope:
+    def __init__(self, plane, angles, load_factors, plies, modes):
+        self.plane = plane
+        self.angles = angles  # Direction of each ray in the plane (rad)
+        self.load_factors = load_factors  # Distance to first-ply failure along each ray
+        self.plies = plies  # Governing ply number (1 = bottom ply)
+        self.modes = modes  # Governing failure mode codes into laminate.FAILURE_MODES
+
+    @property
+    def axis_labels(self):
+        return tuple(LOAD_LABELS[axis] for axis in PLANES[self.plane])
+
+    def points(self, closed=True):
+        """ Envelope polygon as (n x 2) resultants, repeating the first point when closed """
+        points = self.load_factors[:, None] * np.column_stack([np.cos(self.angles), np.sin(self.angles)])
+        if closed:
+            points = np.vstack([points, points[:1]])
+        return points
+
+    def mode_labels(self):
+        return [laminate.FAILURE_MODES[mode] for mode in self.modes]
+
+    def to_csv(self, path):
+        points = self.points(closed=True)
+        plies = np.append(self.plies, self.plies[:1])
+        modes = self.mode_labels()
+        modes.append(modes[0])
+
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(self.axis_labels + ("Ply", "MOF"))
+            for (x, y), ply, mode in zip(points, plies, modes):
+                writer.writerow(["{:.6e}".format(x), "{:.6e}".format(y), ply, mode])
+
+
+def failure_envelope(model, plane="N1-N2", directions=3600, side=None, criterion="Max stress", cancel=None):
+    """ First-ply-failure envelope of a laminate in one of the resultant PLANES under one of criteria.CRITERIA, at
+    one of laminate.LAYER_SIDES of every ply or by default at the worst of its two faces. Returns None once
+    cancel.is_set() returns True. """
+    if plane not in PLANES:
+        raise ValueError(f"Unknown resultant plane {plane}")
+
+    angles = np.linspace(0, 2 * np.pi, directions, endpoint=False)
+    unit_loads = np.zeros((directions, 6))
+    unit_loads[:, PLANES[plane][0]] = np.cos(angles)
+    unit_loads[:, PLANES[plane][1]] = np.sin(angles)
+
+    # Stress is linear through a ply, so its worst point is on one of its faces
+    sides = ("Outer", "Inner") if side is None else (side,)
+
+    ratios, modes = [], []
+    for start in range(0, directions, CHUNK_SIZE):
+        if cancel is not None and cancel.is_set():
+            return None
+        stress = np.stack([model.load_case_stresses(unit_loads[start:start + CHUNK_SIZE], face) for face in sides])
+        face_ratios, face_modes = criteria.strength_ratio(stress, model.strengths(), criterion)
+        face = np.argmin(face_ratios, axis=0)[None]
+        ratios.append(np.take_along_axis(face_ratios, face, axis=0)[0])
+        modes.append(np.take_along_axis(face_modes, face, axis=0)[0])
+    ratios, modes = np.concatenate(ratios), np.concatenate(modes)
+
+    # Governing ply of every direction; directions that do not load any ply never fail
+    plies = np.argmin(ratios, axis=1)
+    load_factors = ratios[np.arange(directions), plies]
+    modes = modes[np.arange(directions), plies]
+
+    return FailureEnvelope(plane, angles, load_factors, plies + 1, modes)
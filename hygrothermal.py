@@ -0,0 +1,76 @@
+# hygrothermal.py
+
+# Temperature and moisture sweeps. The stresses from an environment (ΔT, ΔM) are linear in ΔT and ΔM, so a whole
+# cure cool-down or service temperature range is a stack of environments that goes through
+# LaminateModel.load_case_stresses in one call, superposed on a single set of mechanical loads.
+import csv
+import numpy as np
+import criteria
+import laminate
+
+# Environments evaluated between checks for cancellation
+CHUNK_SIZE = 1000
+
+
+class HygrothermalSweep:
+    def __init__(self, environments, strength_ratios, modes):
+        self.environments = environments  # (ΔT, ΔM) of every point (n x 2)
+        self.strength_ratios = strength_ratios  # Strength ratio of every ply at every point (n x n_plies)
+        self.modes = modes  # Governing failure mode codes into laminate.FAILURE_MODES (n x n_plies)
+
+    @property
+    def delta_t(self):
+        return self.environments[:, 0]
+
+    @property
+    def delta_m(self):
+        return self.environments[:, 1]
+
+    @property
+    def governing_plies(self):
+        """ Index of the ply with the lowest strength ratio at every point (0 = bottom ply) """
+        return np.argmin(self.strength_ratios, axis=1)
+
+    @property
+    def minimum_ratios(self):
+        """ Lowest strength ratio over the plies at every point """
+        return self.strength_ratios[np.arange(len(self.environments)), self.governing_plies]
+
+    @property
+    def governing_modes(self):
+        return self.modes[np.arange(len(self.environments)), self.governing_plies]
+
+    def to_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["ΔT (K)", "ΔM", "Min SR", "Ply", "MOF"])
+            for (delta_t, delta_m), ratio, ply, mode in zip(self.environments, self.minimum_ratios,
+                                                            self.governing_plies, self.governing_modes):
+                writer.writerow(["{:g}".format(delta_t), "{:g}".format(delta_m), "{:.6e}".format(ratio), ply + 1,
+                                 laminate.FAILURE_MODES[mode]])
+
+
+def environments(delta_t, delta_m=0.0):
+    """ (n x 2) array of environments (ΔT, ΔM) from temperature and moisture changes that broadcast together """
+    delta_t, delta_m = np.broadcast_arrays(np.atleast_1d(np.asarray(delta_t, dtype=float)),
+                                           np.atleast_1d(np.asarray(delta_m, dtype=float)))
+    return np.column_stack([delta_t.ravel(), delta_m.ravel()])
+
+
+def hygrothermal_sweep(model, loads, delta_t, delta_m=0.0, side="Middle", criterion="Max stress", cancel=None):
+    """ Strength ratio of every ply under fixed loads (N₁, N₂, N₆, M₁, M₂, M₆) at every point of a temperature and
+    moisture sweep, under one of criteria.CRITERIA. Returns None once cancel.is_set() returns True. """
+    if model.layer_count == 0:
+        raise ValueError("There is nothing to calculate.")
+
+    points = environments(delta_t, delta_m)
+    ratios, modes = [], []
+    for start in range(0, len(points), CHUNK_SIZE):
+        if cancel is not None and cancel.is_set():
+            return None
+        stress = model.load_case_stresses(loads, side, points[start:start + CHUNK_SIZE])
+        chunk_ratios, chunk_modes = criteria.strength_ratio(stress, model.strengths(), criterion)
+        ratios.append(chunk_ratios)
+        modes.append(chunk_modes)
+    ratios, modes = np.concatenate(ratios), np.concatenate(modes)
+    return HygrothermalSweep(points, ratios, modes)
@@ -0,0 +1,874 @@
+# laminate.py
+
+# Headless laminate engine. Everything in here works on NumPy arrays so that it can be used from scripts and
+# worker processes without creating a Tk root; CompositeMaterialsApp in main.py is only a view over it.
+#
+# Units follow the GUI: moduli in GPa, thicknesses and z-coordinates in mm, strengths and stresses in MPa,
+# force resultants in N/m and moment resultants in N. An environment is a temperature change ΔT in K and a change in
+# moisture content ΔM by weight (0.01 = 1 %), given as (ΔT, ΔM).
+import numpy as np
+import material_properties as mp
+
+# One record per ply. Ply 0 is the bottom ply (ply number 1 in the GUI), the last record is the top ply.
+PLY_DTYPE = np.dtype([("material", np.int32),
+                      ("thickness", np.float64),
+                      ("angle", np.float64),
+                      ("z_bottom", np.float64),
+                      ("z_top", np.float64)])
+
+# Failure mode labels, indexed by the integer mode codes returned by max_stress_failure and criteria
+FAILURE_MODES = ("", "LT", "LC", "TT", "TC", "S")
+
+# Positions inside a ply at which strains and stresses can be evaluated
+LAYER_SIDES = ("Outer", "Middle", "Inner")
+
+# The full ABD matrix is kept in GPa and mm, which keeps A, B and D of similar size. Loads (N₁, N₂, N₆, M₁, M₂, M₆)
+# in N/m and N are scaled into those units, and the curvatures solved for (1/mm) back to 1/m.
+LOAD_SCALE = np.array([1e-6, 1e-6, 1e-6, 1e-3, 1e-3, 1e-3])
+RESPONSE_SCALE = np.array([1, 1, 1, 1e3, 1e3, 1e3])
+
+
+def on_axis_q(material):
+    """ On-axis stiffness matrix Q (GPa) of a material """
+    material_properties = mp.get_material_properties(material)
+    if not material_properties:
+        raise ValueError(f"{material} not found in the material library")
+
+    # Check if the required keys are present in the dictionary
+    for key in ("E_x", "E_y", "E_s", "ν"):
+        if key not in material_properties:
+            raise ValueError(f"{key} not found in material properties for {material}")
+
+    return stiffness_matrix(*(material_properties[key] for key in ("E_x", "E_y", "E_s", "ν")))
+
+
+def stiffness_matrix(E_x, E_y, E_s, nu):
+    """ On-axis stiffness matrices Q (... x 3 x 3) in GPa from engineering constants that broadcast together """
+    E_x, E_y, E_s, nu = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (E_x, E_y, E_s, nu)))
+
+    # A broken layer (E_x = 0) carries no load
+    broken = E_x == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nu_y = np.where(broken, 0, (E_y / E_x) * nu)
+    m = (1 - nu * nu_y) ** -1
+    zero = np.zeros_like(E_x)
+
+    q = np.stack([np.stack([m*E_x, m*nu_y*E_x, zero], axis=-1),
+                  np.stack([m*nu_y*E_x, m*E_y, zero], axis=-1),
+                  np.stack([zero, zero, E_s], axis=-1)], axis=-2)
+    return np.where(broken[..., None, None], 0, q)
+
+
+def engineering_constants(s):
+    """ E_x, E_y, E_s (GPa) and ν stacked on the last axis (... x 4) from on-axis compliance matrices S, the
+    inverse of stiffness_matrix; zero for a broken layer """
+    broken = s[..., 0, 0] == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        constants = np.stack([1 / s[..., 0, 0], 1 / s[..., 1, 1], 1 / s[..., 2, 2], -s[..., 0, 1] / s[..., 0, 0]],
+                             axis=-1)
+    return np.where(broken[..., None], 0, constants)
+
+
+def strength_vector(material):
+    """ Strengths (X_t, Y_t, X_c, Y_c, S_c) of a material in MPa """
+    strength_properties = mp.get_strength_properties(material)
+
+    for key in ("X_t", "Y_t", "X_c", "Y_c", "S_c"):
+        if key not in strength_properties:
+            raise ValueError(f"{key} not found in strength properties for {material}")
+
+    return np.array([strength_properties[key] for key in ("X_t", "Y_t", "X_c", "Y_c", "S_c")], dtype=float)
+
+
+def expansion_vector(material):
+    """ Expansion coefficients (α_x, α_y, β_x, β_y) of a material, zero where the library has none """
+    expansion_properties = mp.get_expansion_properties(material)
+    return np.array([expansion_properties.get(key, 0.0) for key in mp.EXPANSION_KEYS], dtype=float)
+
+
+def invariants(q):
+    """ Stiffness invariants U_1..U_5 of one or more on-axis Q matrices, stacked on the last axis """
+    Q_xx = q[..., 0, 0]
+    Q_xy = q[..., 0, 1]
+    Q_yy = q[..., 1, 1]
+    Q_ss = q[..., 2, 2]
+
+    U_1 = (1/8) * (3 * Q_xx + 3 * Q_yy + 2 * Q_xy + 4 * Q_ss)
+    U_2 = (1/2) * (Q_xx - Q_yy)
+    U_3 = (1/8) * (Q_xx + Q_yy - 2 * Q_xy - 4 * Q_ss)
+    U_4 = (1/8) * (Q_xx + Q_yy + 6 * Q_xy - 4 * Q_ss)
+    U_5 = (1/8) * (Q_xx + Q_yy - 2 * Q_xy + 4 * Q_ss)
+
+    return np.stack([U_1, U_2, U_3, U_4, U_5], axis=-1)
+
+
+def lamination_matrix(u, weight, v_1, v_2, v_3, v_4):
+    """ Assemble sum(Q̄ * weight) from invariants and the lamination sums V_1..V_4 """
+    U_1, U_2, U_3, U_4, U_5 = (u[..., i] for i in range(5))
+
+    m_11 = U_1 * weight + U_2 * v_1 + U_3 * v_2
+    m_22 = U_1 * weight - U_2 * v_1 + U_3 * v_2
+    m_12 = U_4 * weight - U_3 * v_2
+    m_66 = U_5 * weight - U_3 * v_2
+    m_16 = (1/2) * U_2 * v_3 + U_3 * v_4
+    m_26 = (1/2) * U_2 * v_3 - U_3 * v_4
+
+    return np.stack([np.stack([m_11, m_12, m_16], axis=-1),
+                     np.stack([m_12, m_22, m_26], axis=-1),
+                     np.stack([m_16, m_26, m_66], axis=-1)], axis=-2)
+
+
+def off_axis_q(u, angle):
+    """ Off-axis stiffness Q̄ (GPa) for invariants u (..., 5) and ply angles in degrees """
+    theta = np.radians(angle)
+    return lamination_matrix(u, 1, np.cos(2 * theta), np.cos(4 * theta), np.sin(2 * theta), np.sin(4 * theta))
+
+
+def off_axis_q_derivative(u, angle):
+    """ Derivative of the off-axis stiffness Q̄ with respect to the ply angle, in GPa per degree """
+    theta = np.radians(angle)
+    return lamination_matrix(u, 0, -2 * np.sin(2 * theta), -4 * np.sin(4 * theta), 2 * np.cos(2 * theta),
+                             4 * np.cos(4 * theta)) * (np.pi / 180)
+
+
+def free_strains(expansion, angle):
+    """ Off-axis free expansion strains (ε₁, ε₂, ε₆) of plies with expansion coefficients (..., 4) at angles in
+    degrees, as matrices (..., 3, 2) taking an environment (ΔT, ΔM) to strain """
+    along, across = expansion[..., [0, 2]], expansion[..., [1, 3]]
+    p = (along + across) / 2
+    q = (along - across) / 2
+
+    theta = np.radians(angle)[..., None]
+    cos_2 = np.cos(2 * theta)
+    sin_2 = np.sin(2 * theta)
+
+    return np.stack([p + q * cos_2, p - q * cos_2, 2 * q * sin_2], axis=-2)
+
+
+def hygrothermal_resultants(off_axis_q_matrices, free_strain, thickness, z_bottom, z_top):
+    """ Resultants (N₁, N₂, N₆, M₁, M₂, M₆) in N/m and N equivalent to an environment, as matrices (... x 6 x 2)
+    taking (ΔT, ΔM) to loads, from the off-axis Q̄ (... x n x 3 x 3), the free strains (... x n x 3 x 2) and the
+    ply faces (... x n) of a batch of laminates """
+    stress = off_axis_q_matrices @ free_strain
+    n = np.einsum("...n,...nij->...ij", thickness, stress)
+    m = np.einsum("...n,...nij->...ij", (z_top ** 2 - z_bottom ** 2) / 2, stress)
+    return np.concatenate([n, m], axis=-2) / LOAD_SCALE[:, None]
+
+
+def invert(matrices):
+    """ Invert a stack of 3x3 matrices, leaving the all-zero ones (broken layers) as zeros """
+    matrices = np.asarray(matrices, dtype=float)
+    inverse = np.zeros_like(matrices)
+    loaded = matrices[..., 0, 0] != 0
+    inverse[loaded] = np.linalg.inv(matrices[loaded])
+    return inverse
+
+
+def abd_matrix(off_axis_q_matrices, thickness, z_bottom, z_top):
+    """ Full laminate stiffness [[A, B], [B, D]] (... x 6 x 6) in GPa and mm, i.e. A in GPa·mm, B in GPa·mm² and D
+    in GPa·mm³, from the off-axis Q̄ (... x n x 3 x 3) and the ply faces (... x n) of a batch of laminates """
+    weights = np.stack([thickness, (z_top ** 2 - z_bottom ** 2) / 2, (z_top ** 3 - z_bottom ** 3) / 3], axis=-1)
+    a, b, d = np.moveaxis(np.einsum("...nk,...nij->...kij", weights, off_axis_q_matrices), -3, 0)
+    return np.concatenate([np.concatenate([a, b], axis=-1), np.concatenate([b, d], axis=-1)], axis=-2)
+
+
+def is_symmetric(abd, tolerance=1e-10):
+    """ Whether the coupling B of laminates abd (... x 6 x 6) vanishes up to rounding, as for symmetric layups """
+    scale = np.sqrt(np.abs(abd[..., :3, :3]).max(axis=(-2, -1)) * np.abs(abd[..., 3:, 3:]).max(axis=(-2, -1)))
+    return np.abs(abd[..., :3, 3:]).max(axis=(-2, -1)) <= tolerance * scale
+
+
+def _solve(matrices, rhs):
+    # Batched LU solve; all-zero matrices (broken layers only) give zero, like invert
+    loaded = matrices[..., 0, 0] != 0
+    matrices = np.where(loaded[..., None, None], matrices, np.eye(matrices.shape[-1]))
+    return np.linalg.solve(matrices, rhs) * loaded[..., None, None]
+
+
+def solve_abd(abd, rhs):
+    """ Solve abd (... x 6 x 6) x = rhs (... x 6 x k), factorizing every laminate once for its k right-hand sides.
+    Without coupling anywhere in the batch the in-plane and bending 3 x 3 blocks are solved on their own """
+    rhs = np.asarray(rhs, dtype=float)
+    if np.all(is_symmetric(abd)):
+        return np.concatenate([_solve(abd[..., :3, :3], rhs[..., :3, :]),
+                               _solve(abd[..., 3:, 3:], rhs[..., 3:, :])], axis=-2)
+    return _solve(abd, rhs)
+
+
+def midplane_response(abd, loads):
+    """ Midplane strains and curvatures (ε₁, ε₂, ε₆, k₁, k₂, k₆), k in 1/m, of laminates abd (... x 6 x 6) under
+    loads (... x k x 6) of (N₁, N₂, N₆, M₁, M₂, M₆), k load sets per laminate """
+    rhs = np.swapaxes(np.asarray(loads, dtype=float) * LOAD_SCALE, -1, -2)
+    return np.swapaxes(solve_abd(abd, rhs), -1, -2) * RESPONSE_SCALE
+
+
+def response_matrix(abd):
+    """ Compliance (... x 6 x 6) taking loads (N₁, N₂, N₆, M₁, M₂, M₆) in N/m and N to midplane strains and
+    curvatures in 1/m, i.e. the inverse of the ABD matrix in those units """
+    return solve_abd(abd, np.broadcast_to(np.diag(LOAD_SCALE), np.shape(abd))) * RESPONSE_SCALE[:, None]
+
+
+def to_on_axis_strain(off_axis_strain, angle):
+    """ Rotate off-axis engineering strains (ε₁, ε₂, ε₆) into the ply axes (εₓ, εᵧ, εₛ) """
+    epsilon_1 = off_axis_strain[..., 0]
+    epsilon_2 = off_axis_strain[..., 1]
+    epsilon_6 = off_axis_strain[..., 2]
+
+    p = (1 / 2) * (epsilon_1 + epsilon_2)
+    q = (1 / 2) * (epsilon_1 - epsilon_2)
+    r = (1 / 2) * epsilon_6
+
+    theta = np.radians(angle)
+    cos_2 = np.cos(2 * theta)
+    sin_2 = np.sin(2 * theta)
+
+    return np.stack([p + q * cos_2 + r * sin_2,
+                     p - q * cos_2 - r * sin_2,
+                     - 2 * q * sin_2 + 2 * r * cos_2], axis=-1)
+
+
+def strain_rotation(angle):
+    """ Matrices (..., 3, 3) rotating off-axis strains (ε₁, ε₂, ε₆) into the ply axes, see to_on_axis_strain """
+    theta = np.radians(angle)
+    cos_2 = np.cos(2 * theta)
+    sin_2 = np.sin(2 * theta)
+
+    return np.stack([np.stack([(1 + cos_2) / 2, (1 - cos_2) / 2, sin_2 / 2], axis=-1),
+                     np.stack([(1 - cos_2) / 2, (1 + cos_2) / 2, -sin_2 / 2], axis=-1),
+                     np.stack([-sin_2, sin_2, cos_2], axis=-1)], axis=-2)
+
+
+def strain_rotation_derivative(angle):
+    """ Derivative of strain_rotation with respect to the ply angle, per degree """
+    theta = np.radians(angle)
+    d_cos_2 = -2 * np.sin(2 * theta) * (np.pi / 180)
+    d_sin_2 = 2 * np.cos(2 * theta) * (np.pi / 180)
+
+    return np.stack([np.stack([d_cos_2 / 2, -d_cos_2 / 2, d_sin_2 / 2], axis=-1),
+                     np.stack([-d_cos_2 / 2, d_cos_2 / 2, -d_sin_2 / 2], axis=-1),
+                     np.stack([-d_sin_2, d_sin_2, d_cos_2], axis=-1)], axis=-2)
+
+
+def max_stress_failure(stress, strengths):
+    """ Maximum-stress failure indices (FI x, FI y, FI s) and mode codes into FAILURE_MODES """
+    sigma_x = stress[..., 0]
+    sigma_y = stress[..., 1]
+    sigma_s = stress[..., 2]
+
+    X_t, Y_t, X_c, Y_c, S_c = (strengths[..., i] for i in range(5))
+
+    # Tension and compression in one expression: only one of the two terms is positive
+    FI_x = np.maximum(sigma_x / X_t, -sigma_x / X_c)
+    FI_y = np.maximum(sigma_y / Y_t, -sigma_y / Y_c)
+    FI_s = np.abs(sigma_s) / S_c
+
+    # Longitudinal failure takes precedence over transverse, transverse over shear
+    x_failed = FI_x >= 1
+    y_failed = (FI_y >= 1) & ~x_failed
+    s_failed = (FI_s >= 1) & ~(x_failed | y_failed)
+    modes = (x_failed * (1 + (sigma_x <= 0)) + y_failed * (3 + (sigma_y <= 0)) + s_failed * 5).astype(np.int8)
+
+    return np.stack([FI_x, FI_y, FI_s], axis=-1), modes
+
+
+def profile_fractions(points):
+    """ Sample points through a ply as fractions of its thickness from the bottom """
+    points = int(points)
+    if points < 1:
+        raise ValueError("At least one point per ply is needed.")
+    return np.linspace(0, 1, points) if points > 1 else np.array([0.5])
+
+
+class ThroughThicknessProfile:
+    # Strains and stresses are linear in z within a ply, so only their values at the bottom and top of every ply
+    # are kept, as name -> (n_plies x 3) arrays, and the sample points are interpolated when asked for
+    def __init__(self, z_bottom, z_top, fractions, bottom, top):
+        self.z_bottom = z_bottom  # Ply boundaries (mm)
+        self.z_top = z_top
+        self.z = z_bottom[:, None] + (z_top - z_bottom)[:, None] * fractions  # Sample points (n_plies x n_points)
+        self.fractions = fractions  # Sample points as fractions of the ply thickness
+        self.bottom = bottom
+        self.top = top
+        self.failure_indices = None  # Max-stress FI (FI x, FI y, FI s) at every point (n_plies x n_points x 3)
+        self.modes = None  # Mode codes into FAILURE_MODES (n_plies x n_points)
+
+    def values(self, name):
+        """ off_axis_strain (ε₁, ε₂, ε₆), on_axis_strain (εₓ, εᵧ, εₛ), off_axis_stress (σ₁, σ₂, σ₆) or
+        on_axis_stress (σₓ, σᵧ, σₛ) in MPa at every sample point (n_plies x n_points x 3) """
+        bottom = self.bottom[name][:, None, :]
+        return bottom + self.fractions[:, None] * (self.top[name][:, None, :] - bottom)
+
+    def at(self, name, ply_index, z):
+        """ Values of name (3) in a ply at a z-coordinate (mm) within it """
+        fraction = (z - self.z_bottom[ply_index]) / (self.z_top[ply_index] - self.z_bottom[ply_index])
+        bottom = self.bottom[name][ply_index]
+        return bottom + fraction * (self.top[name][ply_index] - bottom)
+
+    @property
+    def worst_points(self):
+        """ Index of the sample point with the highest FI in every ply """
+        return np.argmax(self.failure_indices.max(axis=-1), axis=-1)
+
+    def worst(self, points=None):
+        """ FI (n_plies x 3), mode codes and z-coordinates of every ply at one sample point per ply, by default the
+        one with the highest FI """
+        plies = np.arange(len(self.z))
+        if points is None:
+            points = self.worst_points
+        return self.failure_indices[plies, points], self.modes[plies, points], self.z[plies, points]
+
+
+class MaterialInvariants:
+    def __init__(self, material):
+        self.q = on_axis_q(material)  # On-axis stiffness (GPa)
+        self.s = invert(self.q)  # On-axis compliance (GPa⁻¹)
+        self.u = invariants(self.q)  # U_1..U_5 (GPa)
+        self.strengths = strength_vector(material)  # X_t, Y_t, X_c, Y_c, S_c (MPa)
+        self.expansion = expansion_vector(material)  # α_x, α_y (1/K), β_x, β_y
+
+
+class MaterialCache:
+    """ Per-material Q, S, U_1..U_5 and strengths, built once per material """
+    def __init__(self):
+        self._entries = {}
+        self._library_version = mp.library.version
+
+        # Bumped on every invalidation so that models can tell their stacked arrays are stale
+        self.version = 0
+
+    def refresh(self):
+        # Drop everything once the material library has changed
+        if self._library_version != mp.library.version:
+            self._library_version = mp.library.version
+            self.invalidate()
+
+    def get(self, material):
+        self.refresh()
+        if material not in self._entries:
+            self._entries[material] = MaterialInvariants(material)
+        return self._entries[material]
+
+    def stack(self, materials):
+        """ Q (m x 3 x 3), S (m x 3 x 3), U (m x 5), strengths (m x 5) and expansion coefficients (m x 4) of a list
+        of materials """
+        entries = [self.get(material) for material in materials]
+        return (np.array([entry.q for entry in entries]).reshape(-1, 3, 3),
+                np.array([entry.s for entry in entries]).reshape(-1, 3, 3),
+                np.array([entry.u for entry in entries]).reshape(-1, 5),
+                np.array([entry.strengths for entry in entries]).reshape(-1, 5),
+                np.array([entry.expansion for entry in entries]).reshape(-1, 4))
+
+    def invalidate(self, material=None):
+        # Called automatically when the material library changes, or by hand after editing it elsewhere
+        if material is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(material, None)
+        self.version += 1
+
+
+# Shared by every model in the process
+material_cache = MaterialCache()
+
+
+def ply_position(z_bottom, z_top, side="Middle"):
+    """ z-coordinate (mm) of the evaluation point between ply faces z_bottom and z_top """
+    if side == "Middle":
+        return (z_bottom + z_top) / 2
+
+    # Outer is the ply face further away from the midplane, inner the one closer to it
+    lower = z_bottom + z_top <= 0
+    if side == "Outer":
+        return np.where(lower, z_bottom, z_top)
+    if side == "Inner":
+        return np.where(lower, z_top, z_bottom)
+
+    raise ValueError(f"Unknown layer side {side}")
+
+
+def evaluate_laminates(q, strengths, thickness, angle, core_thickness, loads, side="Middle", expansion=None,
+                       environment=None):
+    """ On-axis stresses (... x n x 3), max-stress failure indices and mode codes of a batch of laminates.
+
+    Every laminate has n plies listed bottom-up, the arrays broadcast against each other: on-axis stiffness
+    q (... x n x 3 x 3) in GPa, strengths (... x n x 5) in MPa, thickness and angle (... x n) in mm and deg,
+    core_thickness (...) in mm and loads (... x 6) as (N₁, N₂, N₆, M₁, M₂, M₆). An environment (... x 2) as
+    (ΔT, ΔM) takes the expansion coefficients (... x n x 4) of the plies, see expansion_vector. """
+    thickness = np.asarray(thickness, dtype=float)
+    angle = np.asarray(angle, dtype=float)
+    core_thickness = np.asarray(core_thickness, dtype=float)
+    loads = np.asarray(loads, dtype=float)
+    count = thickness.shape[-1]
+
+    # Ply faces about the midplane, with the core between the lower and the upper half
+    core = np.where(np.arange(count) >= count // 2, 2 * core_thickness[..., None], 0)
+    height = thickness.sum(axis=-1) + 2 * core_thickness
+    z_bottom = np.cumsum(thickness, axis=-1) - thickness + core - height[..., None] / 2
+    z_top = z_bottom + thickness
+
+    # Laminate stiffness summed ply by ply, then one batched solve for all laminates
+    off_axis_q_matrices = off_axis_q(invariants(q), angle)
+    abd = abd_matrix(off_axis_q_matrices, thickness, z_bottom, z_top)
+
+    # The environment acts through its equivalent resultants, and the free expansion is not stressed
+    free_strain = 0
+    if environment is not None:
+        environment = np.asarray(environment, dtype=float)[..., :, None]
+        expansion_strains = free_strains(np.asarray(expansion, dtype=float), angle)
+        loads = loads + (hygrothermal_resultants(off_axis_q_matrices, expansion_strains, thickness, z_bottom, z_top)
+                         @ environment)[..., 0]
+        free_strain = (expansion_strains @ environment[..., None, :, :])[..., 0]
+
+    response = midplane_response(abd, loads[..., None, :])
+
+    z = ply_position(z_bottom, z_top, side)
+    off_axis_strain = response[..., :3] + z[..., None] * response[..., 3:] / 1000 - free_strain
+
+    stress = np.einsum("...nij,...nj->...ni", q, to_on_axis_strain(off_axis_strain, angle)) * (10**3)
+    failure_indices, modes = max_stress_failure(stress, strengths)
+    return stress, failure_indices, modes
+
+
+def lamination_moments(thickness, angle, zeta_bottom, upper, material, material_count):
+    """ Moments 0..2 over ζ of the lamination weights (1, cos 2θ, cos 4θ, sin 2θ, sin 4θ) of a set of plies,
+    summed separately per material id and for the lower and the upper half of the stack
+    (material_count x 2 x 3 x 5) """
+    theta = np.radians(angle)
+    weights = np.stack([np.ones_like(theta), np.cos(2 * theta), np.cos(4 * theta),
+                        np.sin(2 * theta), np.sin(4 * theta)], axis=-1)
+
+    zeta_top = zeta_bottom + thickness
+    moments = np.stack([thickness,
+                        (zeta_top ** 2 - zeta_bottom ** 2) / 2,
+                        (zeta_top ** 3 - zeta_bottom ** 3) / 3], axis=-1)
+
+    contributions = moments[:, :, None] * weights[:, None, :]
+
+    # Segmented sum over the plies sorted by (material, half)
+    group = np.asarray(material) * 2 + upper
+    order = np.argsort(group, kind="stable")
+    starts = np.flatnonzero(np.diff(group[order], prepend=-1))
+    sums = np.zeros((material_count * 2, 3, 5))
+    sums[group[order][starts]] = np.add.reduceat(contributions[order], starts, axis=0)
+    return sums.reshape(material_count, 2, 3, 5)
+
+
+class LaminateModel:
+    def __init__(self, core_thickness=0.0):
+        # Material names; the "material" field of each ply indexes into this list
+        self.materials = []
+        self.core_thickness = float(core_thickness)
+
+        self._plies = np.zeros(0, dtype=PLY_DTYPE)
+
+        # Bottom of every ply measured from the bottom of the stack with the core left out (ζ)
+        self._zeta = np.zeros(0)
+
+        # Running lamination sums per material of the lower and upper half, see lamination_moments. Every edit only
+        # updates the plies it moves, so A, B and D never need a pass over the whole stack.
+        self._sums = np.zeros((0, 2, 3, 5))
+
+        # z_bottom and z_top are refreshed lazily, since every edit moves the midplane
+        self._z_valid = True
+
+        # Material data stacked by material id, see material_arrays
+        self._material_arrays = None
+
+        # Influence matrices by name, see influence. They only depend on the layup and the materials, so they are
+        # kept until the next edit and any set of loads is then a single product.
+        self._influence = {}
+        self._influence_version = None
+
+        # Counts the edits, so a result can tell whether it still belongs to the layup
+        self.revision = 0
+
+    # ----------------------------------------------------------------------------------------------------------
+    # Stack editing
+    # ----------------------------------------------------------------------------------------------------------
+    @property
+    def plies(self):
+        if not self._z_valid:
+            self.update_z_coordinates()
+        return self._plies
+
+    @property
+    def layer_count(self):
+        return len(self._plies)
+
+    def material_id(self, material):
+        if material not in self.materials:
+            self.materials.append(material)
+            self._sums = np.concatenate([self._sums, np.zeros((1, 2, 3, 5))])
+        return self.materials.index(material)
+
+    def ply_materials(self):
+        return [self.materials[material_id] for material_id in self._plies["material"]]
+
+    def _moments(self, indices):
+        indices = np.asarray(indices, dtype=int)
+        if len(indices) == 0:
+            return 0
+        return lamination_moments(self._plies["thickness"][indices], self._plies["angle"][indices],
+                                  self._zeta[indices], indices >= self.layer_count // 2,
+                                  self._plies["material"][indices], len(self.materials))
+
+    def _boundary(self, new_count, index):
+        # Plies below an insert or delete keep their index, but one of them changes halves with the ply count
+        first, last = sorted((self.layer_count // 2, new_count // 2))
+        return list(range(first, min(last, index)))
+
+    def add_ply(self, material, thickness, angle, index=None):
+        # By default new plies go on top of the stack, like the "Enter" button
+        if index is None:
+            index = self.layer_count
+
+        ply = np.zeros(1, dtype=PLY_DTYPE)
+        ply["material"] = self.material_id(material)
+        ply["thickness"] = thickness
+        ply["angle"] = angle
+
+        zeta = self._zeta[index] if index < self.layer_count else self.total_thickness
+
+        boundary = self._boundary(self.layer_count + 1, index)
+        self._sums -= self._moments(boundary + list(range(index, self.layer_count)))
+        self._plies = np.insert(self._plies, index, ply)
+        self._zeta = np.insert(self._zeta, index, zeta)
+        self._zeta[index + 1:] += thickness
+
+        self._sums += self._moments(boundary + list(range(index, self.layer_count)))
+        self._layup_changed()
+
+    def move_ply(self, index, new_index):
+        first, last = min(index, new_index), max(index, new_index) + 1
+        self._sums -= self._moments(range(first, last))
+
+        order = list(range(first, last))
+        order.insert(new_index - first, order.pop(index - first))
+        self._plies[first:last] = self._plies[order]
+
+        thickness = self._plies["thickness"][first:last]
+        self._zeta[first:last] = self._zeta[first] + np.cumsum(thickness) - thickness
+
+        self._sums += self._moments(range(first, last))
+        self._layup_changed()
+
+    def delete_ply(self, index):
+        boundary = self._boundary(self.layer_count - 1, index)
+        self._sums -= self._moments(boundary + list(range(index, self.layer_count)))
+
+        thickness = self._plies["thickness"][index]
+        self._plies = np.delete(self._plies, index)
+        self._zeta = np.delete(self._zeta, index)
+        self._zeta[index:] -= thickness
+
+        self._sums += self._moments(boundary + list(range(index, self.layer_count)))
+        self._layup_changed()
+
+    def copy_symmetric(self):
+        # Mirror the current stack on top of itself; only the current upper half changes halves
+        count = self.layer_count
+        thickness = self._plies["thickness"][::-1]
+        zeta = self.total_thickness + np.cumsum(thickness) - thickness
+
+        self._sums -= self._moments(range(count // 2, count))
+        self._plies = np.concatenate([self._plies, self._plies[::-1]])
+        self._zeta = np.concatenate([self._zeta, zeta])
+
+        self._sums += self._moments(range(count // 2, 2 * count))
+        self._layup_changed()
+
+    def clear(self):
+        self._plies = np.zeros(0, dtype=PLY_DTYPE)
+        self._zeta = np.zeros(0)
+        self._sums = np.zeros((len(self.materials), 2, 3, 5))
+        self._layup_changed()
+
+    def rebuild(self):
+        # Recompute the running sums from scratch, e.g. after assigning plies directly
+        thickness = self._plies["thickness"]
+        self._zeta = np.cumsum(thickness) - thickness
+        self._sums = self._moments(range(self.layer_count))
+        self._layup_changed()
+
+    def set_core_thickness(self, core_thickness):
+        # The running sums leave the core out, so only the z-coordinates change
+        if float(core_thickness) != self.core_thickness:
+            self.core_thickness = float(core_thickness)
+            self._layup_changed()
+
+    def _layup_changed(self):
+        self._z_valid = False
+        self._influence = {}
+        self.revision += 1
+
+    def update_z_coordinates(self):
+        # The midplane is at z = 0 and the core sits between the lower and the upper half of the plies
+        core = np.where(np.arange(self.layer_count) >= self.layer_count // 2, 2 * self.core_thickness, 0)
+
+        self._plies["z_bottom"] = self._zeta + core - self.total_height / 2
+        self._plies["z_top"] = self._plies["z_bottom"] + self._plies["thickness"]
+        self._z_valid = True
+
+    @property
+    def total_thickness(self):
+        # Thickness of the plies alone
+        return self._sums[..., 0, 0].sum()
+
+    @property
+    def total_height(self):
+        return self.total_thickness + 2 * self.core_thickness
+
+    # ----------------------------------------------------------------------------------------------------------
+    # Ply properties
+    # ----------------------------------------------------------------------------------------------------------
+    def influence(self, name, compute):
+        """ Influence matrix name, from compute() the first time it is asked for after an edit of the layup or a
+        change to the material library """
+        material_cache.refresh()
+        if self._influence_version != material_cache.version:
+            self._influence = {}
+            self._influence_version = material_cache.version
+        if name not in self._influence:
+            self._influence[name] = compute()
+        return self._influence[name]
+
+    def material_arrays(self):
+        """ Q, S, U, strengths and expansion coefficients of the model's materials from the material cache, indexed
+        by material id """
+        material_cache.refresh()
+        key = (material_cache.version, len(self.materials))
+        if self._material_arrays is None or self._material_arrays[0] != key:
+            self._material_arrays = (key, material_cache.stack(self.materials))
+        return self._material_arrays[1]
+
+    def on_axis_q_matrices(self):
+        return self.material_arrays()[0][self._plies["material"]]
+
+    def on_axis_s_matrices(self):
+        return self.material_arrays()[1][self._plies["material"]]
+
+    def ply_invariants(self):
+        return self.material_arrays()[2][self._plies["material"]]
+
+    def off_axis_q_matrices(self):
+        return off_axis_q(self.ply_invariants(), self._plies["angle"])
+
+    def off_axis_s_matrices(self):
+        return invert(self.off_axis_q_matrices())
+
+    def strengths(self):
+        return self.material_arrays()[3][self._plies["material"]]
+
+    def expansion_coefficients(self):
+        return self.material_arrays()[4][self._plies["material"]]
+
+    def free_strains(self):
+        """ Off-axis free expansion of every ply per unit ΔT and ΔM (n_plies x 3 x 2), see laminate.free_strains """
+        return free_strains(self.expansion_coefficients(), self._plies["angle"])
+
+    # ----------------------------------------------------------------------------------------------------------
+    # Laminate properties
+    # ----------------------------------------------------------------------------------------------------------
+    def lamination_sums(self):
+        """ Lamination sums (Σ, V_1..V_4) per material id (n_materials x 5), weighted by thickness for A (mm), by z
+        for B (mm²) and by z² for D (mm³), taken about the midplane from the running sums """
+        lower, upper = self._sums[:, 0], self._sums[:, 1].copy()
+
+        # Move the upper half up by the core
+        shift = 2 * self.core_thickness
+        upper[:, 2] += 2 * shift * upper[:, 1] + shift ** 2 * upper[:, 0]
+        upper[:, 1] += shift * upper[:, 0]
+
+        total = lower + upper
+        midplane = self.total_height / 2
+
+        return (total[:, 0], total[:, 1] - midplane * total[:, 0],
+                total[:, 2] - 2 * midplane * total[:, 1] + midplane ** 2 * total[:, 0])
+
+    def abd_matrix(self):
+        """ Full laminate stiffness [[A, B], [B, D]] (6 x 6) in GPa and mm, see laminate.abd_matrix """
+        if self.layer_count == 0:
+            return np.zeros((6, 6))
+
+        # Every material contributes its own invariants times its own lamination sums
+        u = self.material_arrays()[2]
+        a, b, d = (lamination_matrix(u, *sums.T).sum(axis=0) for sums in self.lamination_sums())
+        return np.block([[a, b], [b, d]])
+
+    def a_matrix(self):
+        """ In-plane stiffness A (GPa·m) """
+        return self.abd_matrix()[:3, :3] * (10**(-3))
+
+    def b_matrix(self):
+        """ Coupling stiffness B (N), zero for symmetric layups """
+        return self.abd_matrix()[:3, 3:] * (10**3)
+
+    def d_matrix(self):
+        """ Flexural stiffness D (N·m) """
+        return self.abd_matrix()[3:, 3:]
+
+    @property
+    def symmetric(self):
+        """ Whether the layup has no bending-extension coupling (B = 0) """
+        return bool(is_symmetric(self.abd_matrix()))
+
+    def response_matrix(self):
+        """ Compliance (6 x 6) from loads (N₁, N₂, N₆, M₁, M₂, M₆) to midplane strains and curvatures, see
+        laminate.response_matrix """
+        return response_matrix(self.abd_matrix())
+
+    def compliance_matrices(self):
+        """ In-plane, coupling and flexural compliances a (GPa⁻¹·m⁻¹), b (N⁻¹) and d (N⁻¹·m⁻¹), the blocks of the
+        inverse of the full ABD matrix """
+        response = self.response_matrix()
+        return response[:3, :3] * (10**9), response[:3, 3:], response[3:, 3:]
+
+    def hygrothermal_resultants(self):
+        """ Resultants equivalent to an environment (6 x 2), see laminate.hygrothermal_resultants """
+        plies = self.plies
+        return hygrothermal_resultants(self.off_axis_q_matrices(), self.free_strains(), plies["thickness"],
+                                       plies["z_bottom"], plies["z_top"])
+
+    def equivalent_loads(self, loads, environment=None):
+        """ Loads (... x 6) with the resultants equivalent to an environment (ΔT, ΔM) (... x 2) added on """
+        loads = np.asarray(loads, dtype=float)
+        if environment is None:
+            return loads
+        return loads + np.asarray(environment, dtype=float) @ self.hygrothermal_resultants().T
+
+    def midplane_response(self, loads, environment=None):
+        """ Midplane strains and curvatures (ε₁, ε₂, ε₆, k₁, k₂, k₆), k in 1/m, for loads (... x 6) in an
+        environment (ΔT, ΔM) """
+        return self.equivalent_loads(loads, environment) @ self.response_matrix().T
+
+    # ----------------------------------------------------------------------------------------------------------
+    # Strain, stress and failure
+    # ----------------------------------------------------------------------------------------------------------
+    def ply_z(self, side="Middle"):
+        """ z-coordinate (mm) of the evaluation point in every ply """
+        return ply_position(self.plies["z_bottom"], self.plies["z_top"], side)
+
+    def free_strain(self, environment=None):
+        """ Off-axis free expansion (ε₁, ε₂, ε₆) of every ply in an environment (ΔT, ΔM), zero without one """
+        if environment is None:
+            return np.zeros((self.layer_count, 3))
+        return self.free_strains() @ np.asarray(environment, dtype=float)
+
+    def off_axis_strains(self, loads, side="Middle", environment=None):
+        """ Off-axis strains (ε₁, ε₂, ε₆) of every ply for loads (N₁, N₂, N₆, M₁, M₂, M₆) in an environment
+        (ΔT, ΔM). These are the total strains, free expansion included """
+        response = self.midplane_response(loads, environment)
+        return response[:3] + self.ply_z(side)[:, None] * response[3:] / 1000
+
+    def on_axis_strains(self, loads, side="Middle", environment=None):
+        return to_on_axis_strain(self.off_axis_strains(loads, side, environment), self.plies["angle"])
+
+    def on_axis_stresses(self, loads, side="Middle", environment=None):
+        """ On-axis stresses (σₓ, σᵧ, σₛ) in MPa of every ply, from the strains less the free expansion """
+        strain = to_on_axis_strain(self.off_axis_strains(loads, side, environment) - self.free_strain(environment),
+                                   self.plies["angle"])
+        return np.einsum("nij,nj->ni", self.on_axis_q_matrices(), strain) * (10**3)
+
+    def failure_indices(self, loads, side="Middle", environment=None):
+        """ Maximum-stress failure indices (n_plies x 3) and mode codes of every ply """
+        return max_stress_failure(self.on_axis_stresses(loads, side, environment), self.strengths())
+
+    def through_thickness(self, loads, points=3, environment=None):
+        """ Strains, stresses and failure indices at points sample points spread evenly from the bottom to the top of
+        every ply, or at the middle of every ply for a single point, in an environment (ΔT, ΔM) """
+        # Strains and stresses are linear in z within a ply and linear in the loads and the environment, so the
+        # values at the bottom and top of every ply are one product with the cached profile influence matrices
+        load_vector = np.concatenate([np.asarray(loads, dtype=float),
+                                      np.zeros(2) if environment is None else np.asarray(environment, dtype=float)])
+        ends = [{name: values @ load_vector for name, values in end.items()} for end in self.profile_influence()]
+
+        plies = self.plies
+        profile = ThroughThicknessProfile(plies["z_bottom"], plies["z_top"], profile_fractions(points), *ends)
+        profile.failure_indices, profile.modes = max_stress_failure(profile.values("on_axis_stress"),
+                                                                    self.strengths()[:, None, :])
+        return profile
+
+    def profile_influence(self):
+        """ Matrices (n_plies x 3 x 8) mapping (N₁, N₂, N₆, M₁, M₂, M₆, ΔT, ΔM) to the strains and stresses of
+        ThroughThicknessProfile at the bottom and at the top of every ply, as two name -> matrix dicts """
+        return self.influence("profile", self._profile_influence)
+
+    def _profile_influence(self):
+        response = self.response_matrix()
+        plies = self.plies
+        off_axis_q_matrices, on_axis_q_matrices = self.off_axis_q_matrices(), self.on_axis_q_matrices()
+        rotation = strain_rotation(plies["angle"])
+
+        # Midplane response per unit load and per unit of the environment, through its equivalent resultants
+        response = np.column_stack([response, response @ self.hygrothermal_resultants()])
+        free_strain = np.concatenate([np.zeros((self.layer_count, 3, 6)), self.free_strains()], axis=-1)
+
+        ends = []
+        for z in (plies["z_bottom"], plies["z_top"]):
+            off_axis_strain = response[:3] + z[:, None, None] * response[3:] / 1000
+
+            # Only the strain beyond the free expansion is stressed
+            mechanical_strain = off_axis_strain - free_strain
+            ends.append({"off_axis_strain": off_axis_strain, "on_axis_strain": rotation @ off_axis_strain,
+                         "off_axis_stress": off_axis_q_matrices @ mechanical_strain * (10**3),
+                         "on_axis_stress": on_axis_q_matrices @ rotation @ mechanical_strain * (10**3)})
+        return ends
+
+    def load_case_influence(self, side="Middle"):
+        """ Per-ply matrices (n_plies x 3 x 6) mapping (N₁, N₂, N₆, M₁, M₂, M₆) to on-axis stress in MPa, kept until
+        the layup changes """
+        return self.influence(("loads", side), lambda: self._load_case_influence(side))
+
+    def _load_case_influence(self, side):
+        response = self.response_matrix()
+
+        # Off-axis strain of every ply per unit load: midplane strain plus z times the curvature
+        z = self.ply_z(side)
+        strain = response[:3] + z[:, None, None] * response[3:] / 1000
+
+        return self.on_axis_q_matrices() @ strain_rotation(self.plies["angle"]) @ strain * (10**3)
+
+    def hygrothermal_influence(self, side="Middle"):
+        """ Per-ply matrices (n_plies x 3 x 2) mapping an environment (ΔT, ΔM) to on-axis stress in MPa: the stress of
+        the equivalent resultants less that of the ply's own free expansion """
+        return self.influence(("environment", side), lambda: self._hygrothermal_influence(side))
+
+    def _hygrothermal_influence(self, side):
+        free_stress = self.on_axis_q_matrices() @ strain_rotation(self.plies["angle"]) @ self.free_strains()
+        return self.load_case_influence(side) @ self.hygrothermal_resultants() - free_stress * (10**3)
+
+    def load_case_stresses(self, loads, side="Middle", environment=None):
+        """ On-axis stresses (n_cases x n_plies x 3) for a (n_cases x 6) array of load cases, in environments
+        (ΔT, ΔM) given as a (n_cases x 2) array. A single load case or environment is applied to every case """
+        loads = np.atleast_2d(np.asarray(loads, dtype=float))
+
+        # a and d are factored once into the influence matrices, the load cases then cost a single matmul
+        influence = self.load_case_influence(side).reshape(-1, 6)
+        stress = loads @ influence.T
+
+        # Temperature and moisture superpose on the loads through a second, (n_cases x 2) product
+        if environment is not None:
+            environment = np.atleast_2d(np.asarray(environment, dtype=float))
+            stress = stress + environment @ self.hygrothermal_influence(side).reshape(-1, 2).T
+
+        return stress.reshape(len(stress), self.layer_count, 3)
+
+    def profile_stresses(self, loads, points=3, environment=None):
+        """ On-axis stresses (n_cases x n_plies x n_points x 3) at points sample points through every ply, see
+        profile_fractions, for a (n_cases x 6) array of load cases in environments (ΔT, ΔM) """
+        loads = np.atleast_2d(np.asarray(loads, dtype=float))
+        environment = np.zeros(2) if environment is None else np.asarray(environment, dtype=float)
+        load_vectors = np.concatenate([loads, np.broadcast_to(environment, (len(loads), 2))], axis=-1)
+
+        # Linear in z within a ply, so the bottom and top of the cached profile influence give every point
+        bottom, top = (np.einsum("nij,kj->kni", end["on_axis_stress"], load_vectors)
+                       for end in self.profile_influence())
+        fractions = profile_fractions(points)[:, None]
+        return bottom[:, :, None] + fractions * (top - bottom)[:, :, None]
+
+    def evaluate_load_cases(self, loads, side="Middle", environment=None):
+        """ On-axis stresses (n_cases x n_plies x 3), max-stress failure indices and mode codes for a
+        (n_cases x 6) array of load cases in environments (ΔT, ΔM) """
+        stress = self.load_case_stresses(loads, side, environment)
+        failure_indices, modes = max_stress_failure(stress, self.strengths())
+        return stress, failure_indices, modes
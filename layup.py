@@ -0,0 +1,294 @@
+# layup.py
+
+# Headless command line for batch runs on machines without a display. Only the numerical modules are imported,
+# never tkinter, and openpyxl only once an Excel file is read or written.
+#
+#   python layup.py batch laminate.json loads.csv -o results.xlsx
+#   python layup.py batch laminate.json loads.csv --delta-t -150 --delta-m 0.005
+#   python layup.py batch laminate.json loads.csv --results stresses.dat
+#   python layup.py sweep study.json results/ --workers 8
+#   python layup.py reliability study.json --samples 1000000 --seed 1 --workers 8
+#   python layup.py sensitivity study.json -o gradients.csv
+#
+# A laminate file is a JSON object with the plies from the bottom ply to the top ply:
+#
+#   {"core_thickness": 0.0,
+#    "plies": [{"material": "T300/5208", "thickness": 0.125, "angle": 0}, ...]}
+#
+# A sweep file adds the base load case and the sweep parameters (see sweep.SweepSpec) to that:
+#
+#   {..., "loads": [1e5, 0, 0, 0, 0, 0], "parameters": {"angle:2,7": [0, 15, 30, 45], "N2": [0, 5e4, 1e5]}}
+#
+# A reliability file adds the load case and optionally the scatter (see reliability.Scatter), a sensitivity file
+# just the load case:
+#
+#   {..., "loads": [1e5, 0, 0, 0, 0, 0], "scatter": {"stiffness": 0.05, "strength": 0.08, "angle": 1.0}}
+#
+# Exit codes: 0 when every ply has max FI < 1 under every load case, 1 when a ply fails and 2 on invalid input.
+import argparse
+import csv
+import json
+import os
+import sys
+import criteria
+import laminate
+import loadcases
+import material_properties as mp
+
+EXIT_PASSED, EXIT_FAILED, EXIT_ERROR = 0, 1, 2
+
+
+def read_laminate(path):
+    """ Plies as (material, thickness, angle) from the bottom ply up, core thickness and raw data of a laminate
+    file """
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    try:
+        plies = [(ply["material"], float(ply["thickness"]), float(ply["angle"])) for ply in data["plies"]]
+        core_thickness = float(data.get("core_thickness", 0.0))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"{os.path.basename(path)} is not a laminate file: plies need a material, thickness "
+                         f"and angle.")
+    return plies, core_thickness, data
+
+
+def build_model(plies, core_thickness):
+    model = laminate.LaminateModel(core_thickness)
+    for material, thickness, angle in plies:
+        if material not in mp.library:
+            raise ValueError(f"{material} not found in the material library")
+        model.add_ply(material, thickness, angle)
+    return model
+
+
+def print_worst_cases(model, worst, file=sys.stdout):
+    angles = model.plies["angle"]
+    print("{:>5} {:>12} {:>10} {:>4} {:>10}".format("Ply", "Orientation", "Max FI", "MOF", worst.case_label), file=file)
+    for ply_index in reversed(range(model.layer_count)):
+        print("{:>5} {:>12g} {:>10.3f} {:>4} {:>10}".format(
+            ply_index + 1, angles[ply_index], worst.failure_indices[ply_index],
+            laminate.FAILURE_MODES[worst.modes[ply_index]], worst.case_numbers[ply_index]), file=file)
+    print("{} load cases, governing {} {} (ply {}), max FI {:.3f}".format(
+        worst.count, worst.case_label.lower(), worst.governing_case_number, worst.governing_ply + 1,
+        worst.max_failure_index), file=file)
+
+
+def write_worst_cases(path, model, worst):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Ply Number", "Orientation", "Max FI", "MOF", worst.case_label])
+        for ply_index in reversed(range(model.layer_count)):
+            writer.writerow([ply_index + 1, "{:g}".format(model.plies["angle"][ply_index]),
+                             "{:.6e}".format(worst.failure_indices[ply_index]),
+                             laminate.FAILURE_MODES[worst.modes[ply_index]], worst.case_numbers[ply_index]])
+
+
+def batch_command(arguments):
+    plies, core_thickness, _ = read_laminate(arguments.laminate)
+    model = build_model(plies, core_thickness)
+
+    def load_chunks():
+        return loadcases.read_load_case_rows(arguments.loads, arguments.sheet, arguments.chunk_size)
+
+    environment = None
+    if arguments.delta_t or arguments.delta_m:
+        environment = (arguments.delta_t, arguments.delta_m)
+
+    if arguments.results:
+        # Every case of every ply goes to disk as it is evaluated, see resultfile
+        import resultfile
+        fractions = laminate.profile_fractions(arguments.points)
+        with resultfile.ResultWriter(arguments.results, (model.layer_count, len(fractions), 4),
+                                     resultfile.model_digest(model), axes=("case", "ply", "point", "value"),
+                                     fractions=fractions.tolist(), criterion=arguments.criterion,
+                                     environment=environment) as results:
+            worst = loadcases.worst_cases(model, load_chunks(), arguments.side, criterion=arguments.criterion,
+                                          environment=environment, results=results, points=arguments.points)
+    else:
+        worst = loadcases.worst_cases(model, load_chunks(), arguments.side, criterion=arguments.criterion,
+                                      environment=environment)
+    if not arguments.quiet:
+        print_worst_cases(model, worst)
+
+    if arguments.output:
+        if os.path.splitext(arguments.output)[1].lower() == ".csv":
+            write_worst_cases(arguments.output, model, worst)
+        else:
+            # The full report reads the load cases a second time rather than keeping them
+            import report
+            report.write_report(arguments.output, model, load_chunks(), arguments.side, worst=worst,
+                                environment=environment, criterion=arguments.criterion)
+
+    return EXIT_PASSED if worst.max_failure_index < 1 else EXIT_FAILED
+
+
+def sweep_command(arguments):
+    import sweep
+
+    plies, core_thickness, data = read_laminate(arguments.spec)
+    build_model(plies, core_thickness)
+
+    parameters = data.get("parameters", [])
+    if isinstance(parameters, dict):
+        parameters = list(parameters.items())
+    spec = sweep.SweepSpec(plies, core_thickness, data.get("loads", (0, 0, 0, 0, 0, 0)), parameters)
+
+    def progress(done, total):
+        if not arguments.quiet:
+            print("\r{} / {} points".format(done, total), end="", file=sys.stderr, flush=True)
+
+    sweep.run_sweep(spec, arguments.output, arguments.chunk_size, arguments.side, arguments.workers, progress,
+                    results=arguments.results, criterion=arguments.criterion)
+    if not arguments.quiet:
+        print(file=sys.stderr)
+
+    # A sweep maps out a design space, it does not pass or fail
+    return EXIT_PASSED
+
+
+def reliability_command(arguments):
+    import reliability
+
+    plies, core_thickness, data = read_laminate(arguments.spec)
+    model = build_model(plies, core_thickness)
+
+    loads = read_loads(arguments.spec, data)
+    try:
+        scatter = reliability.Scatter.from_dict(data.get("scatter", {}))
+    except (TypeError, ValueError):
+        raise ValueError(f"{os.path.basename(arguments.spec)} holds an invalid scatter.")
+
+    def progress(done, total):
+        if not arguments.quiet:
+            print("\r{} / {} samples".format(done, total), end="", file=sys.stderr, flush=True)
+
+    environment = None
+    if arguments.delta_t or arguments.delta_m:
+        environment = (arguments.delta_t, arguments.delta_m)
+
+    result = reliability.run_reliability(model, loads, arguments.samples, scatter, arguments.seed,
+                                         arguments.chunk_size, arguments.side, arguments.criterion,
+                                         arguments.workers, progress=progress, environment=environment)
+    if not arguments.quiet:
+        print(file=sys.stderr)
+
+    angles = model.plies["angle"]
+    print("{:>5} {:>12} {:>12} {:>12}".format("Ply", "Orientation", "P(fail)", "Criticality"))
+    for ply_index in reversed(range(model.layer_count)):
+        print("{:>5} {:>12g} {:>12.4e} {:>12.4f}".format(ply_index + 1, angles[ply_index],
+                                                         result.ply_probabilities[ply_index],
+                                                         result.criticality[ply_index]))
+    low, high = result.confidence_interval
+    print("P(FPF) {:.4e}, {:.0%} interval {:.4e} to {:.4e}, {} samples, seed {}".format(
+        result.probability, result.confidence, low, high, result.samples, result.seed))
+
+    # A reliability estimate is reported, it does not pass or fail
+    return EXIT_PASSED
+
+
+def read_loads(path, data):
+    try:
+        loads = [float(load) for load in data.get("loads", (0, 0, 0, 0, 0, 0))]
+    except (TypeError, ValueError):
+        raise ValueError(f"{os.path.basename(path)} holds invalid loads.")
+    if len(loads) != 6:
+        raise ValueError("The load case needs the six resultants N₁, N₂, N₆, M₁, M₂, M₆.")
+    return loads
+
+
+def sensitivity_command(arguments):
+    import sensitivity
+
+    plies, core_thickness, data = read_laminate(arguments.spec)
+    model = build_model(plies, core_thickness)
+    result = sensitivity.sensitivities(model, read_loads(arguments.spec, data), arguments.side)
+
+    # Each ply against its own angle and thickness; the output file holds every variable
+    gradients = result.max_failure_index_gradients
+    angles = model.plies["angle"]
+    print("{:>5} {:>12} {:>10} {:>12} {:>12}".format("Ply", "Orientation", "Max FI", "dFI/dθ", "dFI/dt"))
+    for ply_index in reversed(range(model.layer_count)):
+        print("{:>5} {:>12g} {:>10.3f} {:>12.4e} {:>12.4e}".format(
+            ply_index + 1, angles[ply_index], result.max_failure_indices[ply_index],
+            gradients[ply_index, result.index(f"angle:{ply_index + 1}")],
+            gradients[ply_index, result.index(f"thickness:{ply_index + 1}")]))
+
+    if arguments.output:
+        result.to_csv(arguments.output)
+
+    return EXIT_PASSED
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog="layup", description="Laminate analysis without the GUI.")
+    parser.add_argument("--materials", action="append", default=[],
+                        help="material file (.json or .csv) added to the material library")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("batch", help="worst case per ply over a sheet of load cases")
+    command.add_argument("laminate", help="laminate file (.json)")
+    command.add_argument("loads", help="load cases (.xlsx or .csv)")
+    command.add_argument("-o", "--output", help="results as a full report (.xlsx) or worst cases per ply (.csv)")
+    command.add_argument("--sheet", help="worksheet holding the load cases, the first one by default")
+    command.add_argument("--side", choices=laminate.LAYER_SIDES, default="Middle")
+    command.add_argument("--criterion", choices=list(criteria.CRITERIA), default="Max stress")
+    command.add_argument("--delta-t", type=float, default=0.0, help="temperature change (K) on every load case")
+    command.add_argument("--delta-m", type=float, default=0.0,
+                         help="moisture content change by weight (0.01 = 1 %%) on every load case")
+    command.add_argument("--chunk-size", type=int, default=10000)
+    command.add_argument("--results", help="σ and FI of every ply under every case, memory-mapped (.dat)")
+    command.add_argument("--points", type=int, default=3,
+                         help="sample points through every ply in the --results file, bottom to top")
+    command.add_argument("-q", "--quiet", action="store_true")
+    command.set_defaults(run=batch_command)
+
+    command = commands.add_parser("sweep", help="parametric sweep into chunked CSV files")
+    command.add_argument("spec", help="sweep file (.json)")
+    command.add_argument("output", help="results directory, an interrupted sweep continues where it stopped")
+    command.add_argument("--side", choices=laminate.LAYER_SIDES, default="Middle")
+    command.add_argument("--criterion", choices=list(criteria.CRITERIA), default="Max stress")
+    command.add_argument("--chunk-size", type=int, default=10000)
+    command.add_argument("--workers", type=int)
+    command.add_argument("--results", action="store_true",
+                         help="also keep σ and FI of every ply at every point, memory-mapped in results.dat")
+    command.add_argument("-q", "--quiet", action="store_true")
+    command.set_defaults(run=sweep_command)
+
+    command = commands.add_parser("reliability", help="Monte Carlo probability of first-ply failure")
+    command.add_argument("spec", help="reliability file (.json)")
+    command.add_argument("--samples", type=int, default=100000)
+    command.add_argument("--seed", type=int, help="seed of the samples, fresh entropy by default")
+    command.add_argument("--side", choices=laminate.LAYER_SIDES, default="Middle")
+    command.add_argument("--criterion", choices=list(criteria.CRITERIA), default="Max stress")
+    command.add_argument("--delta-t", type=float, default=0.0, help="temperature change (K) on every sample")
+    command.add_argument("--delta-m", type=float, default=0.0,
+                         help="moisture content change by weight (0.01 = 1 %%) on every sample")
+    command.add_argument("--chunk-size", type=int, default=10000,
+                         help="samples per chunk; results repeat for the same seed and chunk size")
+    command.add_argument("--workers", type=int)
+    command.add_argument("-q", "--quiet", action="store_true")
+    command.set_defaults(run=reliability_command)
+
+    command = commands.add_parser("sensitivity", help="gradients of the max FI of every ply")
+    command.add_argument("spec", help="laminate file (.json) with the load case")
+    command.add_argument("-o", "--output", help="max FI of every ply and its gradient (.csv)")
+    command.add_argument("--side", choices=laminate.LAYER_SIDES, default="Middle")
+    command.set_defaults(run=sensitivity_command)
+
+    return parser
+
+
+def main(argv=None):
+    arguments = parser().parse_args(argv)
+    try:
+        for path in arguments.materials:
+            mp.library.import_file(path)
+        return arguments.run(arguments)
+    except (ValueError, OSError, KeyError) as error:
+        print(f"layup: error: {error}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# loadcases.py
+
+# Bulk load cases. Load case sheets (.xlsx through openpyxl in read-only mode, or .csv) are streamed in chunks of
+# rows: every chunk goes straight through LaminateModel.evaluate_load_cases and only the running worst case of
+# every ply is kept, so an import scales linearly with the number of rows and never holds the sheet in memory.
+#
+# The first row holds the column headers. Every resultant is recognised by its name (N1, N₁, M6, ...) followed by
+# an optional unit in brackets, e.g. "N1 (kN/m)" or "M2 [N·m/m]". Resultants without a column are zero, other
+# columns (e.g. a case name) are ignored.
+import csv
+import os
+import re
+import numpy as np
+import criteria
+
+# Resultant names, in the order of (N₁, N₂, N₆, M₁, M₂, M₆)
+RESULTANTS = ("N1", "N2", "N6", "M1", "M2", "M6")
+
+# Scale factors to N/m for the in-plane forces and to N (N·m/m) for the moments
+FORCE_UNITS = {"n/m": 1.0, "n/mm": 1e3, "kn/m": 1e3, "kn/mm": 1e6}
+MOMENT_UNITS = {"n": 1.0, "n·m/m": 1.0, "nm/m": 1.0, "n*m/m": 1.0, "n·mm/mm": 1.0, "nmm/mm": 1.0,
+                "kn": 1e3, "kn·m/m": 1e3, "knm/m": 1e3, "n·mm/m": 1e-3, "nmm/m": 1e-3}
+
+_SUBSCRIPTS = str.maketrans("₁₂₆", "126")
+_HEADER = re.compile(r"^\s*([NM][126])\s*(?:[(\[]\s*([^)\]]*?)\s*[)\]])?\s*$", re.IGNORECASE)
+
+
+def _columns(header):
+    # Column index and unit scale of every resultant found in the header row
+    columns = {}
+    for column, title in enumerate(header):
+        if title is None:
+            continue
+        match = _HEADER.match(str(title).translate(_SUBSCRIPTS))
+        if match is None:
+            continue
+
+        name = match.group(1).upper()
+        unit = (match.group(2) or "").lower().replace(" ", "").replace("⋅", "·")
+        units = FORCE_UNITS if name[0] == "N" else MOMENT_UNITS
+        if unit and unit not in units:
+            raise ValueError(f"Unknown unit {match.group(2)} for {name}, expected one of {', '.join(units)}")
+        if name in columns:
+            raise ValueError(f"Column {name} appears more than once")
+        columns[name] = (column, units[unit] if unit else 1.0)
+
+    if not columns:
+        raise ValueError("No load columns (N1, N2, N6, M1, M2, M6) found in the first row.")
+    return columns
+
+
+def _rows(path, sheet=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            yield from csv.reader(file)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_load_cases(path, sheet=None, chunk_size=10000):
+    """ Load cases of a sheet as (n x 6) arrays of (N₁, N₂, N₆, M₁, M₂, M₆) in N/m and N, chunk_size rows at a
+    time. Blank rows are skipped. """
+    for loads, _ in read_load_case_rows(path, sheet, chunk_size):
+        yield loads
+
+
+def read_load_case_rows(path, sheet=None, chunk_size=10000):
+    """ Like read_load_cases, as (loads, rows) pairs with the sheet row number of every load case (2 = first row
+    under the header), so cases can be traced back to the sheet across blank rows """
+    rows = _rows(path, sheet)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError(f"{os.path.basename(path)} is empty.")
+    columns = _columns(header)
+
+    indices = [columns[name][0] if name in columns else None for name in RESULTANTS]
+    scales = np.array([columns[name][1] if name in columns else 0.0 for name in RESULTANTS])
+
+    chunk, chunk_rows = [], []
+    for row_number, row in enumerate(rows, start=2):
+        values = [row[index] if index is not None and index < len(row) else None for index in indices]
+        if all(value is None or value == "" for value in values):
+            continue
+        try:
+            chunk.append([float(value) if value not in (None, "") else 0.0 for value in values])
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {row_number} of {os.path.basename(path)} holds a load that is not a number.")
+        chunk_rows.append(row_number)
+
+        if len(chunk) == chunk_size:
+            yield np.array(chunk) * scales, np.array(chunk_rows)
+            chunk, chunk_rows = [], []
+
+    if chunk:
+        yield np.array(chunk) * scales, np.array(chunk_rows)
+
+
+def split_chunk(chunk):
+    """ Loads (n x 6) and sheet row numbers of a chunk from read_load_case_rows, or a bare (n x 6) array of loads
+    with None for the rows """
+    if isinstance(chunk, tuple):
+        loads, rows = chunk
+        return np.asarray(loads, dtype=float), rows
+    return chunk, None
+
+
+class WorstCases:
+    def __init__(self, failure_indices, modes, cases, count, rows=None):
+        self.failure_indices = failure_indices  # Worst FI of every ply (1 = bottom ply)
+        self.modes = modes  # Failure mode codes of the worst case into laminate.FAILURE_MODES
+        self.cases = cases  # Index of the load case giving each ply's worst FI (0 = first case, blank rows skipped)
+        self.count = count  # Number of load cases evaluated
+        self.rows = rows  # Sheet row of each ply's worst case, None for load cases that did not come from a sheet
+
+    @property
+    def case_numbers(self):
+        """ Sheet row of each ply's worst case, or its number counted from 1 without a sheet """
+        return self.rows if self.rows is not None else self.cases + 1
+
+    @property
+    def case_label(self):
+        return "Row" if self.rows is not None else "Case"
+
+    @property
+    def governing_ply(self):
+        """ Index of the ply with the highest FI over all load cases """
+        return int(np.argmax(self.failure_indices))
+
+    @property
+    def governing_case(self):
+        return int(self.cases[self.governing_ply])
+
+    @property
+    def governing_case_number(self):
+        return int(self.case_numbers[self.governing_ply])
+
+    @property
+    def max_failure_index(self):
+        return float(self.failure_indices[self.governing_ply])
+
+
+def worst_cases(model, load_chunks, side="Middle", progress=None, cancel=None, criterion="Max stress",
+                environment=None, results=None, points=None):
+    """ Worst FI under one of criteria.CRITERIA of every ply over a stream of (n x 6) load case chunks, or of
+    (loads, rows) pairs from read_load_case_rows, all in one environment (ΔT, ΔM).
+
+    progress(count) is called after every chunk and evaluation stops once cancel.is_set() returns True. With a
+    resultfile.ResultWriter for results, the σₓ, σᵧ, σₛ and FI of every ply under every case (n x n_plies x 4) are
+    appended to it chunk by chunk, or with points those at every sample point through the thickness of every ply
+    (n x n_plies x points x 4), see laminate.profile_fractions. """
+    count = model.layer_count
+    if count == 0:
+        raise ValueError("There is nothing to calculate.")
+
+    failure_indices = np.full(count, -np.inf)
+    modes = np.zeros(count, dtype=np.int8)
+    cases = np.zeros(count, dtype=np.int64)
+    rows = None
+    strengths = model.strengths()
+
+    done = 0
+    for chunk in load_chunks:
+        if cancel is not None and cancel.is_set():
+            break
+        loads, chunk_rows = split_chunk(chunk)
+
+        stress = model.load_case_stresses(loads, side, environment)
+        ply_indices, chunk_modes = criteria.failure_index(stress, strengths, criterion)
+        if results is not None:
+            if points is None:
+                results.append(np.concatenate([stress, ply_indices[..., None]], axis=-1))
+            else:
+                profile = model.profile_stresses(loads, points, environment)
+                profile_indices, _ = criteria.failure_index(profile, strengths[:, None, :], criterion)
+                results.append(np.concatenate([profile, profile_indices[..., None]], axis=-1))
+
+        # Worst case of every ply within the chunk, kept when it beats the running worst case
+        worst = np.argmax(ply_indices, axis=0)
+        worst_indices = ply_indices[worst, np.arange(count)]
+        better = worst_indices > failure_indices
+        failure_indices[better] = worst_indices[better]
+        modes[better] = chunk_modes[worst, np.arange(count)][better]
+        cases[better] = done + worst[better]
+        if chunk_rows is not None:
+            rows = rows if rows is not None else np.zeros(count, dtype=np.int64)
+            rows[better] = chunk_rows[worst[better]]
+
+        done += len(loads)
+        if progress is not None:
+            progress(done)
+
+    if done == 0:
+        raise ValueError("No load cases found.")
+
+    return WorstCases(failure_indices, modes, cases, done, rows)
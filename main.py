@@ -1,4 +1,5 @@
 import os
+import copy
 import math
 import numpy as np
 from itertools import cycle
@@ -6,10 +7,21 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 import tkinter.filedialog as tkfiledialog
-import uuid
+import threading
+import multiprocessing
 import material_properties as mp
-import openpyxl
-from openpyxl import Workbook
+import laminate
+import envelope
+import progressive
+import optimizer
+import report
+import calculation
+import criteria
+import resultview
+import loadcases
+import hygrothermal
+import reliability
+import plytable
 
 
 def resource_path(relative_path):
@@ -30,6 +42,12 @@ class CompositeMaterialsApp:
         self.root.tk.call("source", resource_path("themes\\azure.tcl"))
         self.root.tk.call("set_theme", "dark")
 
+        # Laminate model behind the layup table
+        self.model = laminate.LaminateModel()
+
+        # Background tasks of the analysis tabs by name, see start_task
+        self.tasks = {}
+
         # Frame setup
         self.setup_frames()
 
@@ -45,9 +63,30 @@ class CompositeMaterialsApp:
         # Layup failure
         self.setup_layup_failure_tree()
 
+        # Through-thickness profile
+        self.setup_through_thickness()
+
+        # Failure envelope
+        self.setup_failure_envelope()
+
+        # Progressive failure
+        self.setup_progressive_failure()
+
+        # Bulk load cases
+        self.setup_load_cases()
+
+        # Temperature sweep
+        self.setup_hygrothermal_sweep()
+
+        # Monte Carlo reliability
+        self.setup_reliability()
+
         # Layup modification
         self.setup_layup_modification()
 
+        # Stacking-sequence optimizer
+        self.setup_optimizer()
+
         # Matrix label setup
         self.setup_matrix_labels()
 
@@ -60,9 +99,13 @@ class CompositeMaterialsApp:
         # Set up off-axis data trees
         self.setup_off_axis_strain_data_tree()
 
-        # Set stress and moment
+        # Calculation results are pushed to the matrices and trees above through a single view
+        self.setup_result_view()
+
+        # Set stress, moment and environment
         self.set_stress()
         self.set_moment()
+        self.set_environment()
 
     def setup_frames(self):
         # Top frame
@@ -110,6 +153,9 @@ class CompositeMaterialsApp:
         self.layup_options_tab = ttk.Frame(self.user_input_notebook)
         self.user_input_notebook.add(self.layup_options_tab, text="Layup options")
 
+        self.optimizer_tab = ttk.Frame(self.user_input_notebook)
+        self.user_input_notebook.add(self.optimizer_tab, text="Optimizer")
+
         # Layup
         self.layup_label = ttk.Label(self.bottom_left_frame, text="Layup", font="Helvetica 14 bold")
         self.layup_label.pack(side=tk.TOP, anchor="nw", padx=5, pady=10)
@@ -123,6 +169,24 @@ class CompositeMaterialsApp:
         self.layup_failure_tab = ttk.Frame(self.layup_notebook)
         self.layup_notebook.add(self.layup_failure_tab, text="Layup failure")
 
+        self.layup_profile_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_profile_tab, text="Through thickness")
+
+        self.layup_envelope_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_envelope_tab, text="Failure envelope")
+
+        self.layup_progressive_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_progressive_tab, text="Progressive failure")
+
+        self.layup_load_cases_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_load_cases_tab, text="Load cases")
+
+        self.layup_hygrothermal_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_hygrothermal_tab, text="Temperature sweep")
+
+        self.layup_reliability_tab = ttk.Frame(self.layup_notebook)
+        self.layup_notebook.add(self.layup_reliability_tab, text="Reliability")
+
         # On-axis properties
         self.on_axis_label = ttk.Label(self.top_right_frame, text="On-axis and material properties",
                                        font="Helvetica 14 bold")
@@ -168,6 +232,12 @@ class CompositeMaterialsApp:
         self.off_axis_a_tab = ttk.Frame(self.off_axis_notebook)
         self.off_axis_notebook.add(self.off_axis_a_tab, text="a")
 
+        self.off_axis_B_tab = ttk.Frame(self.off_axis_notebook)
+        self.off_axis_notebook.add(self.off_axis_B_tab, text="B")
+
+        self.off_axis_b_tab = ttk.Frame(self.off_axis_notebook)
+        self.off_axis_notebook.add(self.off_axis_b_tab, text="b")
+
         self.off_axis_D_tab = ttk.Frame(self.off_axis_notebook)
         self.off_axis_notebook.add(self.off_axis_D_tab, text="D")
 
@@ -183,10 +253,17 @@ class CompositeMaterialsApp:
         self.material_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
         self.material_var = tk.StringVar()
         self.material_dropdown = ttk.Combobox(self.layup_creation_tab, textvariable=self.material_var,
-                                              values=["T300/5208", "B4/5505", "AS/H3501", "Scotchply 1002",
-                                                      "Kevlar49/epoxy", "Broken layer"], state="readonly")
+                                              postcommand=self.filter_materials)
         self.material_dropdown.grid(row=1, column=1, padx=5, pady=5, sticky="w")
 
+        # Typing into the material box filters the drop down list
+        self.material_dropdown.bind("<KeyRelease>", lambda event: self.filter_materials())
+
+        # Import materials into the library
+        self.import_materials_button = ttk.Button(self.layup_creation_tab, text="Import materials",
+                                                  command=self.import_materials)
+        self.import_materials_button.grid(row=1, column=2, pady=5, padx=5, sticky="e")
+
         # Ply thickness
         self.thickness_label = ttk.Label(self.layup_creation_tab, text="Thickness (mm):")
         self.thickness_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
@@ -274,20 +351,38 @@ class CompositeMaterialsApp:
         self.moment_set_button = ttk.Button(self.stress_state_tab, text="Set moment", command=self.set_moment)
         self.moment_set_button.grid(row=3, column=3, pady=5, padx=5, sticky="e")
 
+        # Environment, superposed on the loads
+        self.delta_t_label = ttk.Label(self.stress_state_tab, text="ΔT (K)")
+        self.delta_t_label.grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        self.delta_t_var = tk.StringVar(value="0")
+        self.delta_t_entry = ttk.Entry(self.stress_state_tab, textvariable=self.delta_t_var, justify="center",
+                                       width=8)
+        self.delta_t_entry.grid(row=6, column=0, padx=5, pady=5, sticky="w")
+
+        self.delta_m_label = ttk.Label(self.stress_state_tab, text="ΔM (%)")
+        self.delta_m_label.grid(row=5, column=1, padx=5, pady=5, sticky="w")
+        self.delta_m_var = tk.StringVar(value="0")
+        self.delta_m_entry = ttk.Entry(self.stress_state_tab, textvariable=self.delta_m_var, justify="center",
+                                       width=8)
+        self.delta_m_entry.grid(row=6, column=1, padx=5, pady=5, sticky="w")
+
+        self.environment_set_button = ttk.Button(self.stress_state_tab, text="Set environment",
+                                                 command=self.set_environment)
+        self.environment_set_button.grid(row=6, column=3, pady=5, padx=5, sticky="e")
+
     def setup_layup_data_tree(self):
         # Frame to contain the Treeview and Scrollbar
         self.layup_data_frame = ttk.Frame(self.layup_tab)
         self.layup_data_frame.grid(row=6, column=0, padx=5, pady=5, columnspan=3, sticky="nsew")
 
-        # Treeview
-        self.data_grid = ttk.Treeview(self.layup_data_frame,
-                                      columns=("Ply Number", "Ply Type", "Thickness", "Orientation"),
-                                      show="headings")
+        # Treeview with its scrollbar, showing only the rows in view straight from the laminate model
+        self.data_grid = plytable.VirtualTable(self.layup_data_frame,
+                                               columns=("Ply Number", "Ply Type", "Thickness", "Orientation"),
+                                               row=self.get_ply_row, count=lambda: self.model.layer_count)
         self.data_grid.heading("Ply Number", text="#")
         self.data_grid.heading("Ply Type", text="Material")
         self.data_grid.heading("Thickness", text="Thickness (mm)")
         self.data_grid.heading("Orientation", text="Orientation (deg)")
-        self.data_grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # Center the text in the Treeview cells
         for column in ("Ply Number", "Ply Type", "Thickness", "Orientation"):
@@ -299,34 +394,43 @@ class CompositeMaterialsApp:
         self.data_grid.column("Thickness", width=95)
         self.data_grid.column("Orientation", width=115)  # Adjust the width as needed
 
-        # Add a vertical scrollbar
-        data_scrollbar = ttk.Scrollbar(self.layup_data_frame, orient="vertical", command=self.data_grid.yview)
-        data_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.data_grid.configure(yscrollcommand=data_scrollbar.set)
-
         # Configure the data_frame to expand both vertically and horizontally
         self.layup_tab.columnconfigure(0, weight=1)
         self.layup_tab.rowconfigure(6, weight=1)
 
     def setup_layup_failure_tree(self):
+        # Failure criterion, also used by the failure envelope, the load case import, the report and the optimizer
+        self.criterion_label = ttk.Label(self.layup_failure_tab, text="Criterion:")
+        self.criterion_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+
+        self.criterion_var = tk.StringVar()
+        self.criterion_dropdown = ttk.Combobox(self.layup_failure_tab, textvariable=self.criterion_var,
+                                               values=list(criteria.CRITERIA), state="readonly", width=10)
+        self.criterion_dropdown.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        self.criterion_dropdown.current(0)
+
         # Frame to contain the Treeview and Scrollbar
         self.layup_failure_frame = ttk.Frame(self.layup_failure_tab)
         self.layup_failure_frame.grid(row=6, column=0, padx=5, pady=5, columnspan=3, sticky="nsew")
 
-        # Treeview
-        self.failure_grid = ttk.Treeview(self.layup_failure_frame,
-                                      columns=("Ply Number", "Orientation", "FI x", "FI y", "FI s", "MOF"),
-                                      show="headings")
+        # Treeview with its scrollbar, showing only the rows in view straight from the last calculation
+        self.calculation = None
+        self.failure_grid = plytable.VirtualTable(self.layup_failure_frame,
+                                                  columns=("Ply Number", "Orientation", "FI x", "FI y", "FI s",
+                                                           "SR", "MOF", "z"),
+                                                  row=self.get_failure_row,
+                                                  count=lambda: self.calculation.ply_count if self.calculation else 0)
         self.failure_grid.heading("Ply Number", text="#")
         self.failure_grid.heading("Orientation", text="Orientation (deg)")
         self.failure_grid.heading("FI x", text="FI x")
         self.failure_grid.heading("FI y", text="FI y")
         self.failure_grid.heading("FI s", text="FI s")
+        self.failure_grid.heading("SR", text="SR")
         self.failure_grid.heading("MOF", text="MOF")
-        self.failure_grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.failure_grid.heading("z", text="z (mm)")
 
         # Center the text in the Treeview cells
-        for column in ("Ply Number", "Orientation", "FI x", "FI y", "FI s", "MOF"):
+        for column in ("Ply Number", "Orientation", "FI x", "FI y", "FI s", "SR", "MOF", "z"):
             self.failure_grid.column(column, anchor="center")
 
         # Set fixed width for each column
@@ -335,17 +439,293 @@ class CompositeMaterialsApp:
         self.failure_grid.column("FI x", width=25)
         self.failure_grid.column("FI y", width=25)
         self.failure_grid.column("FI s", width=25)
+        self.failure_grid.column("SR", width=35)
         self.failure_grid.column("MOF", width=25)
-
-        # Add a vertical scrollbar
-        failure_scrollbar = ttk.Scrollbar(self.layup_failure_frame, orient="vertical", command=self.failure_grid.yview)
-        failure_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.failure_grid.configure(yscrollcommand=failure_scrollbar.set)
+        self.failure_grid.column("z", width=45)
 
         # Configure the data_frame to expand both vertically and horizontally
         self.layup_failure_tab.columnconfigure(0, weight=1)
         self.layup_failure_tab.rowconfigure(6, weight=1)
 
+    def setup_through_thickness(self):
+        # Sample points per ply, used by the next calculation
+        self.profile_points_label = ttk.Label(self.layup_profile_tab, text="Points per ply:")
+        self.profile_points_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+
+        self.profile_points_var = tk.StringVar(value="3")
+        self.profile_points_spinbox = ttk.Spinbox(self.layup_profile_tab, from_=1, to=21,
+                                                  textvariable=self.profile_points_var, width=4)
+        self.profile_points_spinbox.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        # Plotted component
+        self.profile_component_var = tk.StringVar()
+        self.profile_component_dropdown = ttk.Combobox(self.layup_profile_tab,
+                                                       textvariable=self.profile_component_var,
+                                                       values=list(resultview.PROFILE_COMPONENTS), state="readonly",
+                                                       width=10)
+        self.profile_component_dropdown.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+        self.profile_component_dropdown.current(0)
+        self.profile_component_dropdown.bind("<<ComboboxSelected>>", lambda event: self.draw_profile())
+
+        # Plot area
+        self.profile_canvas = tk.Canvas(self.layup_profile_tab, width=320, height=320, highlightthickness=0)
+        self.profile_canvas.grid(row=1, column=0, padx=5, pady=5, columnspan=3, sticky="nsew")
+        self.profile_canvas.bind("<Configure>", lambda event: self.draw_profile())
+
+        # Configure the canvas to expand both vertically and horizontally
+        self.layup_profile_tab.columnconfigure(2, weight=1)
+        self.layup_profile_tab.rowconfigure(1, weight=1)
+
+    def setup_failure_envelope(self):
+        # Resultant plane selector
+        self.envelope_plane_var = tk.StringVar()
+        self.envelope_plane_dropdown = ttk.Combobox(self.layup_envelope_tab, textvariable=self.envelope_plane_var,
+                                                    values=list(envelope.PLANES), state="readonly", width=8)
+        self.envelope_plane_dropdown.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.envelope_plane_dropdown.current(0)
+
+        self.envelope_button = ttk.Button(self.layup_envelope_tab, text="Calculate", command=self.calculate_envelope)
+        self.envelope_button.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        self.cancel_envelope_button = ttk.Button(self.layup_envelope_tab, text="Cancel",
+                                                 command=lambda: self.cancel_task("envelope"), state="disabled")
+        self.cancel_envelope_button.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+
+        self.envelope_export_button = ttk.Button(self.layup_envelope_tab, text="Export CSV",
+                                                 command=self.export_envelope)
+        self.envelope_export_button.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+
+        # Plot area
+        self.envelope_canvas = tk.Canvas(self.layup_envelope_tab, width=320, height=320, highlightthickness=0)
+        self.envelope_canvas.grid(row=1, column=0, padx=5, pady=5, columnspan=4, sticky="nsew")
+
+        self.envelope = None
+        self.tasks["envelope"] = dict(request=0, cancel=threading.Event(), button=self.cancel_envelope_button)
+
+        # Configure the canvas to expand both vertically and horizontally
+        self.layup_envelope_tab.columnconfigure(3, weight=1)
+        self.layup_envelope_tab.rowconfigure(1, weight=1)
+
+    def setup_hygrothermal_sweep(self):
+        # Temperature range, swept at the ΔM of the environment with the loads applied
+        self.sweep_from_label = ttk.Label(self.layup_hygrothermal_tab, text="ΔT from (K):")
+        self.sweep_from_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.sweep_from_var = tk.StringVar(value="-150")
+        self.sweep_from_entry = ttk.Entry(self.layup_hygrothermal_tab, textvariable=self.sweep_from_var,
+                                          justify="center", width=6)
+        self.sweep_from_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        self.sweep_to_label = ttk.Label(self.layup_hygrothermal_tab, text="to:")
+        self.sweep_to_label.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+        self.sweep_to_var = tk.StringVar(value="100")
+        self.sweep_to_entry = ttk.Entry(self.layup_hygrothermal_tab, textvariable=self.sweep_to_var,
+                                        justify="center", width=6)
+        self.sweep_to_entry.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+
+        self.sweep_points_label = ttk.Label(self.layup_hygrothermal_tab, text="Points:")
+        self.sweep_points_label.grid(row=0, column=4, padx=5, pady=5, sticky="w")
+        self.sweep_points_var = tk.StringVar(value="1001")
+        self.sweep_points_entry = ttk.Entry(self.layup_hygrothermal_tab, textvariable=self.sweep_points_var,
+                                            justify="center", width=6)
+        self.sweep_points_entry.grid(row=0, column=5, padx=5, pady=5, sticky="w")
+
+        self.sweep_button = ttk.Button(self.layup_hygrothermal_tab, text="Calculate",
+                                       command=self.calculate_hygrothermal_sweep)
+        self.sweep_button.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+        self.cancel_sweep_button = ttk.Button(self.layup_hygrothermal_tab, text="Cancel",
+                                              command=lambda: self.cancel_task("hygrothermal"), state="disabled")
+        self.cancel_sweep_button.grid(row=1, column=2, columnspan=2, padx=5, pady=5, sticky="w")
+
+        self.sweep_export_button = ttk.Button(self.layup_hygrothermal_tab, text="Export CSV",
+                                              command=self.export_hygrothermal_sweep)
+        self.sweep_export_button.grid(row=1, column=4, columnspan=2, padx=5, pady=5, sticky="w")
+
+        # Plot area
+        self.sweep_canvas = tk.Canvas(self.layup_hygrothermal_tab, width=320, height=320, highlightthickness=0)
+        self.sweep_canvas.grid(row=2, column=0, padx=5, pady=5, columnspan=6, sticky="nsew")
+
+        self.hygrothermal_sweep = None
+        self.tasks["hygrothermal"] = dict(request=0, cancel=threading.Event(), button=self.cancel_sweep_button)
+
+        # Configure the canvas to expand both vertically and horizontally
+        self.layup_hygrothermal_tab.columnconfigure(5, weight=1)
+        self.layup_hygrothermal_tab.rowconfigure(2, weight=1)
+
+    def setup_reliability(self):
+        # Sample count and seed
+        self.reliability_samples_label = ttk.Label(self.layup_reliability_tab, text="Samples:")
+        self.reliability_samples_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.reliability_samples_var = tk.StringVar(value="100000")
+        self.reliability_samples_entry = ttk.Entry(self.layup_reliability_tab,
+                                                   textvariable=self.reliability_samples_var, justify="center", width=8)
+        self.reliability_samples_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        self.reliability_seed_label = ttk.Label(self.layup_reliability_tab, text="Seed:")
+        self.reliability_seed_label.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+        self.reliability_seed_var = tk.StringVar(value="1")
+        self.reliability_seed_entry = ttk.Entry(self.layup_reliability_tab,
+                                                textvariable=self.reliability_seed_var, justify="center", width=8)
+        self.reliability_seed_entry.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+
+        # Scatter of the inputs
+        self.reliability_stiffness_label = ttk.Label(self.layup_reliability_tab, text="CoV E, ν (%):")
+        self.reliability_stiffness_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.reliability_stiffness_var = tk.StringVar(value="5")
+        self.reliability_stiffness_entry = ttk.Entry(self.layup_reliability_tab,
+                                                     textvariable=self.reliability_stiffness_var,
+                                                     justify="center", width=8)
+        self.reliability_stiffness_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+
+        self.reliability_strength_label = ttk.Label(self.layup_reliability_tab, text="CoV strength (%):")
+        self.reliability_strength_label.grid(row=1, column=2, padx=5, pady=5, sticky="w")
+        self.reliability_strength_var = tk.StringVar(value="8")
+        self.reliability_strength_entry = ttk.Entry(self.layup_reliability_tab,
+                                                    textvariable=self.reliability_strength_var,
+                                                    justify="center", width=8)
+        self.reliability_strength_entry.grid(row=1, column=3, padx=5, pady=5, sticky="w")
+
+        self.reliability_thickness_label = ttk.Label(self.layup_reliability_tab, text="CoV thickness (%):")
+        self.reliability_thickness_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.reliability_thickness_var = tk.StringVar(value="3")
+        self.reliability_thickness_entry = ttk.Entry(self.layup_reliability_tab,
+                                                     textvariable=self.reliability_thickness_var,
+                                                     justify="center", width=8)
+        self.reliability_thickness_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+        self.reliability_angle_label = ttk.Label(self.layup_reliability_tab, text="Angle σ (deg):")
+        self.reliability_angle_label.grid(row=2, column=2, padx=5, pady=5, sticky="w")
+        self.reliability_angle_var = tk.StringVar(value="1")
+        self.reliability_angle_entry = ttk.Entry(self.layup_reliability_tab,
+                                                 textvariable=self.reliability_angle_var, justify="center", width=8)
+        self.reliability_angle_entry.grid(row=2, column=3, padx=5, pady=5, sticky="w")
+
+        # Run, cancel and progress
+        self.reliability_button = ttk.Button(self.layup_reliability_tab, text="Calculate",
+                                             command=self.calculate_reliability)
+        self.reliability_button.grid(row=3, column=0, padx=5, pady=5, sticky="w")
+
+        self.cancel_reliability_button = ttk.Button(self.layup_reliability_tab, text="Cancel",
+                                                    command=lambda: self.cancel_task("reliability"),
+                                                    state="disabled")
+        self.cancel_reliability_button.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+
+        self.reliability_progress = ttk.Progressbar(self.layup_reliability_tab, mode="determinate")
+        self.reliability_progress.grid(row=4, column=0, padx=5, pady=5, columnspan=4, sticky="ew")
+
+        self.reliability_label = ttk.Label(self.layup_reliability_tab, text="", wraplength=300)
+        self.reliability_label.grid(row=5, column=0, padx=5, pady=5, columnspan=4, sticky="w")
+
+        # Frame to contain the Treeview and Scrollbar
+        self.reliability_frame = ttk.Frame(self.layup_reliability_tab)
+        self.reliability_frame.grid(row=6, column=0, padx=5, pady=5, columnspan=4, sticky="nsew")
+
+        # Failure probability and criticality of every ply
+        columns = ("Ply Number", "Orientation", "P fail", "Criticality")
+        self.reliability_grid = ttk.Treeview(self.reliability_frame, columns=columns, show="headings")
+        self.reliability_grid.heading("Ply Number", text="#")
+        self.reliability_grid.heading("Orientation", text="Orientation (deg)")
+        self.reliability_grid.heading("P fail", text="P(fail)")
+        self.reliability_grid.heading("Criticality", text="Criticality")
+        self.reliability_grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for column in columns:
+            self.reliability_grid.column(column, anchor="center", width=70)
+        self.reliability_grid.column("Orientation", width=115)
+
+        reliability_scrollbar = ttk.Scrollbar(self.reliability_frame, orient="vertical",
+                                              command=self.reliability_grid.yview)
+        reliability_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.reliability_grid.configure(yscrollcommand=reliability_scrollbar.set)
+
+        self.layup_reliability_tab.columnconfigure(3, weight=1)
+        self.layup_reliability_tab.rowconfigure(6, weight=1)
+
+        self.tasks["reliability"] = dict(request=0, cancel=threading.Event(), button=self.cancel_reliability_button,
+                                         reset=lambda: self.reliability_progress.config(value=0))
+
+    def setup_progressive_failure(self):
+        # Stiffness discount selector
+        self.discount_var = tk.StringVar()
+        self.discount_dropdown = ttk.Combobox(self.layup_progressive_tab, textvariable=self.discount_var,
+                                              values=list(progressive.DISCOUNTS), state="readonly", width=8)
+        self.discount_dropdown.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.discount_dropdown.current(0)
+
+        self.progressive_button = ttk.Button(self.layup_progressive_tab, text="Run",
+                                             command=self.calculate_progressive_failure)
+        self.progressive_button.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        self.cancel_progressive_button = ttk.Button(self.layup_progressive_tab, text="Cancel",
+                                                    command=lambda: self.cancel_task("progressive"), state="disabled")
+        self.cancel_progressive_button.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+
+        self.progressive_label = ttk.Label(self.layup_progressive_tab, text="")
+        self.progressive_label.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+
+        # Frame to contain the Treeview and Scrollbar
+        self.progressive_frame = ttk.Frame(self.layup_progressive_tab)
+        self.progressive_frame.grid(row=1, column=0, padx=5, pady=5, columnspan=4, sticky="nsew")
+
+        # Failure sequence
+        self.progressive_grid = ttk.Treeview(self.progressive_frame, columns=("Load factor", "Ply Number", "MOF"),
+                                             show="headings")
+        self.progressive_grid.heading("Load factor", text="Load factor")
+        self.progressive_grid.heading("Ply Number", text="#")
+        self.progressive_grid.heading("MOF", text="MOF")
+        self.progressive_grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for column in ("Load factor", "Ply Number", "MOF"):
+            self.progressive_grid.column(column, anchor="center", width=60)
+
+        progressive_scrollbar = ttk.Scrollbar(self.progressive_frame, orient="vertical",
+                                              command=self.progressive_grid.yview)
+        progressive_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.progressive_grid.configure(yscrollcommand=progressive_scrollbar.set)
+
+        self.tasks["progressive"] = dict(request=0, cancel=threading.Event(), button=self.cancel_progressive_button)
+
+        # Configure the data_frame to expand both vertically and horizontally
+        self.layup_progressive_tab.columnconfigure(3, weight=1)
+        self.layup_progressive_tab.rowconfigure(1, weight=1)
+
+    def setup_load_cases(self):
+        # Import button next to the single load case entries
+        self.import_load_cases_button = ttk.Button(self.stress_state_tab, text="Import load cases",
+                                                   command=self.import_load_cases)
+        self.import_load_cases_button.grid(row=4, column=0, columnspan=2, pady=5, padx=5, sticky="w")
+
+        self.load_cases_label = ttk.Label(self.layup_load_cases_tab, text="")
+        self.load_cases_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+
+        # Frame to contain the Treeview and Scrollbar
+        self.load_cases_frame = ttk.Frame(self.layup_load_cases_tab)
+        self.load_cases_frame.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+
+        # Worst case of every ply
+        columns = ("Ply Number", "Orientation", "Max FI", "MOF", "Row")
+        self.load_cases_grid = ttk.Treeview(self.load_cases_frame, columns=columns, show="headings")
+        self.load_cases_grid.heading("Ply Number", text="#")
+        self.load_cases_grid.heading("Orientation", text="Orientation (deg)")
+        self.load_cases_grid.heading("Max FI", text="Max FI")
+        self.load_cases_grid.heading("MOF", text="MOF")
+        self.load_cases_grid.heading("Row", text="Row")
+        self.load_cases_grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for column in columns:
+            self.load_cases_grid.column(column, anchor="center", width=50)
+        self.load_cases_grid.column("Orientation", width=115)
+
+        load_cases_scrollbar = ttk.Scrollbar(self.load_cases_frame, orient="vertical",
+                                             command=self.load_cases_grid.yview)
+        load_cases_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.load_cases_grid.configure(yscrollcommand=load_cases_scrollbar.set)
+
+        self.layup_load_cases_tab.columnconfigure(0, weight=1)
+        self.layup_load_cases_tab.rowconfigure(1, weight=1)
+
+        self.tasks["load_cases"] = dict(request=0, cancel=threading.Event(), button=None)
+
     def setup_on_axis_stress_data_tree(self):
         self.on_axis_stress_tree = ttk.Treeview(self.on_axis_stress_tab, columns=("sigma_x", "sigma_y", "sigma_s"), show="headings")
 
@@ -451,6 +831,7 @@ class CompositeMaterialsApp:
         # Save button the save the layup to excel
         self.save_button = ttk.Button(self.bottom_bottom_left_frame, text="Save", command=self.save_data)
         self.save_button.grid(row=0, column=3, pady=5, padx=5, sticky="w")
+        self.tasks["save"] = dict(request=0, cancel=threading.Event(), button=None)
 
         # Select button
         self.calculate_button = ttk.Button(self.bottom_bottom_left_frame, text="Calculate", command=self.calculate)
@@ -463,6 +844,68 @@ class CompositeMaterialsApp:
         self.layer_side_dropdown.grid(row=0, column=2, padx=5, pady=5, sticky="w")
         self.layer_side_dropdown.current(0)
 
+        # Progress of the calculation running in the background
+        self.calculation_progress = ttk.Progressbar(self.bottom_bottom_left_frame, mode="determinate")
+        self.calculation_progress.grid(row=2, column=0, padx=5, pady=5, columnspan=3, sticky="ew")
+
+        self.cancel_calculation_button = ttk.Button(self.bottom_bottom_left_frame, text="Cancel",
+                                                    command=self.cancel_calculation, state="disabled")
+        self.cancel_calculation_button.grid(row=2, column=3, pady=5, padx=5, sticky="w")
+
+        # Every Calculate click is a new request; results of older requests are dropped
+        self.calculation_request = 0
+        self.calculation_cancel = threading.Event()
+
+    def setup_optimizer(self):
+        # Orientations the optimizer may use
+        self.angle_set_label = ttk.Label(self.optimizer_tab, text="Angles (deg):")
+        self.angle_set_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.angle_set_var = tk.StringVar(value="0, 45, -45, 90")
+        self.angle_set_entry = ttk.Entry(self.optimizer_tab, textvariable=self.angle_set_var, justify="center")
+        self.angle_set_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+        # Ply count range
+        self.ply_range_label = ttk.Label(self.optimizer_tab, text="Plies (min / max):")
+        self.ply_range_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.min_plies_var = tk.StringVar(value="2")
+        self.min_plies_entry = ttk.Entry(self.optimizer_tab, textvariable=self.min_plies_var, justify="center",
+                                         width=8)
+        self.min_plies_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        self.max_plies_var = tk.StringVar(value="32")
+        self.max_plies_entry = ttk.Entry(self.optimizer_tab, textvariable=self.max_plies_var, justify="center",
+                                         width=8)
+        self.max_plies_entry.grid(row=1, column=2, padx=5, pady=5, sticky="w")
+
+        # Search effort
+        self.generations_label = ttk.Label(self.optimizer_tab, text="Generations:")
+        self.generations_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.generations_var = tk.StringVar(value="200")
+        self.generations_entry = ttk.Entry(self.optimizer_tab, textvariable=self.generations_var, justify="center",
+                                           width=8)
+        self.generations_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+        # Run, cancel and progress
+        self.optimize_button = ttk.Button(self.optimizer_tab, text="Optimize", command=self.optimize)
+        self.optimize_button.grid(row=3, column=0, padx=5, pady=5, sticky="w")
+
+        self.cancel_optimize_button = ttk.Button(self.optimizer_tab, text="Cancel", command=lambda: self.cancel_task("optimize"),
+                                                 state="disabled")
+        self.cancel_optimize_button.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+
+        self.use_layup_button = ttk.Button(self.optimizer_tab, text="Use layup", command=self.use_optimized_layup,
+                                           state="disabled")
+        self.use_layup_button.grid(row=3, column=2, padx=5, pady=5, sticky="w")
+
+        self.optimize_progress = ttk.Progressbar(self.optimizer_tab, mode="determinate")
+        self.optimize_progress.grid(row=4, column=0, padx=5, pady=5, columnspan=3, sticky="ew")
+
+        self.optimize_label = ttk.Label(self.optimizer_tab, text="", wraplength=300)
+        self.optimize_label.grid(row=5, column=0, padx=5, pady=5, columnspan=3, sticky="w")
+
+        self.optimize_result = None
+        self.tasks["optimize"] = dict(request=0, cancel=threading.Event(), button=self.cancel_optimize_button,
+                                      reset=lambda: self.optimize_progress.config(value=0))
+
     def setup_matrix_labels(self):
         # Create and display the matrices
         on_axis_Q_matrix_entries = self.setup_matrix(self.on_axis_Q_tab, "Q", row_labels=["σₓ", "σᵧ", "σₛ"],
@@ -496,6 +939,14 @@ class CompositeMaterialsApp:
                                                  units=["(GPa⁻¹·m⁻¹)", "(GPa⁻¹·m⁻¹)", "(GPa⁻¹·m⁻¹)"])
         self.off_axis_a_matrix_entries = off_axis_a_matrix_entries  # Save q_matrix_entries for later use in calculations
 
+        # Bending-extension coupling, zero for symmetric layups
+        self.off_axis_B_matrix_entries = self.setup_matrix(self.off_axis_B_tab, "B", row_labels=["N₁", "N₂", "N₆"],
+                                                           column_labels=["k₁", "k₂", "k₆"], units=["N", "N", "N"])
+
+        self.off_axis_b_matrix_entries = self.setup_matrix(self.off_axis_b_tab, "b", row_labels=["ε₁", "ε₂", "ε₆"],
+                                                           column_labels=["M₁", "M₂", "M₆"],
+                                                           units=["(N⁻¹)", "(N⁻¹)", "(N⁻¹)"])
+
         off_axis_D_matrix_entries = self.setup_matrix(self.off_axis_D_tab, "D", row_labels=["M₁", "M₂", "M₆"],
                                                  column_labels=["k₁", "k₂", "k₆"],
                                                  units=["N·m", "N·m", "N·m"])
@@ -506,6 +957,22 @@ class CompositeMaterialsApp:
                                                  units=["(N·m⁻¹)", "(N·m⁻¹)", "(N·m⁻¹)"])
         self.off_axis_d_matrix_entries = off_axis_d_matrix_entries  # Save q_matrix_entries for later use in calculations
 
+    def filter_materials(self):
+        self.material_dropdown["values"] = mp.library.search(self.material_var.get(), limit=200)
+
+    def import_materials(self):
+        path = tkfiledialog.askopenfilename(filetypes=[("Material files", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        try:
+            mp.library.import_file(path)
+        except (OSError, ValueError, KeyError) as error:
+            messagebox.showerror("Error", f"Could not import materials: {error}")
+            return
+
+        self.filter_materials()
+
     def toggle_core(self):
         if self.has_core_var.get():
             self.core_thickness_entry["state"] = "normal"
@@ -529,6 +996,8 @@ class CompositeMaterialsApp:
         else:
             self.N_6 = 0
 
+        self.reload_calculation()
+
     def set_moment(self):
         if self.M_1_var.get():
             self.M_1 = float(self.M_1_var.get())
@@ -545,15 +1014,28 @@ class CompositeMaterialsApp:
         else:
             self.M_6 = 0
 
+        self.reload_calculation()
+
+    def set_environment(self):
+        try:
+            self.delta_t = float(self.delta_t_var.get()) if self.delta_t_var.get() else 0
+            self.delta_m = float(self.delta_m_var.get()) / 100 if self.delta_m_var.get() else 0
+        except ValueError:
+            messagebox.showerror("Error", "ΔT and ΔM must be numbers.")
+            return
+
+        self.reload_calculation()
+
     def add_to_layup(self):
         ply_type = self.material_var.get()
         if not ply_type:
             messagebox.showerror("Error", "Please select a Material.")
             return
+        if ply_type not in mp.library:
+            messagebox.showerror("Error", f"{ply_type} is not in the material library.")
+            return
         thickness_str = self.thickness_var.get()
         orientation_str = self.orientation_var.get()
-        has_core = self.has_core_var.get()
-        core_thickness_str = self.core_thickness_var.get()
 
         try:
             thickness = float(thickness_str)
@@ -562,72 +1044,49 @@ class CompositeMaterialsApp:
             messagebox.showerror("Error", "Thickness and Orientation must be numbers.")
             return
 
-        if has_core:
-            try:
-                core_thickness = float(core_thickness_str)
-                if core_thickness < 0:
-                    messagebox.showerror("Error", "Core Half-Thickness must be greater than or equal to zero.")
-                    return
-            except ValueError:
-                messagebox.showerror("Error", "Core Half-Thickness must be a number.")
-                return
-        else:
-            core_thickness = None
-
-        unique_id = str(uuid.uuid4())
-        ply_number = len(self.data_grid.get_children()) + 1  # Update the count after adding the new layer
-        values = (ply_number, ply_type, thickness, orientation, has_core, core_thickness)
+        # New plies go on top of the laminate model, which is the first row of the table
+        self.model.add_ply(ply_type, thickness, orientation)
+        if self.data_grid.selection() is not None:
+            self.data_grid.selected += 1
 
-        # Use the root item as the parent_item (empty string)
-        parent_item = ""
-        self.data_grid.insert(parent_item, 0, values=values)
         self.update_ply_numbers()
         self.update_layer_count()  # Update the layer count after adding the new layer
 
     def move_up(self):
-        selected_item = self.data_grid.selection()
-        if selected_item:
-            current_index = self.data_grid.index(selected_item)
-            if current_index > 0:
-                self.data_grid.move(selected_item, '', current_index - 1)
-                self.update_ply_numbers()
+        current_index = self.data_grid.selection()
+        if current_index is not None and current_index > 0:
+            ply_index = self.get_ply_index(current_index)
+            self.model.move_ply(ply_index, ply_index + 1)
+            self.data_grid.select(current_index - 1)
 
     def move_down(self):
-        selected_item = self.data_grid.selection()
-        if selected_item:
-            current_index = self.data_grid.index(selected_item)
-            if current_index < len(self.data_grid.get_children()) - 1:
-                self.data_grid.move(selected_item, '', current_index + 1)
-                self.update_ply_numbers()
+        current_index = self.data_grid.selection()
+        if current_index is not None and current_index < self.model.layer_count - 1:
+            ply_index = self.get_ply_index(current_index)
+            self.model.move_ply(ply_index, ply_index - 1)
+            self.data_grid.select(current_index + 1)
 
     def copy_symmetric(self):
-        # Get all the ply data from the Treeview
-        all_ply_data = [(self.data_grid.item(item, 'values'))[1:] for item in self.data_grid.get_children()]
-
-        # Reverse the copied ply data
-        symmetric_ply_data = all_ply_data[::-1]
-
-        # Insert new symmetric data into the tree at the correct position
-        for index, ply_data in enumerate(symmetric_ply_data):
-            ply_number = len(self.data_grid.get_children()) + index + 1
-            values = (ply_number,) + tuple(ply_data)
+        # The mirrored plies go on top, so the selected row moves down by the original ply count
+        selected_index = self.data_grid.selection()
+        if selected_index is not None:
+            self.data_grid.selected += self.model.layer_count
 
-            # Insert at the correct position (index)
-            self.data_grid.insert("", index, values=values)
+        self.model.copy_symmetric()
 
         self.update_ply_numbers()
         self.update_layer_count()
 
     def delete_selected_row(self):
-        selected_item = self.data_grid.selection()
-        if selected_item:
-            self.data_grid.delete(selected_item)
+        selected_index = self.data_grid.selection()
+        if selected_index is not None:
+            self.model.delete_ply(self.get_ply_index(selected_index))
+            self.data_grid.selected = None
             self.update_ply_numbers()
             self.update_layer_count()  # Add this line to update the layer count
 
-            # Delete all entries in the Treeview
-            for item in self.failure_grid.get_children():
-                self.failure_grid.delete(item)
+            # Results of the old layup no longer apply
+            self.clear_calculation()
 
     def delete_all_entries(self):
         # Ask for confirmation before deleting all entries
@@ -635,21 +1094,33 @@ class CompositeMaterialsApp:
         if not confirmed:
             return
 
-        # Delete all entries in the Treeview
-        for item in self.data_grid.get_children():
-            self.data_grid.delete(item)
+        self.model.clear()
+        self.data_grid.selected = None
 
-        # Delete all entries in the Treeview
-        for item in self.failure_grid.get_children():
-            self.failure_grid.delete(item)
+        # Results of the old layup no longer apply
+        self.clear_calculation()
 
         # Update ply numbers
         self.update_ply_numbers()
         self.update_layer_count()
 
     def save_data(self):
-        # TODO
-        pass
+        self.update_layer_count()
+        if self.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to save.")
+            return
+
+        path = tkfiledialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        if not path:
+            return
+
+        self.update_core_thickness()
+
+        # The report is written on its own thread from a copy of the layup, so editing can go on meanwhile
+        arguments = dict(path=path, model=copy.deepcopy(self.model), loads=[self.get_loads()],
+                         side=self.layer_side_var.get(), environment=self.get_environment(),
+                         criterion=self.criterion_var.get())
+        self.start_task("save", report.write_report, arguments, lambda saved: None)
 
     def calculate(self):
         # Check to make sure there is actually a layup
@@ -660,557 +1131,558 @@ class CompositeMaterialsApp:
             messagebox.showerror("Error", "There is nothing to calculate.")
             return  # Exit the function
 
-        if self.layer_count % 2 != 0:
-            # Display popup message
-            messagebox.showerror("Error", "Currently, only symmetric layups with an even number of layers"
-                                          "are supported.")
-            return  # Exit the function
-
-        self.calculate_failure()
+        self.update_core_thickness()
 
-        # Layup properties
-        self.calculate_and_update_off_axis_A_and_a()
-        self.calculate_and_update_off_axis_D_and_d()
-
-        # Get the selected ply
-        selected_item = self.data_grid.selection()
-
-        if not selected_item:
-            # Display warning message
-            messagebox.showwarning("Warning", "No layer is selected. Only global layup properties have "
-                                              "been calculated!")
-
-        # If a ply is selected, calculate its on-axis properties
-        if selected_item:
-            # Retrieve data from the selected item
-            selected_material = self.data_grid.item(selected_item, 'values')[1]
-            selected_orientation = self.data_grid.item(selected_item, 'values')[3]
-            selected_layer_number = self.data_grid.item(selected_item, 'values')[0]
-
-            # Update the material properties
-            material_properties = mp.get_material_properties(selected_material)
-            self.update_tree(self.material_properties_tree, material_properties)
-
-            # Update the strength properties
-            strength_properties = mp.get_strength_properties(selected_material)
-            self.update_tree(self.strength_tree, strength_properties)
-
-            # Calculate on-axis
-            self.calculate_and_update_on_axis_Q_and_S(selected_material)
-
-            # Calculate off-axis
-            self.calculate_and_update_off_axis_Q_and_S(selected_material, selected_orientation)
-
-            # z-coordinates of each ply
-            self.get_ply_z_coordinates()
-
-            if len(self.z_coordinate) <= 0:
-                # Display warning message
-                messagebox.showwarning("Warning", "Not enough layers to calculate the strain or stress!")
-                return  # Exit the function
-
-            # Check which side the user would like to calculate on
-            self.layer_side = self.layer_side_var.get()
+        try:
+            points = int(self.profile_points_var.get())
+        except ValueError:
+            points = 0
+        if points < 1:
+            messagebox.showerror("Error", "The number of points per ply must be a whole number of at least 1.")
+            return
 
-            # Calculate off-axis strain
-            self.calculate_off_axis_strain(selected_layer_number, self.N_1, self.N_2, self.N_6, self.M_1, self.M_2,
-                                           self.M_6)
+        # Get the selected ply; without one the bottom ply is shown at its mid-plane
+        selected_index = self.data_grid.selection()
+        if selected_index is None:
+            ply_index, layer_side = 0, "Middle"
+        else:
+            ply_index, layer_side = self.get_ply_index(selected_index), self.layer_side_var.get()
+
+        # The calculation runs on its own thread from a copy of the layup and supersedes any older request
+        self.calculation_cancel.set()
+        self.calculation_cancel = threading.Event()
+        self.calculation_request += 1
+
+        outcome = {}
+        arguments = dict(outcome=outcome, model=copy.deepcopy(self.model), loads=self.get_loads(),
+                         ply_index=ply_index, layer_side=layer_side, points=points,
+                         criterion=self.criterion_var.get(), environment=self.get_environment(),
+                         cancel=self.calculation_cancel)
+        thread = threading.Thread(target=self.run_calculation, kwargs=arguments, daemon=True)
+        thread.start()
+
+        self.calculation_progress.config(maximum=calculation.STAGES, value=0)
+        self.cancel_calculation_button.config(state="normal")
+        self.root.after(20, self.poll_calculation, self.calculation_request, thread, outcome, selected_index)
+
+    def run_calculation(self, outcome, model, loads, ply_index, layer_side, points, criterion, environment, cancel):
+        try:
+            outcome["result"] = calculation.calculate(
+                model, loads, ply_index, layer_side, points, criterion, cancel=cancel,
+                progress=lambda stage, stages: outcome.update(stage=stage), environment=environment)
+        except calculation.Cancelled:
+            pass
+        except Exception as error:
+            outcome["error"] = error
+
+    def poll_calculation(self, request, thread, outcome, selected_index):
+        # A newer request or Cancel took over
+        if request != self.calculation_request:
+            return
 
-            # Then calculate on-axis strain for the selected layer
-            self.calculate_on_axis_strain(selected_orientation)
+        if thread.is_alive():
+            self.calculation_progress.config(value=outcome.get("stage", 0))
+            self.root.after(20, self.poll_calculation, request, thread, outcome, selected_index)
+            return
 
-            # Then calculate the on-axis stress for the selected layer
-            self.calculate_on_axis_stress(selected_material)
+        self.calculation_progress.config(value=0)
+        self.cancel_calculation_button.config(state="disabled")
 
-    def calculate_and_update_on_axis_Q_and_S(self, material):
-        material_properties = mp.get_material_properties(material)
+        if "error" in outcome:
+            messagebox.showerror("Error", str(outcome["error"]))
+            return
+        if "result" not in outcome:
+            return
 
-        # Check if the required keys are present in the dictionary
-        required_keys = ["E_x", "E_y", "E_s", "ν"]
-        for key in required_keys:
-            if key not in material_properties:
-                messagebox.showerror("Error", f"{key} not found in material properties for {material}")
-                return
+        self.show_calculation(outcome["result"])
 
-        # Extract relevant properties
-        E_x = material_properties["E_x"]
-        E_y = material_properties["E_y"]
-        E_s = material_properties["E_s"]
-        nu = material_properties["ν"]
+        if selected_index is None:
+            # Display warning message
+            messagebox.showwarning("Warning", "No layer is selected. Only global layup properties have "
+                                              "been calculated!")
 
-        # Calculate coefficients for Q matrix
-        if E_x != 0:
-            nu_y = (E_y / E_x) * nu
-            nu_x = nu
-            m = (1 - nu * nu_y) ** -1
+    def cancel_calculation(self):
+        self.calculation_cancel.set()
+        self.calculation_request += 1
+
+        self.calculation_progress.config(value=0)
+        self.cancel_calculation_button.config(state="disabled")
+
+    def start_task(self, name, function, arguments, show, progress=None):
+        # Background jobs run like Calculate: function(cancel=..., **arguments) runs on its own thread, from a copy
+        # of the layup, and supersedes any older request of the same name. show(result) follows on the UI thread,
+        # and with progress the worker's progress(...) calls are passed on to it while the job runs.
+        task = self.tasks[name]
+        task["cancel"].set()
+        task["cancel"] = threading.Event()
+        task["request"] += 1
+
+        outcome = {}
+        if progress is not None:
+            arguments = dict(arguments, progress=lambda *values: outcome.update(progress=values))
+        thread = threading.Thread(target=self.run_task, args=(outcome, function, arguments, task["cancel"]),
+                                  daemon=True)
+        thread.start()
+
+        if task["button"] is not None:
+            task["button"].config(state="normal")
+        self.root.after(20, self.poll_task, name, task["request"], thread, outcome, show, progress)
+
+    def run_task(self, outcome, function, arguments, cancel):
+        try:
+            outcome["result"] = function(cancel=cancel, **arguments)
+        except Exception as error:
+            outcome["error"] = error
+
+    def poll_task(self, name, request, thread, outcome, show, progress=None):
+        # A newer request or Cancel took over
+        task = self.tasks[name]
+        if request != task["request"]:
+            return
 
-            self.on_axis_Q_matrix = np.array([[m*E_x, m*nu_y*E_x, 0],
-                                         [m*nu_y*E_x, m*E_y, 0],
-                                         [0, 0, E_s]])
+        if thread.is_alive():
+            if progress is not None and "progress" in outcome:
+                progress(*outcome["progress"])
+            self.root.after(20, self.poll_task, name, request, thread, outcome, show, progress)
+            return
 
-            self.on_axis_S_matrix = np.linalg.inv(self.on_axis_Q_matrix)
-        else:
-            self.on_axis_Q_matrix = np.zeros((3,3))
-            self.on_axis_S_matrix = np.zeros((3,3))
-
-        for index, values in np.ndenumerate(self.on_axis_Q_matrix):
-            self.update_entry(self.on_axis_Q_matrix_entries[index[0]][index[1]],
-                              self.on_axis_Q_matrix[index[0]][index[1]])
-
-        for index, values in np.ndenumerate(self.on_axis_S_matrix):
-            self.update_entry(self.on_axis_S_matrix_entries[index[0]][index[1]],
-                              self.on_axis_S_matrix[index[0]][index[1]])
-
-    def calculate_and_update_off_axis_Q_and_S(self, material, orientation):
-        # Extract Q_xx, Q_yy, Q_xy, and Q_ss from matrix
-        Q_xx = self.on_axis_Q_matrix[0][0]
-        Q_xy = self.on_axis_Q_matrix[0][1]
-        Q_yx = self.on_axis_Q_matrix[1][0]
-        Q_yy = self.on_axis_Q_matrix[1][1]
-        Q_ss = self.on_axis_Q_matrix[2][2]
-
-        # Calculate U's
-        U_1 = (1/8) * (3 * Q_xx + 3 * Q_yy + 2 * Q_xy + 4 * Q_ss)
-        U_2 = (1/2) * (Q_xx - Q_yy)
-        U_3 = (1/8) * (Q_xx + Q_yy - 2 * Q_xy - 4 * Q_ss)
-        U_4 = (1/8) * (Q_xx + Q_yy + 6 * Q_xy - 4 * Q_ss)
-        U_5 = (1/8) * (Q_xx + Q_yy + - 2 * Q_xy + 4 * Q_ss)
-
-        # Calculate the angle in radians
-        theta = float(orientation) * (np.pi/180.0)
-
-        # Temp matrix
-        temp_matrix = np.array([[U_1, np.cos(2 * theta), np.cos(4 * theta)],
-                                [U_1, -np.cos(2 * theta), np.cos(4 * theta)],
-                                [U_4, 0, -np.cos(4 * theta)],
-                                [U_5, 0, -np.cos(4 * theta)],
-                                [0, (1/2) * np.sin(2 * theta), np.sin(4 * theta)],
-                                [0, (1/2) * np.sin(2 * theta), -np.sin(4 * theta)]])
-        temp_vector = np.array([1, U_2, U_3])
-        temp_off_axis_Q = np.dot(temp_matrix, temp_vector)
-
-        self.off_axis_Q_matrix = np.array([[temp_off_axis_Q[0], temp_off_axis_Q[2], temp_off_axis_Q[4]],
-                                           [temp_off_axis_Q[2], temp_off_axis_Q[1], temp_off_axis_Q[5]],
-                                           [temp_off_axis_Q[4], temp_off_axis_Q[5], temp_off_axis_Q[3]]])
-
-        if Q_xx != 0:
-            self.off_axis_S_matrix = np.linalg.inv(self.off_axis_Q_matrix)
-        else:
-            self.off_axis_S_matrix = np.zeros((3,3))
-
-        for index, values in np.ndenumerate(self.off_axis_Q_matrix):
-            self.update_entry(self.off_axis_Q_matrix_entries[index[0]][index[1]],
-                              self.off_axis_Q_matrix[index[0]][index[1]])
-
-        for index, values in np.ndenumerate(self.off_axis_S_matrix):
-            self.update_entry(self.off_axis_S_matrix_entries[index[0]][index[1]],
-                              self.off_axis_S_matrix[index[0]][index[1]])
-
-    def calculate_and_update_off_axis_A_and_a(self):
-        # Retrieve material properties from the entire layup
-        children = self.data_grid.get_children()
-        last_item = children[-1]
-        material_properties = mp.get_material_properties(self.data_grid.item(last_item, 'values')[1])
-
-        # Check if the required keys are present in the dictionary
-        required_keys = ["E_x", "E_y", "E_s", "ν"]
-        for key in required_keys:
-            if key not in material_properties:
-                messagebox.showerror("Error",
-                                     f"{key} not found in material properties for {self.data_grid.item(last_item, 'values')[1]}")
-                return
-
-        # Extract relevant properties
-        E_x = material_properties["E_x"]
-        E_y = material_properties["E_y"]
-        E_s = material_properties["E_s"]
-        nu = material_properties["ν"]
-
-        # Calculate coefficients for Q matrix
-        if E_x != 0:
-            nu_y = (E_y / E_x) * nu
-            nu_x = nu
-            m = (1 - nu * nu_y) ** -1
-
-            on_axis_Q_matrix = np.array([[m*E_x, m*nu_y*E_x, 0],
-                                         [m*nu_y*E_x, m*E_y, 0],
-                                         [0, 0, E_s]])
+        self.end_task(task)
 
-        else:
-            on_axis_Q_matrix = np.zeros((3,3))
-
-        Q_xx = on_axis_Q_matrix[0][0]
-        Q_xy = on_axis_Q_matrix[0][1]
-        Q_yx = on_axis_Q_matrix[1][0]
-        Q_yy = on_axis_Q_matrix[1][1]
-        Q_ss = on_axis_Q_matrix[2][2]
-
-        # Calculate U's
-        U_1 = (1/8) * (3 * Q_xx + 3 * Q_yy + 2 * Q_xy + 4 * Q_ss)
-        U_2 = (1/2) * (Q_xx - Q_yy)
-        U_3 = (1/8) * (Q_xx + Q_yy - 2 * Q_xy - 4 * Q_ss)
-        U_4 = (1/8) * (Q_xx + Q_yy + 6 * Q_xy - 4 * Q_ss)
-        U_5 = (1/8) * (Q_xx + Q_yy + - 2 * Q_xy + 4 * Q_ss)
-
-        # Initialize V's
-        V_1, V_2, V_3, V_4 = 0, 0, 0, 0
-
-        # Initialize height
-        layup_height = 0
-
-        for item in self.data_grid.get_children():
-            height = float(self.data_grid.item(item, 'values')[2])
-            layup_height += height
-            orientation = float(self.data_grid.item(item, 'values')[3])
-            theta = orientation * (np.pi / 180.0)
-            V_1 += np.cos(2 * theta) * height
-            V_2 += np.cos(4 * theta) * height
-            V_3 += np.sin(2 * theta) * height
-            V_4 += np.sin(4 * theta) * height
-
-        if (layup_height > 0):
-            V_1_star = V_1/layup_height
-            V_2_star = V_2/layup_height
-            V_3_star = V_3/layup_height
-            V_4_star = V_4/layup_height
-        else:
-            V_1_star, V_2_star, V_3_star, V_4_star = 0, 0, 0, 0
+        if "error" in outcome:
+            messagebox.showerror("Error", str(outcome["error"]))
+            return
+        if outcome.get("result") is None:
+            return
 
-        temp_matrix = np.array([[U_1, V_1_star, V_2_star],
-                                [U_1, -V_1_star, V_2_star],
-                                [U_4, 0, -V_2_star],
-                                [U_5, 0, -V_2_star],
-                                [0, (1/2) * V_3_star, V_4_star],
-                                [0, (1/2) * V_3_star, -V_4_star]])
-        temp_vector = np.array([1, U_2, U_3])
+        show(outcome["result"])
+
+    def cancel_task(self, name):
+        task = self.tasks[name]
+        task["cancel"].set()
+        task["request"] += 1
+        self.end_task(task)
+
+    def end_task(self, task):
+        if task["button"] is not None:
+            task["button"].config(state="disabled")
+        if "reset" in task:
+            task["reset"]()
+
+    def show_calculation(self, result):
+        # One pass over the widgets: the failure table redraws its rows in view, the rest only what changed
+        self.calculation = result
+        self.failure_grid.refresh()
+        self.result_view.show(result)
+        self.draw_profile()
+
+    def reload_calculation(self):
+        # New loads on the layup of the result on display are a product with the influence matrices the model keeps,
+        # quick enough for the UI thread. After an edit it takes Calculate again.
+        if self.calculation is None or self.calculation.revision != self.model.revision:
+            return
+        self.show_calculation(calculation.reload(self.calculation, self.model, self.get_loads(),
+                                                 self.get_environment()))
+
+    def clear_calculation(self):
+        self.calculation = None
+        self.failure_grid.selected = None
+        self.failure_grid.refresh()
+        self.profile_canvas.delete("all")
+
+    def get_failure_row(self, row):
+        # The failure table lists the plies top-down, like the layup table
+        return resultview.failure_row(self.calculation, self.calculation.ply_count - 1 - row)
+
+    def draw_profile(self):
+        canvas = self.profile_canvas
+        canvas.delete("all")
+        if self.calculation is None:
+            return
 
-        temp_off_axis_A_star = np.dot(temp_matrix, temp_vector)
-        temp_off_axis_A = temp_off_axis_A_star * layup_height * (10**(-3))
+        width = canvas.winfo_width() if canvas.winfo_width() > 1 else int(canvas["width"])
+        height = canvas.winfo_height() if canvas.winfo_height() > 1 else int(canvas["height"])
+        foreground = ttk.Style().lookup(".", "foreground")
+        margin = 20
+
+        # Value across, z up, with the zero line in the middle
+        lines = resultview.profile_lines(self.calculation, self.profile_component_var.get())
+        points = np.concatenate(lines)
+        extent = max(np.abs(points[:, 0]).max(), 1e-300)
+        bottom, top = self.calculation.profile.z_bottom[0], self.calculation.profile.z_top[-1]
+        scale_x = (width / 2 - margin) / extent
+        scale_z = (height - 2 * margin) / max(top - bottom, 1e-300)
+
+        centre_x = width / 2
+
+        def to_canvas(values):
+            return np.column_stack([centre_x + values[:, 0] * scale_x,
+                                    height - margin - (values[:, 1] - bottom) * scale_z])
+
+        canvas.create_line(centre_x, 0, centre_x, height, fill="#737373")
+
+        # Ply boundaries, as long as they stay apart
+        boundaries = np.union1d(self.calculation.profile.z_bottom, self.calculation.profile.z_top)
+        if len(boundaries) * 4 < height:
+            for z in boundaries:
+                y = to_canvas(np.array([[0, z]]))[0, 1]
+                canvas.create_line(0, y, width, y, fill="#3c3c3c")
+
+        for line in lines:
+            coordinates = to_canvas(line)
+            if len(coordinates) > 1:
+                canvas.create_line(*coordinates.ravel(), fill="#007fff", width=2)
+            else:
+                x, y = coordinates[0]
+                canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill="#007fff", outline="")
+
+        canvas.create_text(width - 5, height / 2, text=self.profile_component_var.get(), anchor="e", fill=foreground)
+        canvas.create_text(centre_x + 5, 5, text="z (mm)", anchor="nw", fill=foreground)
+        canvas.create_text(5, height - 5, text="Scale: {:.3e}".format(extent), anchor="sw", fill=foreground)
+
+    def optimize(self):
+        material = self.material_var.get()
+        if material not in mp.library:
+            messagebox.showerror("Error", "Please select a Material.")
+            return
 
-        self.off_axis_A_matrix = np.array([[temp_off_axis_A[0], temp_off_axis_A[2], temp_off_axis_A[4]],
-                                           [temp_off_axis_A[2], temp_off_axis_A[1], temp_off_axis_A[5]],
-                                           [temp_off_axis_A[4], temp_off_axis_A[5], temp_off_axis_A[3]]])
+        try:
+            angle_set = tuple(float(angle) for angle in self.angle_set_var.get().split(","))
+            thickness = float(self.thickness_var.get())
+            min_plies = int(self.min_plies_var.get())
+            max_plies = int(self.max_plies_var.get())
+            generations = int(self.generations_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Angles, thickness, ply counts and generations must be numbers.")
+            return
 
-        if E_x != 0:
-            self.off_axis_a_matrix = np.linalg.inv(self.off_axis_A_matrix)
-        else:
-            self.off_axis_a_matrix = np.zeros((3, 3))
-
-        for index, values in np.ndenumerate(self.off_axis_A_matrix):
-            self.update_entry(self.off_axis_A_matrix_entries[index[0]][index[1]],
-                              self.off_axis_A_matrix[index[0]][index[1]])
-
-        for index, values in np.ndenumerate(self.off_axis_a_matrix):
-            self.update_entry(self.off_axis_a_matrix_entries[index[0]][index[1]],
-                              self.off_axis_a_matrix[index[0]][index[1]])
-
-    def calculate_and_update_off_axis_D_and_d(self):
-        # Retrieve material properties from the entire layup
-        children = self.data_grid.get_children()
-        last_item = children[-1]
-        material_properties = mp.get_material_properties(self.data_grid.item(last_item, 'values')[1])
-
-        # Check if the required keys are present in the dictionary
-        required_keys = ["E_x", "E_y", "E_s", "ν"]
-        for key in required_keys:
-            if key not in material_properties:
-                messagebox.showerror("Error",
-                                     f"{key} not found in material properties for {self.data_grid.item(last_item, 'values')[1]}")
-                return
-
-        # Extract relevant properties
-        E_x = material_properties["E_x"]
-        E_y = material_properties["E_y"]
-        E_s = material_properties["E_s"]
-        nu = material_properties["ν"]
-
-        # Calculate coefficients for Q matrix
-        if E_x != 0:
-            nu_y = (E_y / E_x) * nu
-            nu_x = nu
-            m = (1 - nu * nu_y) ** -1
-
-            on_axis_Q_matrix = np.array([[m*E_x, m*nu_y*E_x, 0],
-                                         [m*nu_y*E_x, m*E_y, 0],
-                                         [0, 0, E_s]])
+        self.update_core_thickness()
+
+        # The search runs on its own thread and reports the best laminate so far after every generation
+        self.optimize_result = None
+        self.use_layup_button.config(state="disabled")
+        self.optimize_progress.config(maximum=generations, value=0)
+        arguments = dict(material=material, thickness=thickness, loads=[self.get_loads()], angle_set=angle_set,
+                         min_plies=min_plies, max_plies=max_plies, core_thickness=self.model.core_thickness,
+                         generations=generations, criterion=self.criterion_var.get())
+        self.start_task("optimize", optimizer.optimize, arguments, self.show_optimize,
+                        progress=lambda generation, generations, best: self.show_optimize_progress(best))
+
+    def show_optimize_progress(self, result):
+        self.optimize_progress.config(value=result.generations)
+        self.optimize_label.config(text="{} plies, max FI {:.3f}, {} evaluations\n{}".format(
+            result.ply_count, result.max_failure_index, result.evaluations,
+            " / ".join("{:g}".format(angle) for angle in result.angles)))
+
+    def show_optimize(self, result):
+        self.show_optimize_progress(result)
+        self.optimize_progress.config(value=0)
+        self.optimize_result = result
+        self.use_layup_button.config(state="normal")
+        if not result.feasible:
+            messagebox.showwarning("Warning", "No laminate with max FI < 1 was found.")
+
+    def use_optimized_layup(self):
+        result = self.optimize_result
+        if result is None:
+            return
 
-        else:
-            on_axis_Q_matrix = np.zeros((3,3))
+        # The material the search ran with, whatever the dropdown shows by now
+        self.set_layup(result.plies)
 
-        Q_xx = on_axis_Q_matrix[0][0]
-        Q_xy = on_axis_Q_matrix[0][1]
-        Q_yx = on_axis_Q_matrix[1][0]
-        Q_yy = on_axis_Q_matrix[1][1]
-        Q_ss = on_axis_Q_matrix[2][2]
+    def set_layup(self, plies):
+        # Replace the layup by plies given as (material, thickness, angle) from the bottom ply to the top ply
+        self.model.clear()
+        self.data_grid.selected = None
+        self.clear_calculation()
 
-        # Calculate U's
-        U_1 = (1/8) * (3 * Q_xx + 3 * Q_yy + 2 * Q_xy + 4 * Q_ss)
-        U_2 = (1/2) * (Q_xx - Q_yy)
-        U_3 = (1/8) * (Q_xx + Q_yy - 2 * Q_xy - 4 * Q_ss)
-        U_4 = (1/8) * (Q_xx + Q_yy + 6 * Q_xy - 4 * Q_ss)
-        U_5 = (1/8) * (Q_xx + Q_yy + - 2 * Q_xy + 4 * Q_ss)
+        for ply_type, thickness, orientation in plies:
+            self.model.add_ply(ply_type, thickness, orientation)
 
-        # Initialize V's
-        V_1, V_2, V_3, V_4 = 0, 0, 0, 0
+        self.update_ply_numbers()
+        self.update_layer_count()
 
+    def update_core_thickness(self):
         # Get core thickness
         if not self.core_thickness_var.get():
-            core_thickness = 0
+            self.model.set_core_thickness(0)
         else:
-            core_thickness = float(self.core_thickness_var.get())
-
-        # Initialize height
-        half_layup_height = core_thickness
-
-        z_previous = core_thickness
-        z_current = z_previous
-
-        for item in self.data_grid.get_children()[int(len(self.data_grid.get_children())/2):]:
-            height = float(self.data_grid.item(item, 'values')[2])
-            half_layup_height += height
-            z_previous = z_current
-            z_current += height
-            orientation = float(self.data_grid.item(item, 'values')[3])
-            theta = orientation * (np.pi / 180.0)
-            V_1 += (2/3) * np.cos(2 * theta) * (z_current ** 3 - z_previous ** 3)
-            V_2 += (2/3) * np.cos(4 * theta) * (z_current ** 3 - z_previous ** 3)
-            V_3 += (2/3) * np.sin(2 * theta) * (z_current ** 3 - z_previous ** 3)
-            V_4 += (2/3) * np.sin(4 * theta) * (z_current ** 3 - z_previous ** 3)
-
-        layup_height = half_layup_height * 2
-        core_volume_fraction = 2 * core_thickness/layup_height
-        h_star = ((layup_height ** 3)/12) * (1 - (core_volume_fraction ** 3))
-
-        temp_matrix = np.array([[U_1, V_1, V_2],
-                                [U_1, -V_1, V_2],
-                                [U_4, 0, -V_2],
-                                [U_5, 0, -V_2],
-                                [0, (1/2) * V_3, V_4],
-                                [0, (1/2) * V_3, -V_4]])
-        temp_vector = np.array([h_star, U_2, U_3])
-
-        temp_off_axis_D = np.dot(temp_matrix, temp_vector)
-
-        self.off_axis_D_matrix = np.array([[temp_off_axis_D[0], temp_off_axis_D[2], temp_off_axis_D[4]],
-                                           [temp_off_axis_D[2], temp_off_axis_D[1], temp_off_axis_D[5]],
-                                           [temp_off_axis_D[4], temp_off_axis_D[5], temp_off_axis_D[3]]])
-
-        if E_x != 0:
-            self.off_axis_d_matrix = np.linalg.inv(self.off_axis_D_matrix)
-        else:
-            self.off_axis_d_matrix = np.zeros((3, 3))
+            self.model.set_core_thickness(float(self.core_thickness_var.get()))
+
+    def calculate_envelope(self):
+        if self.model.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to calculate.")
+            return
 
-        for index, values in np.ndenumerate(self.off_axis_D_matrix):
-            self.update_entry(self.off_axis_D_matrix_entries[index[0]][index[1]],
-                              self.off_axis_D_matrix[index[0]][index[1]])
+        self.update_core_thickness()
 
-        for index, values in np.ndenumerate(self.off_axis_d_matrix):
-            self.update_entry(self.off_axis_d_matrix_entries[index[0]][index[1]],
-                              self.off_axis_d_matrix[index[0]][index[1]])
+        arguments = dict(model=copy.deepcopy(self.model), plane=self.envelope_plane_var.get(),
+                         criterion=self.criterion_var.get())
+        self.start_task("envelope", envelope.failure_envelope, arguments, self.show_envelope)
 
-    def calculate_off_axis_strain(self, layer_number, N_1, N_2, N_6, M_1, M_2, M_6):
-        # Calculate strain due to in-plane stress
-        N_vector = np.array([N_1, N_2, N_6])
+    def show_envelope(self, result):
+        self.envelope = result
+        self.draw_envelope()
 
-        self.in_plane_off_axis_strain_vector = np.dot(self.off_axis_a_matrix, N_vector) * (10**(-9))
+    def draw_envelope(self):
+        canvas = self.envelope_canvas
+        canvas.delete("all")
 
-        M_vector = np.array([M_1, M_2, M_6])
+        width = canvas.winfo_width() if canvas.winfo_width() > 1 else int(canvas["width"])
+        height = canvas.winfo_height() if canvas.winfo_height() > 1 else int(canvas["height"])
+        centre_x, centre_y = width / 2, height / 2
+        foreground = ttk.Style().lookup(".", "foreground")
 
-        curvature_vector = np.dot(self.off_axis_d_matrix, M_vector)
+        # Axes through the origin
+        canvas.create_line(0, centre_y, width, centre_y, fill="#737373")
+        canvas.create_line(centre_x, 0, centre_x, height, fill="#737373")
 
-        if self.layer_side == "Outer":
-            offset = 0
-        elif self.layer_side == "Inner":
-            offset = self.selected_layer_thickness[int(layer_number) - 1]
-        elif self.layer_side == "Middle":
-            offset = self.selected_layer_thickness[int(layer_number) - 1]/2.0
+        x_label, y_label = self.envelope.axis_labels
+        canvas.create_text(width - 5, centre_y - 5, text=x_label, anchor="se", fill=foreground)
+        canvas.create_text(centre_x + 5, 5, text=y_label, anchor="nw", fill=foreground)
 
-        current_z_coordinate = self.z_coordinate[int(layer_number) - 1]
+        # Rays that never fail cannot be drawn
+        points = self.envelope.points()
+        points = points[np.all(np.isfinite(points), axis=1)]
+        if len(points) < 2:
+            return
 
-        z_coordinate_of_interest = current_z_coordinate
+        extent = np.abs(points).max()
+        scale = 0.9 * min(width, height) / 2 / extent
+        coordinates = np.column_stack([centre_x + points[:, 0] * scale, centre_y - points[:, 1] * scale])
+        canvas.create_line(*coordinates.ravel(), fill="#007fff", width=2)
 
-        if current_z_coordinate <= 0:
-            z_coordinate_of_interest = current_z_coordinate + offset
-        elif current_z_coordinate > 0:
-            z_coordinate_of_interest = current_z_coordinate - offset
+        canvas.create_text(5, height - 5, text="Scale: {:.3e}".format(extent), anchor="sw", fill=foreground)
 
-        self.bending_off_axis_strain_vector = z_coordinate_of_interest * curvature_vector / 1000
+    def export_envelope(self):
+        if self.envelope is None:
+            messagebox.showerror("Error", "Calculate an envelope first.")
+            return
 
-        self.off_axis_strain = self.in_plane_off_axis_strain_vector + self.bending_off_axis_strain_vector
+        path = tkfiledialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
 
-        self.update_tree(self.strain_off_tree, {"epsilon_x": "{:.{sf}e}".format(self.off_axis_strain[0], sf=3 - 1),
-                "epsilon_y": "{:.{sf}e}".format(self.off_axis_strain[1], sf=3 - 1),
-                "epsilon_s": "{:.{sf}e}".format(self.off_axis_strain[2], sf=3 - 1)})
+        self.envelope.to_csv(path)
 
-    def calculate_on_axis_strain(self, orientation):
-        epsilon_1 = self.off_axis_strain[0]
-        epsilon_2 = self.off_axis_strain[1]
-        epsilon_6 = self.off_axis_strain[2]
+    def import_load_cases(self):
+        if self.model.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to calculate.")
+            return
 
-        p = (1 / 2) * (epsilon_1 + epsilon_2)
-        q = (1 / 2) * (epsilon_1 - epsilon_2)
-        r = (1 / 2) * epsilon_6
+        path = tkfiledialog.askopenfilename(filetypes=[("Load cases", "*.xlsx *.xlsm *.csv")])
+        if not path:
+            return
 
-        theta = float(orientation) * (np.pi / 180)
+        self.update_core_thickness()
+
+        # The sheet is read and evaluated on its own thread, against a copy of the layup
+        self.load_cases_label.config(text="")
+        model = copy.deepcopy(self.model)
+        arguments = dict(model=model, load_chunks=loadcases.read_load_case_rows(path),
+                         side=self.layer_side_var.get(), criterion=self.criterion_var.get(),
+                         environment=self.get_environment())
+        self.start_task("load_cases", loadcases.worst_cases, arguments,
+                        lambda result: self.show_load_cases(result, model.plies["angle"]),
+                        progress=lambda done: self.load_cases_label.config(text="{} load cases read".format(done)))
+
+    def show_load_cases(self, result, angles):
+        # angles are those of the layup the cases were evaluated on, which may have been edited since
+        for item in self.load_cases_grid.get_children():
+            self.load_cases_grid.delete(item)
+
+        # Plies are listed top-down, like the layup table; cases are given by their row in the sheet
+        for ply_index in reversed(range(len(result.failure_indices))):
+            self.load_cases_grid.insert("", "end", values=(
+                ply_index + 1,
+                angles[ply_index],
+                "{:.3f}".format(result.failure_indices[ply_index]),
+                laminate.FAILURE_MODES[result.modes[ply_index]],
+                result.case_numbers[ply_index]))
+
+        self.load_cases_label.config(text="{} load cases, governing row {} (ply {}, max FI {:.3f})".format(
+            result.count, result.governing_case_number, result.governing_ply + 1, result.max_failure_index))
+        self.layup_notebook.select(self.layup_load_cases_tab)
+
+    def calculate_hygrothermal_sweep(self):
+        if self.model.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to calculate.")
+            return
 
-        self.epsilon_x = p + q * np.cos(2 * theta) + r * np.sin(2 * theta)
-        self.epsilon_y = p - q * np.cos(2 * theta) - r * np.sin(2 * theta)
-        self.epsilon_s = - 2 * q * np.sin(2 * theta) + 2 * r * np.cos(2 * theta)
+        try:
+            start, stop = float(self.sweep_from_var.get()), float(self.sweep_to_var.get())
+            points = int(self.sweep_points_var.get())
+        except ValueError:
+            points = 0
+        if points < 2:
+            messagebox.showerror("Error", "The sweep needs a ΔT range and at least 2 points.")
+            return
 
-        self.update_tree(self.on_axis_strain_tree, {"epsilon_x": "{:.{sf}e}".format(self.epsilon_x, sf=3 - 1),
-                "epsilon_y": "{:.{sf}e}".format(self.epsilon_y, sf=3 - 1),
-                "epsilon_s": "{:.{sf}e}".format(self.epsilon_s, sf=3 - 1)})
+        self.update_core_thickness()
 
+        arguments = dict(model=copy.deepcopy(self.model), loads=self.get_loads(),
+                         delta_t=np.linspace(start, stop, points), delta_m=self.delta_m,
+                         side=self.layer_side_var.get(), criterion=self.criterion_var.get())
+        self.start_task("hygrothermal", hygrothermal.hygrothermal_sweep, arguments, self.show_hygrothermal_sweep)
 
-    def calculate_on_axis_stress(self, material):
-        material_properties = mp.get_material_properties(material)
+    def show_hygrothermal_sweep(self, result):
+        self.hygrothermal_sweep = result
+        self.draw_hygrothermal_sweep()
 
-        # Check if the required keys are present in the dictionary
-        required_keys = ["E_x", "E_y", "E_s", "ν"]
-        for key in required_keys:
-            if key not in material_properties:
-                messagebox.showerror("Error", f"{key} not found in material properties for {material}")
-                return
+    def draw_hygrothermal_sweep(self):
+        canvas = self.sweep_canvas
+        canvas.delete("all")
 
-        # Extract relevant properties
-        E_x = material_properties["E_x"]
-        E_y = material_properties["E_y"]
-        E_s = material_properties["E_s"]
-        nu = material_properties["ν"]
+        width = canvas.winfo_width() if canvas.winfo_width() > 1 else int(canvas["width"])
+        height = canvas.winfo_height() if canvas.winfo_height() > 1 else int(canvas["height"])
+        foreground = ttk.Style().lookup(".", "foreground")
+        margin = 20
 
+        # Lowest strength ratio against ΔT; points that load no ply never fail and are left out
+        delta_t, ratios = self.hygrothermal_sweep.delta_t, self.hygrothermal_sweep.minimum_ratios
+        finite = np.isfinite(ratios)
+        if finite.sum() < 2:
+            return
 
-        # Calculate coefficients for Q matrix
-        if E_x != 0:
-            nu_y = (E_y / E_x) * nu
-            nu_x = nu
-            m = (1 - nu * nu_y) ** -1
+        low, high = delta_t.min(), delta_t.max()
+        extent = max(ratios[finite].max(), 1)
+        scale_x = (width - 2 * margin) / max(high - low, 1e-300)
+        scale_y = (height - 2 * margin) / extent
+
+        def to_canvas(x, y):
+            return np.column_stack([margin + (x - low) * scale_x, height - margin - y * scale_y])
+
+        # Zero line and first-ply failure at a strength ratio of 1
+        canvas.create_line(margin, height - margin, width - margin, height - margin, fill="#737373")
+        failure = height - margin - scale_y
+        canvas.create_line(margin, failure, width - margin, failure, fill="#d9534f", dash=(4, 2))
+
+        for piece in np.split(np.flatnonzero(finite), np.flatnonzero(np.diff(np.flatnonzero(finite)) > 1) + 1):
+            if len(piece) > 1:
+                coordinates = to_canvas(delta_t[piece], ratios[piece])
+                canvas.create_line(*coordinates.ravel(), fill="#007fff", width=2)
+
+        canvas.create_text(width / 2, height - 5, text="ΔT (K)", anchor="s", fill=foreground)
+        canvas.create_text(margin + 5, 5, text="Min SR", anchor="nw", fill=foreground)
+        canvas.create_text(5, height - 5, text="{:g}".format(low), anchor="sw", fill=foreground)
+        canvas.create_text(width - 5, height - 5, text="{:g}".format(high), anchor="se", fill=foreground)
+        canvas.create_text(5, margin, text="Scale: {:.3e}".format(extent), anchor="sw", fill=foreground)
+
+    def export_hygrothermal_sweep(self):
+        if self.hygrothermal_sweep is None:
+            messagebox.showerror("Error", "Calculate a sweep first.")
+            return
 
-            self.on_axis_Q_matrix = np.array([[m*E_x, m*nu_y*E_x, 0],
-                                         [m*nu_y*E_x, m*E_y, 0],
-                                         [0, 0, E_s]]) * (10**(9))
+        path = tkfiledialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
 
-        else:
-            self.on_axis_Q_matrix = np.zeros((3,3))
+        self.hygrothermal_sweep.to_csv(path)
 
+    def calculate_reliability(self):
+        if self.model.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to calculate.")
+            return
 
-        epsilon_on_axis = np.array([self.epsilon_x, self.epsilon_y, self.epsilon_s])
-        self.sigma_on_axis = np.dot(self.on_axis_Q_matrix, epsilon_on_axis) * (10**(-6))
+        try:
+            samples = int(self.reliability_samples_var.get())
+            seed = int(self.reliability_seed_var.get())
+            stiffness = float(self.reliability_stiffness_var.get()) / 100
+            scatter = reliability.Scatter(stiffness, stiffness, float(self.reliability_strength_var.get()) / 100,
+                                          float(self.reliability_thickness_var.get()) / 100,
+                                          float(self.reliability_angle_var.get()))
+        except ValueError:
+            messagebox.showerror("Error", "Samples and seed must be whole numbers and the scatter must be numbers "
+                                          "of at least 0.")
+            return
+        if samples < 1:
+            messagebox.showerror("Error", "At least one sample is needed.")
+            return
+
+        self.update_core_thickness()
+
+        # The samples are drawn on their own thread, which spreads them over a process pool
+        self.reliability_progress.config(maximum=samples, value=0)
+        model = copy.deepcopy(self.model)
+        arguments = dict(model=model, loads=self.get_loads(), samples=samples, scatter=scatter, seed=seed,
+                         side=self.layer_side_var.get(), criterion=self.criterion_var.get(),
+                         environment=self.get_environment())
+        self.start_task("reliability", reliability.run_reliability, arguments,
+                        lambda result: self.show_reliability(result, model.plies["angle"]),
+                        progress=self.show_reliability_progress)
+
+    def show_reliability_progress(self, done, samples):
+        self.reliability_progress.config(value=done)
+        self.reliability_label.config(text="{} samples".format(done))
+
+    def show_reliability(self, result, angles):
+        # angles are those of the layup the samples were drawn about, which may have been edited since
+        for item in self.reliability_grid.get_children():
+            self.reliability_grid.delete(item)
+
+        # Plies are listed top-down, like the layup table
+        for ply_index in reversed(range(len(result.ply_failures))):
+            self.reliability_grid.insert("", "end", values=(
+                ply_index + 1,
+                angles[ply_index],
+                "{:.3e}".format(result.ply_probabilities[ply_index]),
+                "{:.3f}".format(result.criticality[ply_index])))
+
+        low, high = result.confidence_interval
+        self.reliability_label.config(text="P(FPF) {:.3e} ({:.0%} interval {:.3e} to {:.3e}), {} samples".format(
+            result.probability, result.confidence, low, high, result.samples))
+
+    def calculate_progressive_failure(self):
+        if self.model.layer_count <= 0:
+            messagebox.showerror("Error", "There is nothing to calculate.")
+            return
 
-        self.update_tree(self.on_axis_stress_tree, {"sigma_x": "{:.{sf}e}".format(self.sigma_on_axis[0], sf=3 - 1),
-                "sigma_y": "{:.{sf}e}".format(self.sigma_on_axis[1], sf=3 - 1),
-                "sigma_s": "{:.{sf}e}".format(self.sigma_on_axis[2], sf=3 - 1)})
-
-    def calculate_failure(self):
-        # Layup properties
-        self.calculate_and_update_off_axis_A_and_a()
-        self.calculate_and_update_off_axis_D_and_d()
-
-        self.layer_side = "Middle"
-
-        # Delete all entries in the Treeview
-        for item in self.failure_grid.get_children():
-            self.failure_grid.delete(item)
-
-        for item in self.data_grid.get_children():
-
-            # Get the selected ply
-            selected_item = item
-
-            # Retrieve data from the selected item
-            selected_material = self.data_grid.item(selected_item, 'values')[1]
-            selected_orientation = self.data_grid.item(selected_item, 'values')[3]
-            selected_layer_number = self.data_grid.item(selected_item, 'values')[0]
-
-            # Update the material properties
-            material_properties = mp.get_material_properties(selected_material)
-            self.update_tree(self.material_properties_tree, material_properties)
-
-            # Update the strength properties
-            strength_properties = mp.get_strength_properties(selected_material)
-            self.update_tree(self.strength_tree, strength_properties)
-
-            X_t = strength_properties["X_t"]
-            X_c = strength_properties["X_c"]
-            Y_t = strength_properties["Y_t"]
-            Y_c = strength_properties["Y_c"]
-            S_c = strength_properties["S_c"]
-
-            # Calculate on-axis
-            self.calculate_and_update_on_axis_Q_and_S(selected_material)
-
-            # Calculate off-axis
-            self.calculate_and_update_off_axis_Q_and_S(selected_material, selected_orientation)
-
-            # z-coordinates of each ply
-            self.get_ply_z_coordinates()
-
-            if len(self.z_coordinate) <= 0:
-                # Display warning message
-                messagebox.showwarning("Warning", "Not enough layers to calculate the strain or stress!")
-                return  # Exit the function
-
-            # Calculate off-axis strain
-            self.calculate_off_axis_strain(selected_layer_number, self.N_1, self.N_2, self.N_6, self.M_1, self.M_2,
-                                           self.M_6)
-
-            # Then calculate on-axis strain for the selected layer
-            self.calculate_on_axis_strain(selected_orientation)
-
-            # Then calculate the on-axis stress for the selected layer
-            self.calculate_on_axis_stress(selected_material)
-
-            print(self.sigma_on_axis[0])
-
-            if self.sigma_on_axis[0] <= 0:
-                self.FI_x = -self.sigma_on_axis[0] / X_c
-            elif self.sigma_on_axis[0] > 0:
-                self.FI_x = self.sigma_on_axis[0] / X_t
-
-            if self.sigma_on_axis[1] <= 0:
-                self.FI_y = -self.sigma_on_axis[1] / Y_c
-            elif self.sigma_on_axis[1] > 0:
-                self.FI_y = self.sigma_on_axis[1] / Y_t
-
-            if self.sigma_on_axis[2] <= 0:
-                self.FI_s = -self.sigma_on_axis[2] / S_c
-            elif self.sigma_on_axis[2] > 0:
-                self.FI_s = self.sigma_on_axis[2] / S_c
-
-            self.MOF = ""
-
-            if self.FI_x >= 1:
-                if self.sigma_on_axis[0] <= 0:
-                    self.MOF = "LC"
-                elif self.sigma_on_axis[0] > 0:
-                    self.MOF = "LT"
-            elif self.FI_y >= 1:
-                if self.sigma_on_axis[1] <= 0:
-                    self.MOF = "TC"
-                elif self.sigma_on_axis[1] > 0:
-                    self.MOF = "TT"
-            elif self.FI_s >= 1:
-                self.MOF = "S"
-
-            # Extracting data
-            data = {
-                "Ply Number": selected_layer_number,
-                "Orientation": selected_orientation,
-                "FI x": "{:.3f}".format(self.FI_x),
-                "FI y": "{:.3f}".format(self.FI_y),
-                "FI s": "{:.3f}".format(self.FI_s),
-                "MOF": self.MOF
-            }
-            # Inserting data into the treeview
-            self.failure_grid.insert("", "end", values=(
-                data["Ply Number"],
-                data["Orientation"],
-                data["FI x"],
-                data["FI y"],
-                data["FI s"],
-                data["MOF"]
-            ))
-
-        #self.layer_side_dropdown.current(0)
+        self.update_core_thickness()
+
+        arguments = dict(model=copy.deepcopy(self.model), loads=self.get_loads(), discount=self.discount_var.get())
+        self.start_task("progressive", progressive.progressive_failure, arguments, self.show_progressive_failure)
+
+    def show_progressive_failure(self, result):
+        for item in self.progressive_grid.get_children():
+            self.progressive_grid.delete(item)
+
+        for load_factor, ply_number, mode in result.failures:
+            self.progressive_grid.insert("", "end", values=("{:.3f}".format(load_factor), ply_number, mode))
+
+        summary = "FPF: {:.3f}".format(result.first_ply_failure) if result.failures else "No ply failure"
+        if result.collapsed:
+            summary += "   LPF: {:.3f}".format(result.last_ply_failure)
+        self.progressive_label.config(text=summary)
+
+    def get_loads(self):
+        return np.array([self.N_1, self.N_2, self.N_6, self.M_1, self.M_2, self.M_6], dtype=float)
+
+    def get_environment(self):
+        # (ΔT, ΔM) with ΔM as a fraction, or None at room conditions
+        if self.delta_t == 0 and self.delta_m == 0:
+            return None
+        return np.array([self.delta_t, self.delta_m], dtype=float)
+
+    def get_ply_index(self, row):
+        # Plies are listed top-down while the model stacks them bottom-up
+        return self.model.layer_count - 1 - row
+
+    def get_ply_row(self, row):
+        # Values of a layup table row, read from the model
+        ply_index = self.get_ply_index(row)
+        ply = self.model.plies[ply_index]
+        material = self.model.materials[ply["material"]]
+        return ply_index + 1, material, float(ply["thickness"]), float(ply["angle"])
+
+    def setup_result_view(self):
+        matrices = {"on_axis_Q": self.on_axis_Q_matrix_entries, "on_axis_S": self.on_axis_S_matrix_entries,
+                    "off_axis_Q": self.off_axis_Q_matrix_entries, "off_axis_S": self.off_axis_S_matrix_entries,
+                    "off_axis_A": self.off_axis_A_matrix_entries, "off_axis_a": self.off_axis_a_matrix_entries,
+                    "off_axis_B": self.off_axis_B_matrix_entries, "off_axis_b": self.off_axis_b_matrix_entries,
+                    "off_axis_D": self.off_axis_D_matrix_entries, "off_axis_d": self.off_axis_d_matrix_entries}
+        trees = {"material": self.material_properties_tree, "strength": self.strength_tree,
+                 "off_axis_strain": self.strain_off_tree, "on_axis_strain": self.on_axis_strain_tree,
+                 "on_axis_stress": self.on_axis_stress_tree}
+        self.result_view = resultview.ResultView(matrices, trees)
 
     def setup_matrix(self, parent, matrix_name, row_labels=None, column_labels=None, units=None):
         # Matrix Labels
@@ -1249,71 +1721,20 @@ class CompositeMaterialsApp:
         return matrix_entries
 
     def update_layer_count(self):
-        self.layer_count = len(self.data_grid.get_children())
+        self.layer_count = self.model.layer_count
 
         # Update the tab label with the layer count
         self.layup_notebook.tab(self.layup_tab, text=f"Layer Count: {self.layer_count}")
 
     def update_ply_numbers(self):
-        for index, item in enumerate(self.data_grid.get_children()):
-            ply_number = len(self.data_grid.get_children()) - index
-            self.data_grid.item(item, values=(ply_number,) + self.data_grid.item(item, 'values')[1:])
-
-    def get_ply_z_coordinates(self):
-        # Get core thickness
-        if not self.core_thickness_var.get():
-            core_thickness = 0
-        else:
-            core_thickness = float(self.core_thickness_var.get())
-
-        cumulative_thickness = -core_thickness
-
-        num_layers_half = len(self.data_grid.get_children()) // 2
-        self.z_coordinate = np.zeros(num_layers_half * 2)
-        self.selected_layer_thickness = np.zeros(num_layers_half * 2)
-
-        # Calculate the index for the center layer
-        center_index = num_layers_half - 1
-
-        # Iterate over the first half of the layup in reverse
-        for index, item in enumerate(reversed(self.data_grid.get_children()[:num_layers_half])):
-            thickness = self.data_grid.item(item, 'values')[2]
-            self.selected_layer_thickness[index] = float(thickness)
-            # Calculate z-coordinate relative to the center of the layup
-            cumulative_thickness -= float(thickness)
-            self.z_coordinate[index] = cumulative_thickness
-
-        # Reverse the z-coordinate array
-        self.z_coordinate[:num_layers_half] = np.flip(self.z_coordinate[:num_layers_half])
-        self.selected_layer_thickness[:num_layers_half] = np.flip(self.selected_layer_thickness[:num_layers_half])
-
-        # Concatenate the negative of the array
-        self.z_coordinate[num_layers_half:] = -np.flip(self.z_coordinate[:num_layers_half])
-        self.selected_layer_thickness[num_layers_half:] = np.flip(self.selected_layer_thickness[:num_layers_half])
-
-    def update_tree(self, tree, data):
-        # Clear existing data
-        for item in tree.get_children():
-            tree.delete(item)
-
-        # Insert new data into the tree
-        tree.insert("", "end", values=tuple(data.values()))
-
-    def update_entry(self, entry, value, significant_figures=3):
-        # Set the state to normal, update the entry, and set it back to readonly
-        entry.config(state="normal")
-
-        if value != 0:
-            formatted_value = "{:.{sf}e}".format(value, sf=significant_figures - 1)
-        else:
-            formatted_value = "0"
-
-        entry.delete(0, tk.END)
-        entry.insert(0, formatted_value)
-        entry.config(state="readonly")
+        # Ply numbers come from the model as rows are drawn, so only the rows in view need redrawing
+        self.data_grid.refresh()
 
 
 if __name__ == "__main__":
+    # Worker processes of the optimizer start from this script in the PyInstaller build
+    multiprocessing.freeze_support()
+
     root = tk.Tk()
     app = CompositeMaterialsApp(root)
     root.mainloop()
@@ -1,27 +1,171 @@
 # material_properties.py
 
-# Sample material properties data
-def get_material_properties(ply_type):
-    material_properties = {
-        "T300/5208": {"E_x": 181, "E_y": 10.3, "E_s": 7.17, "ν": 0.28},
-        "B4/5505": {"E_x": 204, "E_y": 18.5, "E_s": 5.59, "ν": 0.23},
-        "AS/H3501": {"E_x": 138, "E_y": 8.96, "E_s": 7.10, "ν": 0.30},
-        "Scotchply 1002": {"E_x": 38.6, "E_y": 8.27, "E_s": 4.14, "ν": 0.26},
-        "Kevlar49/epoxy": {"E_x": 76, "E_y": 5.50, "E_s": 2.30, "ν": 0.34},
-        "Broken layer": {"E_x": 0, "E_y": 0, "E_s": 0, "ν": 0.5}
-    }
+# Material library. Ply systems are kept in an indexed SQLite table: a .db file is opened as is and only the
+# materials that are asked for are read, while .csv and .json files are imported into an in-memory database.
+# Nothing is loaded before the first lookup, so the library adds nothing to startup.
+import csv
+import json
+import os
+import sqlite3
+
+# Stiffness (GPa) and Poisson's ratio, then strengths (MPa)
+MATERIAL_KEYS = ("E_x", "E_y", "E_s", "ν")
+STRENGTH_KEYS = ("X_t", "Y_t", "X_c", "Y_c", "S_c")
+
+# Thermal expansion (1/K) and moisture expansion (per unit moisture content, by weight) along and across the fibres.
+# They are optional: a material without them does not expand
+EXPANSION_KEYS = ("α_x", "α_y", "β_x", "β_y")
+
+# Column names in the database; ν is stored as nu, α and β as alpha and beta
+_COLUMNS = ("E_x", "E_y", "E_s", "nu") + STRENGTH_KEYS + ("alpha_x", "alpha_y", "beta_x", "beta_y")
+_ASCII_KEYS = {"nu": "ν", "alpha_x": "α_x", "alpha_y": "α_y", "beta_x": "β_x", "beta_y": "β_y"}
+
+# Library shipped with the application
+DEFAULT_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "materials.csv")
+
+
+class MaterialLibrary:
+    def __init__(self, path=DEFAULT_LIBRARY):
+        self.path = path
+        self._connection = None
+
+        # Rows that have already been looked up, by name
+        self._rows = {}
+
+        # Bumped whenever materials are imported, so that caches built on the library can be dropped
+        self.version = 0
+
+    def _is_database(self):
+        return os.path.splitext(self.path)[1].lower() in (".db", ".sqlite")
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            if self._is_database():
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._create_table()
+            else:
+                self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+                self._create_table()
+                self.import_file(self.path)
+        return self._connection
+
+    def _create_table(self):
+        self._connection.execute("CREATE TABLE IF NOT EXISTS materials (name TEXT PRIMARY KEY, "
+                                 + ", ".join(f"{column} REAL" for column in _COLUMNS) + ")")
+
+        # Libraries saved before the expansion coefficients existed get them as zeros
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(materials)")}
+        with self._connection:
+            for column in _COLUMNS:
+                if column not in existing:
+                    self._connection.execute(f"ALTER TABLE materials ADD COLUMN {column} REAL DEFAULT 0")
+
+    def get(self, name):
+        """ All properties of a material as a dict, or None if it is not in the library """
+        if name not in self._rows:
+            row = self.connection.execute(f"SELECT {', '.join(_COLUMNS)} FROM materials WHERE name = ?",
+                                          (name,)).fetchone()
+            if row is None:
+                return None
+            self._rows[name] = dict(zip(MATERIAL_KEYS + STRENGTH_KEYS + EXPANSION_KEYS, row))
+        return self._rows[name]
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def names(self, limit=None):
+        return self.search("", limit)
+
+    def search(self, text, limit=None):
+        """ Names containing text, in library order """
+        query = "SELECT name FROM materials WHERE name LIKE ? ESCAPE '\\' ORDER BY rowid"
+        parameters = ("%" + text.replace("%", r"\%").replace("_", r"\_") + "%",)
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters += (limit,)
+        return [row[0] for row in self.connection.execute(query, parameters)]
 
-    return material_properties.get(ply_type, {})
+    def add(self, materials):
+        """ Insert or replace materials given as {name: {property: value}} """
+        rows = []
+        for name, properties in materials.items():
+            properties = dict(properties)
+            for ascii_key, key in _ASCII_KEYS.items():
+                if ascii_key in properties:
+                    properties[key] = properties.pop(ascii_key)
+
+            for key in MATERIAL_KEYS + STRENGTH_KEYS:
+                if key not in properties:
+                    raise ValueError(f"{key} not found in material properties for {name}")
+            for key in EXPANSION_KEYS:
+                if properties.get(key) in (None, ""):
+                    properties[key] = 0.0
+
+            rows.append((name,) + tuple(float(properties[key])
+                                        for key in MATERIAL_KEYS + STRENGTH_KEYS + EXPANSION_KEYS))
+
+        with self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO materials (name, {', '.join(_COLUMNS)}) "
+                                        f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})", rows)
+
+        self._rows.clear()
+        self.version += 1
+
+    def import_file(self, path):
+        """ Import materials from a .csv file with a name column, or a .json list or dict of materials """
+        if os.path.splitext(path)[1].lower() == ".json":
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if isinstance(data, list):
+                data = {entry["name"]: entry for entry in data}
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                data = {row["name"]: row for row in csv.DictReader(file)}
+
+        for properties in data.values():
+            properties.pop("name", None)
+
+        self.add(data)
+
+    def save(self, path):
+        """ Write the library to an indexed SQLite file that can be opened without importing """
+        # A library opened from that very file already holds everything, every change is committed to it
+        if self._is_database() and os.path.exists(path) and os.path.samefile(path, self.path):
+            return
+
+        # Backed up next to the target first, so a failed save leaves the old file in place
+        temporary = path + ".tmp"
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        target = sqlite3.connect(temporary)
+        try:
+            self.connection.backup(target)
+        finally:
+            target.close()
+        os.replace(temporary, path)
+
+
+# Library used by the application
+library = MaterialLibrary()
+
+
+def get_material_properties(ply_type):
+    properties = library.get(ply_type)
+    if properties is None:
+        return {}
+    return {key: properties[key] for key in MATERIAL_KEYS}
 
 
 def get_strength_properties(ply_type):
-    strength_properties = {
-        "T300/5208": {"X_t": 1500, "Y_t": 40, "X_c": 1500, "Y_c": 246, "S_c": 68},
-        "B4/5505": {"X_t": 1260, "Y_t": 61, "X_c": 2500, "Y_c": 202, "S_c": 67},
-        "AS/H3501": {"X_t": 1447, "Y_t": 51.7, "X_c": 1447, "Y_c": 206, "S_c": 93},
-        "Scotchply 1002": {"X_t": 1062, "Y_t": 31, "X_c": 610, "Y_c": 118, "S_c": 72},
-        "Kevlar49/epoxy": {"X_t": 1400, "Y_t": 12, "X_c": 235, "Y_c": 53, "S_c": 34},
-        "Broken layer": {"X_t": 1, "Y_t": 1, "X_c": 1, "Y_c": 1, "S_c": 1},
-    }
-
-    return strength_properties.get(ply_type, {})
+    properties = library.get(ply_type)
+    if properties is None:
+        return {}
+    return {key: properties[key] for key in STRENGTH_KEYS}
+
+
+def get_expansion_properties(ply_type):
+    properties = library.get(ply_type)
+    if properties is None:
+        return {}
+    return {key: properties[key] for key in EXPANSION_KEYS}
@@ -0,0 +1,201 @@
+# optimizer.py
+
+# Stacking-sequence optimizer. Searches symmetric laminates of one ply system, with orientations drawn from a
+# discrete angle set and a ply count within a range, for the thinnest one with max FI < 1 over a set of load cases,
+# under one of criteria.CRITERIA.
+# A genetic algorithm proposes candidates and whole generations are evaluated in array batches, split over a
+# process pool.
+#
+# With a single ply system the weight is proportional to the thickness, so minimising the ply count minimises both.
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import criteria
+import laminate
+import pool
+
+
+class OptimizationResult:
+    def __init__(self, material, angles, thickness, max_failure_index, evaluations, generations, cancelled):
+        self.material = material  # Ply material the stack was checked with
+        self.angles = angles  # Full stack from the bottom ply to the top ply (deg)
+        self.thickness = thickness  # Laminate thickness without the core (mm)
+        self.max_failure_index = max_failure_index  # Worst FI over all plies and load cases
+        self.evaluations = evaluations  # Number of candidate evaluations
+        self.generations = generations  # Number of completed generations
+        self.cancelled = cancelled
+
+    @property
+    def ply_count(self):
+        return len(self.angles)
+
+    @property
+    def feasible(self):
+        return self.max_failure_index < 1
+
+    @property
+    def plies(self):
+        """ (material, thickness, angle) of every ply from the bottom ply to the top ply """
+        thickness = self.thickness / self.ply_count
+        return [(self.material, thickness, angle) for angle in self.angles]
+
+
+def evaluate_stacks(genes, counts, angle_set, q, strengths, thickness, core_thickness, loads,
+                    criterion="Max stress"):
+    """ Worst FI under one of criteria.CRITERIA of a batch of symmetric laminates, at the bottom and the top face
+    of every ply.
+
+    genes (n x h) index into angle_set and give the upper half from the midplane outwards, of which the first
+    counts (n) plies are used. All plies share the on-axis stiffness q (GPa), strengths (MPa) and thickness (mm).
+    loads is an (n_cases x 6) array of (N₁, N₂, N₆, M₁, M₂, M₆). """
+    genes = np.asarray(genes)
+    counts = np.asarray(counts)
+    loads = np.atleast_2d(np.asarray(loads, dtype=float))
+    used = np.arange(genes.shape[1]) < counts[:, None]
+
+    angle = np.asarray(angle_set, dtype=float)[genes]
+    theta = np.radians(angle)
+    weights = np.stack([np.ones_like(theta), np.cos(2 * theta), np.cos(4 * theta),
+                        np.sin(2 * theta), np.sin(4 * theta)], axis=-1) * used[..., None]
+
+    # Upper half plies; the lower half mirrors them, which doubles the lamination sums
+    z_bottom = core_thickness + np.arange(genes.shape[1]) * thickness
+    z_top = z_bottom + thickness
+    a_sums = 2 * thickness * weights.sum(axis=1)
+    d_sums = 2 * np.einsum("nhk,h->nk", weights, (z_top ** 3 - z_bottom ** 3) / 3)
+
+    u = laminate.invariants(q)
+    off_axis_A_matrix = laminate.lamination_matrix(u, *np.moveaxis(a_sums, -1, 0)) * (10**(-3))
+    off_axis_D_matrix = laminate.lamination_matrix(u, *np.moveaxis(d_sums, -1, 0))
+
+    # Mid-plane strains and curvatures per candidate and load case, factorizing every candidate once for all load
+    # cases; symmetric stacks have B = 0, so A and D are solved on their own
+    in_plane_strain = np.swapaxes(np.linalg.solve(off_axis_A_matrix, loads[:, :3].T * (10**(-9))), 1, 2)
+    curvature = np.swapaxes(np.linalg.solve(off_axis_D_matrix, loads[:, 3:].T), 1, 2)
+
+    # Strain at both faces of every upper ply and of its mirror image in the lower half. Stress is linear through a
+    # ply and the FI convex in it, so the worst point of a ply is on one of its faces
+    z = np.stack([z_bottom, z_top, -z_bottom, -z_top], axis=-1)
+    strain = in_plane_strain[:, :, None, None, :] + z[None, None, :, :, None] * curvature[:, :, None, None, :] / 1000
+
+    stiffness = q @ laminate.strain_rotation(angle)
+    stress = np.einsum("nhij,nchsj->nchsi", stiffness, strain) * (10**3)
+
+    failure_indices, _ = criteria.failure_index(stress, strengths, criterion)
+    failure_indices = np.where(used[:, None, :, None], failure_indices, 0)
+    return failure_indices.reshape(len(genes), -1).max(axis=1)
+
+
+def _evaluate(arguments):
+    return evaluate_stacks(*arguments)
+
+
+def optimize(material, thickness, loads, angle_set=(0, 45, -45, 90), min_plies=2, max_plies=32,
+             core_thickness=0.0, population=500, generations=200, mutation_rate=0.05, seed=None, workers=None,
+             criterion="Max stress", progress=None, cancel=None):
+    """ Genetic search for the thinnest symmetric laminate with max FI < 1 under all load cases.
+
+    The default effort is 10⁵ candidate evaluations (population x generations). progress(generation, generations,
+    best) is called after every generation and the run stops early once cancel.is_set() (e.g. a threading.Event)
+    returns True. workers=1 evaluates in this process; a given seed gives the same result for any worker count. """
+    rng = np.random.default_rng(seed)
+    loads = np.atleast_2d(np.asarray(loads, dtype=float))
+    entry = laminate.material_cache.get(material)
+    if criterion not in criteria.CRITERIA:
+        raise ValueError(f"Unknown failure criterion {criterion}")
+
+    # Half-stack ply counts of symmetric laminates within the range
+    min_half = max(1, math.ceil(min_plies / 2))
+    max_half = max(min_half, max_plies // 2)
+
+    genes = rng.integers(0, len(angle_set), size=(population, max_half))
+    counts = rng.integers(min_half, max_half + 1, size=population)
+
+    # One batch per worker and generation
+    batches = pool.worker_count(workers)
+
+    def evaluate(executor, genes, counts):
+        chunks = np.array_split(np.arange(len(genes)), batches)
+        arguments = [(genes[chunk], counts[chunk], angle_set, entry.q, entry.strengths, thickness, core_thickness,
+                      loads, criterion) for chunk in chunks if len(chunk)]
+        results = executor.map(_evaluate, arguments) if executor else map(_evaluate, arguments)
+        return np.concatenate(list(results))
+
+    def fitness(counts, max_index):
+        # Feasible designs rank by ply count and then by margin, infeasible ones after all feasible ones
+        return np.where(max_index < 1, counts + max_index, max_half + 1 + max_index)
+
+    best = None
+    best_fitness = np.inf
+    evaluations = 0
+    generation = 0
+    cancelled = False
+
+    executor = ProcessPoolExecutor(max_workers=batches) if batches > 1 else None
+    try:
+        while generation < generations:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+
+            max_index = evaluate(executor, genes, counts)
+            scores = fitness(counts, max_index)
+            evaluations += len(genes)
+            generation += 1
+
+            leader = np.argmin(scores)
+            if scores[leader] < best_fitness:
+                best_fitness = scores[leader]
+                half = [float(angle_set[gene]) for gene in genes[leader, :counts[leader]]]
+                best = OptimizationResult(material, half[::-1] + half, 2 * counts[leader] * thickness,
+                                          max_index[leader], evaluations, generation, False)
+            best.evaluations = evaluations
+            best.generations = generation
+
+            if progress is not None:
+                progress(generation, generations, best)
+
+            genes, counts = _next_generation(rng, genes, counts, scores, len(angle_set), min_half, max_half,
+                                             mutation_rate)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if best is not None:
+        best.cancelled = cancelled
+    return best
+
+
+def _next_generation(rng, genes, counts, scores, angle_count, min_half, max_half, mutation_rate, elite=2):
+    population, length = genes.shape
+
+    # Binary tournaments pick the parents
+    contenders = rng.integers(0, population, size=(2, population, 2))
+    parents = np.where(scores[contenders[:, :, 0]] <= scores[contenders[:, :, 1]],
+                       contenders[:, :, 0], contenders[:, :, 1])
+
+    # One-point crossover of the half stacks, the ply count comes from either parent
+    point = rng.integers(0, length + 1, size=(population, 1))
+    children = np.where(np.arange(length) < point, genes[parents[0]], genes[parents[1]])
+    child_counts = np.where(rng.random(population) < 0.5, counts[parents[0]], counts[parents[1]])
+
+    # Mutations: new orientations, adding or dropping a ply and swapping neighbouring plies
+    mutate = rng.random(children.shape) < mutation_rate
+    children = np.where(mutate, rng.integers(0, angle_count, size=children.shape), children)
+
+    resize = rng.random(population) < mutation_rate
+    child_counts = np.clip(child_counts + resize * rng.choice([-1, 1], size=population), min_half, max_half)
+
+    swap = np.flatnonzero(rng.random(population) < mutation_rate)
+    if len(swap) and length > 1:
+        position = rng.integers(0, length - 1, size=len(swap))
+        first = children[swap, position]
+        children[swap, position] = children[swap, position + 1]
+        children[swap, position + 1] = first
+
+    # The best designs survive unchanged
+    leaders = np.argsort(scores)[:elite]
+    children[:len(leaders)] = genes[leaders]
+    child_counts[:len(leaders)] = counts[leaders]
+
+    return children, child_counts
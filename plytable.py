@@ -0,0 +1,132 @@
+# plytable.py
+
+# Virtualized table. A Treeview only ever holds the rows that fit in its window; the rows themselves are produced
+# on demand from a row(index) callback, e.g. reading the laminate model, and scrolling just rewrites the values of
+# those few items. Inserting, moving or renumbering rows therefore costs one redraw of the visible rows, whatever
+# the number of rows behind the table.
+import tkinter as tk
+from tkinter import ttk
+
+# Fallback row and heading height (px) until the first row has been drawn
+ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+
+
+class VirtualTable:
+    def __init__(self, parent, columns, row, count):
+        self.row = row  # row(index) -> tuple of values, index 0 being the first row of the table
+        self.count = count  # count() -> number of rows
+        self.offset = 0  # Index of the first row in view
+        self.selected = None  # Index of the selected row, which need not be in view
+        self.visible = 1  # Number of rows that fit in the window
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", selectmode="browse")
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+
+        self.items = []  # Treeview items, reused for whichever rows are in view
+
+        self.tree.bind("<Configure>", self.on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Up>", lambda event: self.step(-1))
+        self.tree.bind("<Down>", lambda event: self.step(1))
+        self.tree.bind("<Prior>", lambda event: self.step(-self.visible))
+        self.tree.bind("<Next>", lambda event: self.step(self.visible))
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+
+    # Treeview-like configuration is passed through
+    def heading(self, column, **options):
+        return self.tree.heading(column, **options)
+
+    def column(self, column, **options):
+        return self.tree.column(column, **options)
+
+    def refresh(self):
+        """ Redraw the rows in view, e.g. after the rows behind the table changed """
+        count = self.count()
+        self.offset = max(0, min(self.offset, count - self.visible))
+        if self.selected is not None and self.selected >= count:
+            self.selected = count - 1 if count else None
+
+        shown = max(0, min(self.visible, count - self.offset))
+        while len(self.items) < shown:
+            self.items.append(self.tree.insert("", "end"))
+        while len(self.items) > shown:
+            self.tree.delete(self.items.pop())
+
+        for index, item in enumerate(self.items):
+            self.tree.item(item, values=self.row(self.offset + index))
+
+        # Selection follows the row, not the item
+        if self.selected is not None and self.offset <= self.selected < self.offset + shown:
+            item = self.items[self.selected - self.offset]
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+            self.tree.focus(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if count:
+            self.scrollbar.set(self.offset / count, (self.offset + shown) / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def select(self, index):
+        """ Select a row, or nothing for None, and scroll it into view """
+        self.selected = index
+        if index is not None:
+            self.see(index)
+        self.refresh()
+
+    def see(self, index):
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible:
+            self.offset = index - self.visible + 1
+
+    def selection(self):
+        """ Index of the selected row, or None """
+        return self.selected
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.refresh()
+        return "break"
+
+    def step(self, rows):
+        # Keyboard navigation moves the selection, scrolling at the edges of the window
+        count = self.count()
+        if count:
+            start = self.selected if self.selected is not None else self.offset
+            self.select(max(0, min(count - 1, start + rows)))
+        return "break"
+
+    def yview(self, *arguments):
+        # Scrollbar command: ("moveto", fraction) or ("scroll", number, "units" / "pages")
+        if arguments[0] == "moveto":
+            self.offset = int(round(float(arguments[1]) * self.count()))
+        elif arguments[0] == "scroll":
+            self.offset += int(arguments[1]) * (self.visible if arguments[2] == "pages" else 1)
+        self.refresh()
+
+    def on_configure(self, event):
+        # The number of rows in view follows the height of the window
+        row_height, heading_height = ROW_HEIGHT, HEADING_HEIGHT
+        if self.items:
+            box = self.tree.bbox(self.items[0])
+            if box:
+                heading_height, row_height = box[1], box[3]
+        self.visible = max(1, (event.height - heading_height) // max(1, row_height))
+        self.refresh()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.items:
+            self.selected = self.offset + self.items.index(selection[0])
+
+    def on_mouse_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
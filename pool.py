@@ -0,0 +1,47 @@
+# pool.py
+
+# Process pools for the batch runs. Sweeps, reliability runs and the optimizer cut their work into chunks of
+# plain arrays, resolved from the material cache beforehand, so a worker process needs neither the material
+# library nor anything else from the parent.
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def worker_count(workers=None):
+    """ Number of processes for workers, one per CPU by default """
+    return workers or os.cpu_count() or 1
+
+
+def map_chunks(function, arguments, workers=None, cancel=None):
+    """ function(argument) for every one of an iterable of arguments, yielded as the chunks finish, which is not
+    necessarily in order. No new chunk starts once cancel.is_set() returns True, the chunks in flight still
+    finish. workers=1 evaluates in this process. """
+    count = worker_count(workers)
+    if count == 1:
+        for argument in arguments:
+            if cancel is not None and cancel.is_set():
+                return
+            yield function(argument)
+        return
+
+    # Keep a couple of chunks per worker in flight, so neither the queue nor the results pile up
+    pending = iter(arguments)
+    running = set()
+    exhausted = False
+    with ProcessPoolExecutor(max_workers=count) as executor:
+        try:
+            while True:
+                while not exhausted and len(running) < 2 * count and not (cancel is not None and cancel.is_set()):
+                    try:
+                        running.add(executor.submit(function, next(pending)))
+                    except StopIteration:
+                        exhausted = True
+                if not running:
+                    break
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+        finally:
+            for future in running:
+                future.cancel()
@@ -0,0 +1,165 @@
+# progressive.py
+
+# Progressive ply failure up to last-ply failure. A reference load case is ramped in fixed load steps; whenever
+# plies reach FI >= 1 they are discounted and the load is re-checked with the reduced stiffness before the ramp
+# continues. Between two failure events the laminate is linear, so the whole stretch of load steps is filled in
+# at once, and a failure only subtracts the failed ply's share from the ABD matrix instead of rebuilding it.
+import numpy as np
+import laminate
+
+# Discount rules: "full" removes a failed ply entirely, which is what replacing it by "Broken layer" does by hand.
+# "mode" only removes the transverse and shear stiffness on matrix failure (TT, TC, S) and everything on fibre
+# failure (LT, LC).
+DISCOUNTS = ("full", "mode")
+
+# Ply states
+INTACT, MATRIX_FAILED, FAILED = 0, 1, 2
+
+
+class ProgressiveFailureResult:
+    def __init__(self, load_factors, strains, failures, collapsed):
+        self.load_factors = load_factors  # Load factor of every point on the curve
+        self.strains = strains  # Midplane strains and curvatures (ε₁, ε₂, ε₆, k₁, k₂, k₆) of every point
+        self.failures = failures  # Failure sequence as (load factor, ply number, mode) tuples
+        self.collapsed = collapsed  # Whether the ramp reached last-ply failure
+
+    @property
+    def first_ply_failure(self):
+        return self.failures[0][0] if self.failures else None
+
+    @property
+    def last_ply_failure(self):
+        return self.load_factors[-1] if self.collapsed else None
+
+
+def _compliance(stiffness, loads):
+    # Unloaded parts of the response do not need an invertible stiffness
+    if not np.any(loads):
+        return np.zeros(len(loads)), True
+    if np.linalg.cond(stiffness) > 1e12:
+        return None, False
+    return np.linalg.solve(stiffness, loads), True
+
+
+def _response(abd, loads):
+    # Midplane strains and curvatures (1/m); without coupling the in-plane and bending blocks are solved on their
+    # own, so that e.g. pure bending does not need any in-plane stiffness left
+    loads = loads * laminate.LOAD_SCALE
+    if laminate.is_symmetric(abd):
+        in_plane_strain, in_plane_ok = _compliance(abd[:3, :3], loads[:3])
+        curvature, bending_ok = _compliance(abd[3:, 3:], loads[3:])
+        if not (in_plane_ok and bending_ok):
+            return None
+        response = np.concatenate([in_plane_strain, curvature])
+    else:
+        response, ok = _compliance(abd, loads)
+        if not ok:
+            return None
+    return response * laminate.RESPONSE_SCALE
+
+
+def progressive_failure(model, loads, load_step=None, discount="full", side=None, max_steps=100000,
+                        cancel=None):
+    """ Ramp the load case (N₁, N₂, N₆, M₁, M₂, M₆) until last-ply failure, checking every ply at one of
+    laminate.LAYER_SIDES or by default at both of its faces. Returns None once cancel.is_set() returns True. """
+    if discount not in DISCOUNTS:
+        raise ValueError(f"Unknown discount {discount}")
+
+    loads = np.asarray(loads, dtype=float)
+    if model.layer_count == 0 or not np.any(loads):
+        raise ValueError("A layup and a non-zero load case are needed for a progressive failure analysis.")
+
+    angle = model.plies["angle"]
+    # Stress is linear through a ply, so its worst point is on one of its faces (faces x n_plies)
+    sides = ("Outer", "Inner") if side is None else (side,)
+    z = np.stack([model.ply_z(face) for face in sides])
+    rotation = laminate.strain_rotation(angle)
+    strengths = model.strengths()
+
+    # Per-ply stiffness and the full ABD matrix (GPa, mm) it adds up to
+    on_axis_q = model.on_axis_q_matrices().copy()
+    z_bottom, z_top = model.plies["z_bottom"], model.plies["z_top"]
+    off_axis_q = laminate.off_axis_q(model.ply_invariants(), angle)
+    abd = laminate.abd_matrix(off_axis_q, model.plies["thickness"], z_bottom, z_top)
+
+    state = np.where(on_axis_q[:, 0, 0] == 0, FAILED, INTACT)
+
+    if load_step is None:
+        # Default to a hundred steps up to first-ply failure
+        failure_indices = np.stack([model.evaluate_load_cases(loads, face)[1] for face in sides])
+        load_step = 1 / failure_indices.max() / 100 if failure_indices.max() > 0 else 1.0
+
+    step = 0
+    load_factors = []
+    strains = []
+    failures = []
+    collapsed = False
+
+    while True:
+        if cancel is not None and cancel.is_set():
+            return None
+
+        # Response to the reference load with the current stiffness
+        unit_strain = _response(abd, loads)
+        if unit_strain is None:
+            collapsed = True
+            break
+
+        off_axis_strain = unit_strain[:3] + z[..., None] * unit_strain[3:] / 1000
+        unit_stress = np.einsum("nij,fnj->fni", on_axis_q, np.einsum("nij,fnj->fni", rotation, off_axis_strain)) \
+            * (10**3)
+        unit_indices, _ = laminate.max_stress_failure(unit_stress, strengths)
+
+        # Load factor at which each of the remaining plies fails
+        max_index = np.where(state == FAILED, 0, unit_indices.max(axis=(0, 2)))
+        if not np.any(max_index > 0):
+            break
+        failure_step = max(step, int(np.ceil(1 / max_index.max() / load_step - 1e-9)))
+        if failure_step > max_steps:
+            failure_step = max_steps
+
+        # Linear stretch up to and including the failure load
+        stretch = np.arange(step, failure_step + 1) * load_step
+        load_factors.append(stretch)
+        strains.append(stretch[:, None] * unit_strain)
+
+        if failure_step == max_steps:
+            break
+
+        step = failure_step
+        load_factor = step * load_step
+        failure_indices, modes = laminate.max_stress_failure(unit_stress * load_factor * (1 + 1e-9), strengths)
+        face = np.argmax(failure_indices.max(axis=-1), axis=0)[None]
+        modes = np.take_along_axis(modes, face, axis=0)[0]
+        failed = np.flatnonzero((state != FAILED) & (modes > 0))
+        if len(failed) == 0:
+            step += 1
+            continue
+
+        for ply_index in failed:
+            mode = modes[ply_index]
+            failures.append((load_factor, ply_index + 1, laminate.FAILURE_MODES[mode]))
+
+            # Take the failed ply's contribution out of the ABD matrix
+            old_q = off_axis_q[ply_index].copy()
+            if discount == "mode" and mode >= 3:
+                on_axis_q[ply_index] *= [[1, 0, 0], [0, 0, 0], [0, 0, 0]]
+                state[ply_index] = MATRIX_FAILED
+            else:
+                on_axis_q[ply_index] = 0
+                state[ply_index] = FAILED
+
+            off_axis_q[ply_index] = laminate.off_axis_q(laminate.invariants(on_axis_q[ply_index]),
+                                                        angle[ply_index])
+            ply = slice(ply_index, ply_index + 1)
+            abd += laminate.abd_matrix((off_axis_q[ply_index] - old_q)[None], model.plies["thickness"][ply],
+                                       z_bottom[ply], z_top[ply])
+
+        if np.all(state == FAILED):
+            collapsed = True
+            break
+
+    load_factors = np.concatenate(load_factors) if load_factors else np.zeros(0)
+    strains = np.concatenate(strains) if strains else np.zeros((0, 6))
+
+    return ProgressiveFailureResult(load_factors, strains, failures, collapsed)
@@ -0,0 +1,156 @@
+# reliability.py
+
+# Monte Carlo first-ply failure. Every sample is the base laminate with its own scatter on every ply: moduli,
+# Poisson's ratio, strengths and thickness are lognormal about their nominal values with a given coefficient of
+# variation, the orientation normal about the nominal angle. Samples go through laminate.evaluate_laminates in
+# chunks, spread over a process pool (see pool), and a chunk only hands back failure counts, so memory is
+# bounded by the chunks in flight however many samples are drawn.
+#
+# Chunk k draws from its own stream, SeedSequence(seed, spawn_key=(k,)), and the counts are integers, so the same
+# seed and chunk size give the same result whatever the number of workers or the order the chunks finish in.
+import math
+from statistics import NormalDist
+import numpy as np
+import criteria
+import laminate
+import pool
+
+
+class Scatter:
+    """ Coefficients of variation of the moduli E_x, E_y, E_s, of ν, of the strengths and of the ply thickness,
+    and the standard deviation of the ply orientation in degrees """
+
+    def __init__(self, stiffness=0.05, poisson=0.05, strength=0.08, thickness=0.03, angle=1.0):
+        self.stiffness = float(stiffness)
+        self.poisson = float(poisson)
+        self.strength = float(strength)
+        self.thickness = float(thickness)
+        self.angle = float(angle)
+
+        if min(self.stiffness, self.poisson, self.strength, self.thickness, self.angle) < 0:
+            raise ValueError("Scatter cannot be negative.")
+
+    def to_dict(self):
+        return {"stiffness": self.stiffness, "poisson": self.poisson, "strength": self.strength,
+                "thickness": self.thickness, "angle": self.angle}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class ReliabilityResult:
+    def __init__(self, samples, failures, ply_failures, governing, seed, confidence=0.95):
+        self.samples = samples  # Number of samples evaluated
+        self.failures = failures  # Samples in which some ply has a strength ratio ≤ 1
+        self.ply_failures = ply_failures  # Samples in which each ply fails (1 = bottom ply)
+        self.governing = governing  # Failed samples in which each ply has the lowest strength ratio
+        self.seed = seed  # Entropy of the run, to repeat it
+        self.confidence = confidence
+
+    @property
+    def probability(self):
+        """ Estimated probability of first-ply failure """
+        return self.failures / self.samples if self.samples else math.nan
+
+    @property
+    def confidence_interval(self):
+        """ Wilson score interval of the failure probability, which stays meaningful without failures """
+        return wilson_interval(self.failures, self.samples, self.confidence)
+
+    @property
+    def ply_probabilities(self):
+        return self.ply_failures / self.samples if self.samples else np.full(len(self.ply_failures), math.nan)
+
+    @property
+    def criticality(self):
+        """ Share of the failed samples in which each ply is the first to fail """
+        return self.governing / max(self.failures, 1)
+
+
+def wilson_interval(failures, samples, confidence=0.95):
+    if samples == 0:
+        return math.nan, math.nan
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = failures / samples
+    denominator = 1 + z * z / samples
+    centre = (p + z * z / (2 * samples)) / denominator
+    half_width = z / denominator * math.sqrt(p * (1 - p) / samples + z * z / (4 * samples * samples))
+    lower = centre - half_width if failures > 0 else 0.0
+    upper = centre + half_width if failures < samples else 1.0
+    return max(0.0, lower), min(1.0, upper)
+
+
+def _lognormal(rng, coefficient, shape):
+    # Factors with mean 1 and the given coefficients of variation (broadcast over the last axis)
+    sigma = np.sqrt(np.log1p(np.square(coefficient)))
+    return np.exp(sigma * rng.standard_normal(shape) - sigma * sigma / 2)
+
+
+def _evaluate_chunk(arguments):
+    (properties, strengths, expansion, thickness, angle, core_thickness, loads, environment, scatter, seed, chunk,
+     count, side, criterion) = arguments
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    plies = len(thickness)
+
+    # Always drawn in this order, so a chunk's samples depend on nothing but the seed and the chunk number
+    properties = properties * _lognormal(rng, np.array([scatter.stiffness] * 3 + [scatter.poisson]),
+                                         (count, plies, 4))
+    strengths = strengths * _lognormal(rng, scatter.strength, (count, plies, 5))
+    thickness = thickness * _lognormal(rng, scatter.thickness, (count, plies))
+    angle = angle + scatter.angle * rng.standard_normal((count, plies))
+
+    q = laminate.stiffness_matrix(*np.moveaxis(properties, -1, 0))
+    stress, _, _ = laminate.evaluate_laminates(q, strengths, thickness, angle, core_thickness, loads, side,
+                                               expansion, environment)
+    ratios, _ = criteria.strength_ratio(stress, strengths, criterion)
+
+    governing = np.argmin(ratios, axis=1)
+    failed = ratios[np.arange(count), governing] <= 1
+    return (count, int(failed.sum()), (ratios <= 1).sum(axis=0),
+            np.bincount(governing[failed], minlength=plies))
+
+
+def run_reliability(model, loads, samples, scatter=None, seed=None, chunk_size=10000, side="Middle",
+                    criterion="Max stress", workers=None, confidence=0.95, progress=None, cancel=None,
+                    environment=None):
+    """ Probability of first-ply failure of a laminate under loads (N₁, N₂, N₆, M₁, M₂, M₆) in an environment
+    (ΔT, ΔM) from samples Monte Carlo samples with the given Scatter, under one of criteria.CRITERIA.
+
+    Without a seed fresh entropy is drawn and kept in the result. progress(done, samples) is called after every
+    chunk and the run stops after the chunks in flight once cancel.is_set() returns True, with the samples done
+    so far. workers=1 evaluates in this process. """
+    if model.layer_count == 0:
+        raise ValueError("There is nothing to calculate.")
+    if samples < 1 or chunk_size < 1:
+        raise ValueError("The number of samples and the chunk size must be at least 1.")
+
+    scatter = scatter if scatter is not None else Scatter()
+    seed = seed if seed is not None else np.random.SeedSequence().entropy
+
+    # Nominal ply data comes from the material cache the model evaluates with; the moduli and ν are scattered,
+    # hence the engineering constants behind the cached S
+    plies = model.plies
+    properties = laminate.engineering_constants(model.on_axis_s_matrices())
+    environment = np.asarray(environment, dtype=float) if environment is not None else None
+    shared = (properties, model.strengths(), model.expansion_coefficients(), plies["thickness"].copy(),
+              plies["angle"].copy(), model.core_thickness, np.asarray(loads, dtype=float), environment, scatter, seed)
+
+    def arguments(chunk):
+        count = min(chunk_size, samples - chunk * chunk_size)
+        return shared + (chunk, count, side, criterion)
+
+    totals = [0, 0, np.zeros(model.layer_count, dtype=np.int64), np.zeros(model.layer_count, dtype=np.int64)]
+
+    def add(counts):
+        for index, count in enumerate(counts):
+            totals[index] += count
+        if progress is not None:
+            progress(totals[0], samples)
+
+    chunks = range(-(-samples // chunk_size))
+    for counts in pool.map_chunks(_evaluate_chunk, (arguments(chunk) for chunk in chunks), workers, cancel):
+        add(counts)
+
+    return ReliabilityResult(*totals, seed, confidence)
@@ -0,0 +1,148 @@
+# report.py
+
+# Excel reports. The workbook is written with openpyxl in write-only mode: rows go straight to the sheet's
+# temporary file as they are appended, so a report with many load cases times many plies streams to disk in
+# constant memory. Load cases are evaluated in chunks for the same reason.
+import itertools
+import numpy as np
+import criteria
+import laminate
+import loadcases
+
+# Matrix entries in the order they are written, by Voigt index (1, 2, 6)
+MATRIX_ENTRIES = ("11", "12", "16", "21", "22", "26", "61", "62", "66")
+
+
+def _matrix_rows(name, matrix, unit):
+    yield [f"{name} ({unit})"]
+    for row in matrix:
+        yield [None] + [float(value) for value in row]
+    yield []
+
+
+def write_report(path, model, loads, side="Middle", chunk_size=1000, worst=None, progress=None, cancel=None,
+                 environment=None, criterion="Max stress"):
+    """ Write the layup, ply and laminate stiffness, strains, stresses and failure indices of every
+    (N₁, N₂, N₆, M₁, M₂, M₆) load case, in one environment (ΔT, ΔM), to an .xlsx workbook. The failure sheet
+    gives the max-stress index of every stress component next to the FI and mode under one of criteria.CRITERIA.
+
+    loads is an (n x 6) array or an iterable of such chunks, or of (loads, rows) pairs from
+    loadcases.read_load_case_rows, which number the cases by their sheet row. worst adds the
+    loadcases.WorstCases of the same load cases as a sheet of its own. progress(done, total) is called after every
+    chunk of load cases, with total None for an iterable, and nothing is saved once cancel.is_set() returns True.
+    Returns whether the workbook was saved. """
+    from openpyxl import Workbook
+
+    if isinstance(loads, (np.ndarray, list, tuple)):
+        loads = np.atleast_2d(np.asarray(loads, dtype=float))
+        total = len(loads)
+        chunks = (loads[start:start + chunk_size] for start in range(0, total, chunk_size))
+    else:
+        total = None
+        chunks = iter(loads)
+
+    # Load cases read from a sheet are numbered by their row there, which blank rows set apart from their count
+    first = next(chunks, None)
+    case_label = "Row" if isinstance(first, tuple) else "Case"
+    chunks = itertools.chain([first], chunks) if first is not None else iter(())
+
+    count = model.layer_count
+    if count == 0:
+        raise ValueError("There is nothing to report.")
+
+    # Plies are listed top-down, like the layup table
+    order = np.arange(count)[::-1]
+    materials = model.ply_materials()
+    plies = model.plies
+    angle = plies["angle"]
+
+    workbook = Workbook(write_only=True)
+
+    sheet = workbook.create_sheet("Layup")
+    sheet.append(["Ply Number", "Ply Type", "Thickness (mm)", "Orientation (deg)", "z bottom (mm)", "z top (mm)"])
+    for ply_index in order:
+        ply = plies[ply_index]
+        sheet.append([int(ply_index + 1), materials[ply_index], float(ply["thickness"]), float(ply["angle"]),
+                      float(ply["z_bottom"]), float(ply["z_top"])])
+    sheet.append([])
+    sheet.append(["Core thickness (mm)", model.core_thickness])
+    sheet.append(["Layer side", side])
+    sheet.append(["Failure criterion", criterion])
+    if environment is not None:
+        sheet.append(["ΔT (K)", float(environment[0])])
+        sheet.append(["ΔM", float(environment[1])])
+
+    sheet = workbook.create_sheet("Ply stiffness")
+    sheet.append(["Ply Number", "Matrix", "Unit"] + list(MATRIX_ENTRIES))
+    matrices = (("Q", model.on_axis_q_matrices(), "GPa"), ("S", model.on_axis_s_matrices(), "1/GPa"),
+                ("Q off-axis", model.off_axis_q_matrices(), "GPa"),
+                ("S off-axis", model.off_axis_s_matrices(), "1/GPa"))
+    for ply_index in order:
+        for name, matrix, unit in matrices:
+            sheet.append([int(ply_index + 1), name, unit] + [float(value) for value in matrix[ply_index].ravel()])
+
+    off_axis_a_compliance, off_axis_b_compliance, off_axis_d_compliance = model.compliance_matrices()
+    sheet = workbook.create_sheet("Laminate stiffness")
+    for name, matrix, unit in (("A", model.a_matrix(), "GPa·m"), ("a", off_axis_a_compliance, "1/(GPa·m)"),
+                               ("B", model.b_matrix(), "N"), ("b", off_axis_b_compliance, "1/N"),
+                               ("D", model.d_matrix(), "N·m"), ("d", off_axis_d_compliance, "1/(N·m)")):
+        for row in _matrix_rows(name, matrix, unit):
+            sheet.append(row)
+
+    if worst is not None:
+        sheet = workbook.create_sheet("Worst cases")
+        sheet.append(["Ply Number", "Orientation", "Max FI", "MOF", worst.case_label])
+        for ply_index in order:
+            sheet.append([int(ply_index + 1), float(angle[ply_index]), float(worst.failure_indices[ply_index]),
+                          laminate.FAILURE_MODES[worst.modes[ply_index]], int(worst.case_numbers[ply_index])])
+        sheet.append([])
+        sheet.append(["Load cases", worst.count])
+        sheet.append([f"Governing {worst.case_label.lower()}", worst.governing_case_number])
+        sheet.append(["Governing ply", worst.governing_ply + 1])
+
+    # The load case, strain and failure sheets are filled side by side, one chunk of load cases at a time
+    load_sheet = workbook.create_sheet("Load cases")
+    load_sheet.append([case_label, "N₁ (N/m)", "N₂ (N/m)", "N₆ (N/m)", "M₁ (N)", "M₂ (N)", "M₆ (N)"])
+    strain_sheet = workbook.create_sheet("Strains and stresses")
+    strain_sheet.append([case_label, "Ply Number", "ε₁", "ε₂", "ε₆", "εₓ", "εᵧ", "εₛ",
+                         "σₓ (MPa)", "σᵧ (MPa)", "σₛ (MPa)"])
+    failure_sheet = workbook.create_sheet("Failure")
+    failure_sheet.append([case_label, "Ply Number", "Orientation", "Max stress FI x", "Max stress FI y",
+                          "Max stress FI s", f"FI ({criterion})", "MOF"])
+
+    z = model.ply_z(side)
+    strengths = model.strengths()
+    response_matrix = model.response_matrix()
+    start = 0
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            workbook.close()
+            return False
+
+        chunk, rows = loadcases.split_chunk(chunk)
+        numbers = [int(row) for row in rows] if rows is not None else range(start + 1, start + len(chunk) + 1)
+        for number, load in zip(numbers, chunk):
+            load_sheet.append([number] + [float(value) for value in load])
+
+        response = model.equivalent_loads(chunk, environment) @ response_matrix.T
+        off_axis_strain = response[:, None, :3] + z[:, None] * response[:, None, 3:] / 1000
+        on_axis_strain = laminate.to_on_axis_strain(off_axis_strain, angle)
+        stress, component_indices, _ = model.evaluate_load_cases(chunk, side, environment)
+        failure_indices, modes = criteria.failure_index(stress, strengths, criterion)
+
+        for case, number in enumerate(numbers):
+            for ply_index in order:
+                strain_sheet.append([number, int(ply_index + 1)]
+                                    + off_axis_strain[case, ply_index].tolist()
+                                    + on_axis_strain[case, ply_index].tolist() + stress[case, ply_index].tolist())
+                failure_sheet.append([number, int(ply_index + 1), float(angle[ply_index])]
+                                     + component_indices[case, ply_index].tolist()
+                                     + [float(failure_indices[case, ply_index]),
+                                        laminate.FAILURE_MODES[modes[case, ply_index]]])
+
+        start += len(chunk)
+        if progress is not None:
+            progress(start, total)
+
+    workbook.save(path)
+    return True
@@ -0,0 +1,162 @@
+# resultfile.py
+
+# Result files for batch runs too large to keep in memory. A file is a fixed-size header followed by the raw array
+# in C order, so np.memmap opens it without reading it and post-processing slices straight from disk. The header
+# is a JSON object with the shape, the dtype, the names of the axes and of the last axis' fields and a hash of the
+# layup that produced the results. .npy files have no room for the hash, hence the format of their own.
+#
+# Streams of unknown length (load case sheets) are appended through a ResultWriter, which fills in the final shape
+# when it is closed; results of known size (sweeps) are preallocated with create() and filled in place, a chunk at
+# a time, from any number of processes.
+#
+# What the axes hold depends on the run:
+#   batch  (case x ply x point x value): one laminate, every load case at the sample points through every ply
+#          given as fractions of the ply thickness in the header, from the model's cached profile influence
+#   sweep  (point x ply x value): every grid point is a laminate of its own, so the first axis is the laminates
+#          axis; plies are sampled at the sweep's side only, since each laminate is solved once without a profile
+import hashlib
+import json
+import os
+import numpy as np
+
+MAGIC = b"LAYUP RESULTS 1\n"
+
+# Header bytes including MAGIC, so the data starts on a page boundary
+HEADER_SIZE = 4096
+
+# Values stored per ply: on-axis stresses in MPa and the failure index under the chosen criterion
+FIELDS = ("σₓ", "σᵧ", "σₛ", "FI")
+
+
+def layup_digest(plies, core_thickness=0.0):
+    """ Hash of a layup given as (material, thickness, angle) tuples from the bottom ply to the top ply """
+    layup = {"plies": [[material, float(thickness), float(angle)] for material, thickness, angle in plies],
+             "core_thickness": float(core_thickness)}
+    return hashlib.sha256(json.dumps(layup, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def model_digest(model):
+    plies = [(material, ply["thickness"], ply["angle"]) for material, ply in zip(model.ply_materials(), model.plies)]
+    return layup_digest(plies, model.core_thickness)
+
+
+def _header(shape, dtype, layup, axes, fields, metadata):
+    header = {"shape": [int(size) for size in shape], "dtype": np.dtype(dtype).str, "layup": layup,
+              "axes": list(axes), "fields": list(fields), **metadata}
+    text = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    if len(MAGIC) + len(text) + 1 > HEADER_SIZE:
+        raise ValueError("The result file header is too long.")
+    return MAGIC + text.ljust(HEADER_SIZE - len(MAGIC) - 1) + b"\n"
+
+
+class ResultFile:
+    def __init__(self, path, header, data):
+        self.path = path
+        self.header = header  # Everything the header holds, see _header
+        self.data = data  # np.memmap of the results
+
+    @property
+    def shape(self):
+        return tuple(self.header["shape"])
+
+    @property
+    def layup(self):
+        return self.header["layup"]
+
+    @property
+    def axes(self):
+        return self.header["axes"]
+
+    @property
+    def fields(self):
+        return self.header["fields"]
+
+    def chunks(self, chunk_size=10000):
+        """ (start, view) pairs over the first axis, so nothing beyond a chunk is paged in at once """
+        for start in range(0, len(self.data), chunk_size):
+            yield start, self.data[start:start + chunk_size]
+
+    def worst(self, field="FI", chunk_size=10000):
+        """ Highest value of a field over the first axis and the index it occurs at, for every entry of the axes in
+        between (e.g. every ply) """
+        column = self.fields.index(field)
+        values = np.full(self.shape[1:-1], -np.inf)
+        indices = np.zeros(self.shape[1:-1], dtype=np.int64)
+        for start, chunk in self.chunks(chunk_size):
+            chunk = chunk[..., column]
+            worst = np.argmax(chunk, axis=0)
+            worst_values = np.take_along_axis(chunk, worst[None], axis=0)[0]
+            better = worst_values > values
+            values[better] = worst_values[better]
+            indices[better] = start + worst[better]
+        return values, indices
+
+    def flush(self):
+        self.data.flush()
+
+
+def open_results(path, mode="r", layup=None):
+    """ Result file at path with its data memory-mapped in mode "r" or "r+", checked against a layup hash if one
+    is given """
+    with open(path, "rb") as file:
+        block = file.read(HEADER_SIZE)
+    if not block.startswith(MAGIC) or len(block) < HEADER_SIZE:
+        raise ValueError(f"{os.path.basename(path)} is not a result file.")
+    header = json.loads(block[len(MAGIC):].decode("utf-8"))
+    if layup is not None and header["layup"] != layup:
+        raise ValueError(f"{os.path.basename(path)} holds the results of a different layup.")
+
+    shape = tuple(header["shape"])
+    if 0 in shape:
+        data = np.zeros(shape, dtype=header["dtype"])
+    else:
+        data = np.memmap(path, dtype=header["dtype"], mode=mode, offset=HEADER_SIZE, shape=shape)
+    return ResultFile(path, header, data)
+
+
+def create(path, shape, layup, dtype=np.float64, axes=(), fields=FIELDS, **metadata):
+    """ Result file of a given shape, allocated on disk without writing the data, to be filled in place """
+    with open(path, "wb") as file:
+        file.write(_header(shape, dtype, layup, axes, fields, metadata))
+        file.truncate(HEADER_SIZE + int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+    return open_results(path, "r+")
+
+
+class ResultWriter:
+    """ Result file filled by appending along the first axis. The file only appears under its name once closed,
+    with its final shape in the header """
+
+    def __init__(self, path, item_shape, layup, dtype=np.float64, axes=(), fields=FIELDS, **metadata):
+        self.path = path
+        self.item_shape = tuple(item_shape)
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._header = (layup, axes, fields, metadata)
+        self._file = open(path + ".tmp", "wb")
+        self._file.write(_header((0,) + self.item_shape, self.dtype, *self._header))
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        if values.shape[1:] != self.item_shape:
+            raise ValueError(f"Results of shape {values.shape[1:]} do not fit a file of {self.item_shape}")
+        values.tofile(self._file)
+        self.count += len(values)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_header((self.count,) + self.item_shape, self.dtype, *self._header))
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.path + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
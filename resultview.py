@@ -0,0 +1,120 @@
+# resultview.py
+
+# Display of a CalculationResult. render() formats everything a result puts on screen, without touching Tk, and
+# ResultView remembers what each widget currently shows, so a new result only pushes the cells whose text
+# changed. The per-ply failure table is not rendered here: it is a plytable.VirtualTable that reads its rows
+# straight from the result.
+import logging
+import tkinter as tk
+import numpy as np
+import laminate
+
+logger = logging.getLogger(__name__)
+
+# Through-thickness plot components: label -> (ThroughThicknessProfile values name, Voigt index)
+PROFILE_COMPONENTS = {
+    "σₓ (MPa)": ("on_axis_stress", 0), "σᵧ (MPa)": ("on_axis_stress", 1), "σₛ (MPa)": ("on_axis_stress", 2),
+    "σ₁ (MPa)": ("off_axis_stress", 0), "σ₂ (MPa)": ("off_axis_stress", 1), "σ₆ (MPa)": ("off_axis_stress", 2),
+    "εₓ": ("on_axis_strain", 0), "εᵧ": ("on_axis_strain", 1), "εₛ": ("on_axis_strain", 2),
+    "ε₁": ("off_axis_strain", 0), "ε₂": ("off_axis_strain", 1), "ε₆": ("off_axis_strain", 2),
+}
+
+
+def format_value(value, significant_figures=3):
+    if value != 0:
+        return "{:.{sf}e}".format(value, sf=significant_figures - 1)
+    return "0"
+
+
+def format_matrix(matrix):
+    return tuple(tuple(format_value(value) for value in row) for row in np.asarray(matrix))
+
+
+def format_vector(vector):
+    return tuple("{:.{sf}e}".format(value, sf=3 - 1) for value in vector)
+
+
+def render(result):
+    """ Text of every matrix (3 x 3 tuples) and single-row tree (tuples) showing a result, keyed by name """
+    return {
+        "material": tuple(result.material_properties.values()),
+        "strength": tuple(result.strength_properties.values()),
+        "on_axis_Q": format_matrix(result.on_axis_Q_matrix),
+        "on_axis_S": format_matrix(result.on_axis_S_matrix),
+        "off_axis_Q": format_matrix(result.off_axis_Q_matrix),
+        "off_axis_S": format_matrix(result.off_axis_S_matrix),
+        "off_axis_A": format_matrix(result.off_axis_A_matrix),
+        "off_axis_a": format_matrix(result.off_axis_a_matrix),
+        "off_axis_B": format_matrix(result.off_axis_B_matrix),
+        "off_axis_b": format_matrix(result.off_axis_b_matrix),
+        "off_axis_D": format_matrix(result.off_axis_D_matrix),
+        "off_axis_d": format_matrix(result.off_axis_d_matrix),
+        "off_axis_strain": format_vector(result.off_axis_strain),
+        "on_axis_strain": format_vector(result.on_axis_strain),
+        "on_axis_stress": format_vector(result.on_axis_stress),
+    }
+
+
+def failure_row(result, ply_index):
+    """ Failure table values of a ply (0 = bottom ply) at its worst sample point """
+    fi_x, fi_y, fi_s = result.failure_indices[ply_index]
+    return (ply_index + 1, float(result.angles[ply_index]), "{:.3f}".format(fi_x), "{:.3f}".format(fi_y),
+            "{:.3f}".format(fi_s), "{:.3f}".format(result.strength_ratios[ply_index]),
+            laminate.FAILURE_MODES[result.modes[ply_index]],
+            "{:.4g}".format(result.worst_z[ply_index]))
+
+
+def profile_lines(result, component):
+    """ (value, z) polylines (n x 2) of a PROFILE_COMPONENTS label through the laminate, from the bottom up. The
+    line breaks wherever plies do not touch, i.e. across a core """
+    name, index = PROFILE_COMPONENTS[component]
+    profile = result.profile
+    values = profile.values(name)[..., index]
+    points = np.column_stack([values.ravel(), profile.z.ravel()])
+
+    gaps = np.flatnonzero(~np.isclose(profile.z_bottom[1:], profile.z_top[:-1])) + 1
+    return np.split(points, gaps * profile.z.shape[1])
+
+
+class ResultView:
+    def __init__(self, matrices, trees):
+        self.matrices = matrices  # Name -> 3 x 3 nested list of Entry widgets
+        self.trees = trees  # Name -> single-row Treeview
+        self.shown = {}  # Name -> text currently on screen
+
+    def show(self, result):
+        """ Push the values of a result that differ from what is on screen """
+        for name, values in render(result).items():
+            shown = self.shown.get(name)
+            if values == shown:
+                continue
+
+            if name in self.matrices:
+                for i, row in enumerate(values):
+                    for j, value in enumerate(row):
+                        if shown is None or shown[i][j] != value:
+                            self.set_entry(self.matrices[name][i][j], value)
+            else:
+                self.set_row(self.trees[name], values)
+            self.shown[name] = values
+
+        # On-axis stresses per ply, for debugging only
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("σₓ (MPa) per ply, top ply first: %s", result.on_axis_stresses[::-1, 0])
+
+    @staticmethod
+    def set_entry(entry, value):
+        # Read-only entries have to be made editable for the update
+        entry.config(state="normal")
+        entry.delete(0, tk.END)
+        entry.insert(0, value)
+        entry.config(state="readonly")
+
+    @staticmethod
+    def set_row(tree, values):
+        # The single row is rewritten in place once it exists
+        items = tree.get_children()
+        if items:
+            tree.item(items[0], values=values)
+        else:
+            tree.insert("", "end", values=values)
@@ -0,0 +1,170 @@
+# sensitivity.py
+
+# Analytic sensitivities. Q̄ and the strain rotation are trigonometric polynomials in the ply angles and the
+# lamination sums are polynomials in the ply faces, so all their derivatives are closed form. The ABD matrix is
+# factorized once, and the derivative of the midplane response for a variable p is one more right-hand side of the
+# same solve, d(ABD⁻¹ N)/dp = -ABD⁻¹ (dABD/dp) ABD⁻¹ N. The gradient with respect to every variable therefore costs
+# about one evaluation instead of one or two per variable with finite differences.
+#
+# Variables are named like sweep parameters: "angle:k" (per degree) and "thickness:k" (per mm) of ply k (1 = bottom
+# ply), "core_thickness" (per mm) and the loads "N1" ... "M6". Failure indices are the max-stress ones of the
+# failure table; where a stress is exactly zero its tension side is differentiated.
+import csv
+import numpy as np
+import laminate
+
+# Load variable names, in the order of the resultants (N₁, N₂, N₆, M₁, M₂, M₆)
+LOADS = ("N1", "N2", "N6", "M1", "M2", "M6")
+
+
+class Sensitivities:
+    def __init__(self, variables, stresses, stress_gradients, failure_indices, failure_index_gradients,
+                 abd_gradients):
+        self.variables = variables  # Variable names, the last axis of every gradient
+        self.stresses = stresses  # On-axis stresses (σₓ, σᵧ, σₛ) in MPa of every ply (n_plies x 3)
+        self.stress_gradients = stress_gradients  # (n_plies x 3 x n_variables)
+        self.failure_indices = failure_indices  # Max-stress (FI x, FI y, FI s) of every ply (n_plies x 3)
+        self.failure_index_gradients = failure_index_gradients  # (n_plies x 3 x n_variables)
+        self.abd_gradients = abd_gradients  # d[[A, B], [B, D]] in GPa and mm units (n_variables x 6 x 6)
+
+    def index(self, name):
+        if name not in self.variables:
+            raise ValueError(f"Unknown sensitivity variable {name}")
+        return self.variables.index(name)
+
+    @property
+    def governing_components(self):
+        """ Component (0 = x, 1 = y, 2 = s) giving the max FI of every ply """
+        return np.argmax(self.failure_indices, axis=-1)
+
+    @property
+    def max_failure_indices(self):
+        return self.failure_indices.max(axis=-1)
+
+    @property
+    def max_failure_index_gradients(self):
+        """ Gradient of the max FI of every ply (n_plies x n_variables), from its governing component """
+        plies = np.arange(len(self.failure_indices))
+        return self.failure_index_gradients[plies, self.governing_components]
+
+    @property
+    def a_gradients(self):
+        """ dA per unit of every variable (n_variables x 3 x 3) in GPa·m """
+        return self.abd_gradients[:, :3, :3] * (10**(-3))
+
+    @property
+    def b_gradients(self):
+        """ dB in N """
+        return self.abd_gradients[:, :3, 3:] * (10**3)
+
+    @property
+    def d_gradients(self):
+        """ dD in N·m """
+        return self.abd_gradients[:, 3:, 3:]
+
+    def to_csv(self, path):
+        """ Max FI of every ply, top ply first, and its derivative with respect to every variable """
+        gradients = self.max_failure_index_gradients
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["Ply Number", "Max FI"] + [f"d/d{name}" for name in self.variables])
+            for ply_index in reversed(range(len(gradients))):
+                writer.writerow([ply_index + 1, "{:.6e}".format(self.max_failure_indices[ply_index])]
+                                + ["{:.6e}".format(value) for value in gradients[ply_index]])
+
+
+def variable_names(count):
+    return ([f"angle:{ply}" for ply in range(1, count + 1)] + [f"thickness:{ply}" for ply in range(1, count + 1)]
+            + ["core_thickness"] + list(LOADS))
+
+
+def _blocks(parts):
+    # [[A, B], [B, D]] (... x 6 x 6) from A, B and D stacked on axis -3
+    a, b, d = parts[..., 0, :, :], parts[..., 1, :, :], parts[..., 2, :, :]
+    return np.concatenate([np.concatenate([a, b], axis=-1), np.concatenate([b, d], axis=-1)], axis=-2)
+
+
+def _face_gradients(count):
+    # Derivatives of the ply faces z_bottom and z_top (n_plies x n_plies + 1) with respect to the ply thicknesses
+    # and the core half-thickness: a ply moves up with every thickness below it, the midplane with half of all of
+    # them, and the core pushes the upper half up and the lower half down
+    below = np.tri(count, k=-1)
+    core = np.where(np.arange(count) >= count // 2, 1.0, -1.0)
+    z_bottom = np.column_stack([below - 0.5, core])
+    z_top = np.column_stack([below + np.eye(count) - 0.5, core])
+    return z_bottom, z_top
+
+
+def sensitivities(model, loads, side="Middle"):
+    """ Gradients of the on-axis stresses, max-stress failure indices and ABD matrix of a laminate under loads
+    (N₁, N₂, N₆, M₁, M₂, M₆) with respect to every ply angle, ply thickness, the core thickness and every load """
+    count = model.layer_count
+    if count == 0:
+        raise ValueError("There is nothing to calculate.")
+
+    plies = model.plies
+    angle, thickness, z_bottom, z_top = plies["angle"], plies["thickness"], plies["z_bottom"], plies["z_top"]
+    q, off_axis_q_matrices = model.on_axis_q_matrices(), model.off_axis_q_matrices()
+    loads = np.asarray(loads, dtype=float)
+    abd = model.abd_matrix()
+
+    # dABD for the angles: only the ply's own Q̄ turns, weighted by its lamination sums
+    weights = np.stack([thickness, (z_top ** 2 - z_bottom ** 2) / 2, (z_top ** 3 - z_bottom ** 3) / 3], axis=-1)
+    q_derivative = laminate.off_axis_q_derivative(model.ply_invariants(), angle)
+    angle_gradients = _blocks(weights[:, :, None, None] * q_derivative[:, None])
+
+    # dABD for the thicknesses and the core: every Q̄ stays, the faces move
+    face_bottom, face_top = _face_gradients(count)
+    weight_gradients = np.stack([np.column_stack([np.eye(count), np.zeros(count)]),
+                                 z_top[:, None] * face_top - z_bottom[:, None] * face_bottom,
+                                 z_top[:, None] ** 2 * face_top - z_bottom[:, None] ** 2 * face_bottom], axis=1)
+    geometry_gradients = _blocks(np.einsum("nkv,nij->vkij", weight_gradients, off_axis_q_matrices))
+
+    abd_gradients = np.concatenate([angle_gradients, geometry_gradients, np.zeros((6, 6, 6))])
+
+    # Midplane response and its derivatives in the ABD units, all from one factorization of ABD
+    structure = 2 * count + 1
+    right_hand_sides = np.column_stack([laminate.LOAD_SCALE * loads, np.diag(laminate.LOAD_SCALE)])
+    solved = laminate.solve_abd(abd, right_hand_sides)
+    response = solved[:, 0]
+    response_gradients = np.column_stack([
+        -laminate.solve_abd(abd, (abd_gradients[:structure] @ response).T), solved[:, 1:]])
+    response, response_gradients = (response * laminate.RESPONSE_SCALE,
+                                    response_gradients * laminate.RESPONSE_SCALE[:, None])
+
+    # Evaluation point of every ply and how it moves
+    z = laminate.ply_position(z_bottom, z_top, side)
+    lower = (z_bottom + z_top <= 0)[:, None]
+    if side == "Middle":
+        z_gradients = (face_bottom + face_top) / 2
+    elif side == "Outer":
+        z_gradients = np.where(lower, face_bottom, face_top)
+    else:
+        z_gradients = np.where(lower, face_top, face_bottom)
+    z_gradients = np.column_stack([np.zeros((count, count)), z_gradients, np.zeros((count, 6))])
+
+    # Off-axis strain ε = ε₀ + z κ and its derivatives (n_plies x 3 x n_variables)
+    strain = response[:3] + z[:, None] * response[3:] / 1000
+    strain_gradients = (response_gradients[None, :3] + z[:, None, None] * response_gradients[None, 3:] / 1000
+                        + response[3:][None, :, None] * z_gradients[:, None, :] / 1000)
+
+    # σ = Q T(θ) ε, where T only depends on the ply's own angle
+    rotation = laminate.strain_rotation(angle)
+    on_axis_strain_gradients = rotation @ strain_gradients
+    plies_index = np.arange(count)
+    on_axis_strain_gradients[plies_index, :, plies_index] += np.einsum(
+        "nij,nj->ni", laminate.strain_rotation_derivative(angle), strain)
+
+    stresses = np.einsum("nij,nj->ni", q, np.einsum("nij,nj->ni", rotation, strain)) * (10**3)
+    stress_gradients = q @ on_axis_strain_gradients * (10**3)
+
+    # FI x and FI y follow the tension or compression branch of their stress, FI s the sign of the shear
+    failure_indices, _ = laminate.max_stress_failure(stresses, model.strengths())
+    X_t, Y_t, X_c, Y_c, S_c = (model.strengths()[:, i] for i in range(5))
+    slopes = np.stack([np.where(stresses[:, 0] >= 0, 1 / X_t, -1 / X_c),
+                       np.where(stresses[:, 1] >= 0, 1 / Y_t, -1 / Y_c),
+                       np.where(stresses[:, 2] >= 0, 1 / S_c, -1 / S_c)], axis=-1)
+    failure_index_gradients = slopes[:, :, None] * stress_gradients
+
+    return Sensitivities(variable_names(count), stresses, stress_gradients, failure_indices,
+                         failure_index_gradients, abd_gradients)
@@ -0,0 +1,259 @@
+# sweep.py
+
+# Parametric sweeps. A sweep varies ply thicknesses, ply orientations, the core half-thickness and the load
+# resultants of a base laminate over a full grid. Grid points are numbered in C order over the parameters and cut
+# into chunks of consecutive points; a process pool evaluates the chunks through laminate.evaluate_laminates and
+# one of criteria.CRITERIA, and every finished chunk is written to its own CSV file at once, so memory stays
+# bounded by the number of chunks in flight whatever the size of the grid.
+#
+# A sweep directory holds a manifest.json with the spec, the chunk size, the criterion and a hash of the material
+# properties next to the chunk_XXXXXXXX.csv files.
+# Chunk files only appear once complete (written to a temporary file, then renamed), so running the same spec
+# into the same directory again skips the finished chunks and continues a killed run where it stopped.
+#
+# On request the σₓ, σᵧ, σₛ and FI of every ply at every point also go to results.dat, a resultfile preallocated
+# for the whole grid. Workers write their chunk's rows in place before its CSV file appears. Plies are sampled at
+# the side of the run only, with no through-thickness axis, see resultfile.
+import csv
+import hashlib
+import json
+import os
+import numpy as np
+import criteria
+import laminate
+import pool
+import resultfile
+
+# Load parameter names, in the order of the resultants (N₁, N₂, N₆, M₁, M₂, M₆)
+LOADS = ("N1", "N2", "N6", "M1", "M2", "M6")
+
+MANIFEST = "manifest.json"
+RESULTS = "results.dat"
+
+
+class SweepSpec:
+    """ Base laminate and the parameter grid around it.
+
+    plies are (material, thickness, angle) tuples from the bottom ply to the top ply and loads is the base load
+    case (N₁, N₂, N₆, M₁, M₂, M₆). parameters is a list of (name, values) pairs; the names are "core_thickness",
+    one of LOADS, or "thickness" / "angle" optionally followed by the ply numbers they apply to (1 = bottom ply),
+    e.g. "angle:3,6". Without ply numbers the value applies to every ply. """
+
+    def __init__(self, plies, core_thickness=0.0, loads=(0, 0, 0, 0, 0, 0), parameters=()):
+        self.plies = [(material, float(thickness), float(angle)) for material, thickness, angle in plies]
+        self.core_thickness = float(core_thickness)
+        self.loads = [float(load) for load in loads]
+        self.parameters = [(name, [float(value) for value in values]) for name, values in parameters]
+
+        if not self.plies:
+            raise ValueError("A sweep needs at least one ply.")
+        if len(self.loads) != 6:
+            raise ValueError("The base load case needs the six resultants N₁, N₂, N₆, M₁, M₂, M₆.")
+        for name, values in self.parameters:
+            self._target(name)
+            if not values:
+                raise ValueError(f"Sweep parameter {name} has no values")
+
+    @classmethod
+    def from_model(cls, model, loads, parameters=()):
+        plies = [(material, ply["thickness"], ply["angle"])
+                 for material, ply in zip(model.ply_materials(), model.plies)]
+        return cls(plies, model.core_thickness, loads, parameters)
+
+    @property
+    def shape(self):
+        return tuple(len(values) for _, values in self.parameters)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def names(self):
+        return [name for name, _ in self.parameters]
+
+    def to_dict(self):
+        return {"plies": self.plies, "core_thickness": self.core_thickness, "loads": self.loads,
+                "parameters": self.parameters}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["plies"], data["core_thickness"], data["loads"], data["parameters"])
+
+    def digest(self):
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _target(self, name):
+        # Resolve a parameter name to (field, ply indices) with field in "thickness", "angle", "core", "load"
+        if name == "core_thickness":
+            return "core", None
+        if name in LOADS:
+            return "load", LOADS.index(name)
+
+        field, _, plies = name.partition(":")
+        if field not in ("thickness", "angle"):
+            raise ValueError(f"Unknown sweep parameter {name}")
+        if not plies:
+            return field, np.arange(len(self.plies))
+
+        try:
+            numbers = np.array([int(ply) for ply in plies.split(",")])
+        except ValueError:
+            raise ValueError(f"Invalid ply numbers in sweep parameter {name}")
+        if np.any(numbers < 1) or np.any(numbers > len(self.plies)):
+            raise ValueError(f"Sweep parameter {name} refers to plies outside 1 to {len(self.plies)}")
+        return field, numbers - 1
+
+
+def _evaluate_chunk(arguments):
+    spec, q, strengths, start, stop, path, side, criterion, results = arguments
+    index = np.arange(start, stop)
+    count = len(index)
+
+    thickness = np.tile([thickness for _, thickness, _ in spec.plies], (count, 1))
+    angle = np.tile([angle for _, _, angle in spec.plies], (count, 1))
+    core_thickness = np.full(count, spec.core_thickness)
+    loads = np.tile(spec.loads, (count, 1))
+
+    # Later parameters override earlier ones that set the same quantity
+    positions = np.unravel_index(index, spec.shape) if spec.parameters else ()
+    columns = []
+    for (name, values), position in zip(spec.parameters, positions):
+        value = np.asarray(values)[position]
+        columns.append(value)
+        field, target = spec._target(name)
+        if field == "thickness":
+            thickness[:, target] = value[:, None]
+        elif field == "angle":
+            angle[:, target] = value[:, None]
+        elif field == "core":
+            core_thickness[:] = value
+        else:
+            loads[:, target] = value
+
+    stress, _, _ = laminate.evaluate_laminates(q, strengths, thickness, angle, core_thickness, loads, side)
+    ply_indices, modes = criteria.failure_index(stress, strengths, criterion)
+
+    # Governing ply of every grid point
+    governing = np.argmax(ply_indices, axis=1)
+    max_index = ply_indices[np.arange(count), governing]
+    mode = modes[np.arange(count), governing]
+
+    if results is not None:
+        stored = resultfile.open_results(results, "r+")
+        stored.data[start:stop] = np.concatenate([stress, ply_indices[..., None]], axis=-1)
+        stored.flush()
+
+    temporary = path + ".tmp"
+    with open(temporary, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["index"] + spec.names + ["Max FI", "Ply", "MOF"])
+        for row in range(count):
+            writer.writerow([index[row]] + ["{:.9g}".format(column[row]) for column in columns]
+                            + ["{:.6e}".format(max_index[row]), governing[row] + 1,
+                               laminate.FAILURE_MODES[mode[row]]])
+    os.replace(temporary, path)
+    return count
+
+
+def chunk_path(directory, chunk):
+    return os.path.join(directory, f"chunk_{chunk:08d}.csv")
+
+
+def material_digest(q, strengths):
+    """ Hash of the stiffness and strengths a sweep is evaluated with, which the spec only names """
+    digest = hashlib.sha256()
+    for values in (q, strengths):
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _open_directory(spec, directory, chunk_size, materials, results=False, criterion="Max stress"):
+    # Create the manifest of a new sweep or check that an existing one belongs to the same sweep
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST)
+    manifest = {"spec": spec.to_dict(), "digest": spec.digest(), "chunk_size": chunk_size, "size": spec.size,
+                "materials": materials, "results": results,
+                "criterion": criterion}
+
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            existing = json.load(file)
+        if (existing.get("digest") != manifest["digest"] or existing.get("chunk_size") != chunk_size
+                or existing.get("results", False) != results
+                or existing.get("criterion", "Max stress") != criterion):
+            raise ValueError(f"{directory} holds the results of a different sweep.")
+
+        # A changed material library would mix chunks of different stiffness and strengths into one result
+        if existing.get("materials") != materials:
+            raise ValueError(f"{directory} was run with different material properties.")
+        return
+
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def run_sweep(spec, directory, chunk_size=10000, side="Middle", workers=None, progress=None, cancel=None,
+              results=False, criterion="Max stress"):
+    """ Evaluate every grid point of the spec into chunk files in directory and return the number of points done.
+    The Max FI of every point is the highest failure index over its plies under one of criteria.CRITERIA.
+
+    progress(done, total) is called after every chunk and the run stops after the chunks in flight once
+    cancel.is_set() returns True. Chunks already in the directory from an earlier run of the same spec are kept.
+    workers=1 evaluates in this process. With results, every ply at every point is also kept in RESULTS, see
+    open_results. """
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be at least 1.")
+
+    # Material data for the workers, see pool
+    entries = laminate.material_cache.stack([material for material, _, _ in spec.plies])
+    q, strengths = entries[0], entries[3]
+    materials = material_digest(q, strengths)
+    # Checked here rather than in the workers, before the manifest is written
+    if criterion not in criteria.CRITERIA:
+        raise ValueError(f"Unknown failure criterion {criterion}")
+    _open_directory(spec, directory, chunk_size, materials, results, criterion)
+
+    results_path = os.path.join(directory, RESULTS) if results else None
+    if results and not os.path.exists(results_path):
+        resultfile.create(results_path, (spec.size, len(spec.plies), len(resultfile.FIELDS)),
+                          resultfile.layup_digest(spec.plies, spec.core_thickness), axes=("point", "ply", "value"),
+                          sweep=spec.digest(), materials=materials, side=side,
+                          criterion=criterion)
+
+    total = spec.size
+    chunks = [chunk for chunk in range(-(-total // chunk_size)) if not os.path.exists(chunk_path(directory, chunk))]
+    done = total - sum(min(chunk_size, total - chunk * chunk_size) for chunk in chunks)
+    if progress is not None:
+        progress(done, total)
+
+    def arguments(chunk):
+        start = chunk * chunk_size
+        return (spec, q, strengths, start, min(start + chunk_size, total), chunk_path(directory, chunk), side,
+                criterion, results_path)
+
+    for count in pool.map_chunks(_evaluate_chunk, (arguments(chunk) for chunk in chunks), workers, cancel):
+        done += count
+        if progress is not None:
+            progress(done, total)
+    return done
+
+
+def load_spec(directory):
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as file:
+        return SweepSpec.from_dict(json.load(file)["spec"])
+
+
+def open_results(directory):
+    """ resultfile.ResultFile of a sweep run with results, its data (n_points x n_plies x 4) memory-mapped read-only.
+    Rows of chunks that have no CSV file yet are not filled in """
+    return resultfile.open_results(os.path.join(directory, RESULTS))
+
+
+def iter_results(directory):
+    """ Rows of the finished chunks in grid order, as dicts keyed by the CSV header """
+    chunks = sorted(name for name in os.listdir(directory) if name.startswith("chunk_") and name.endswith(".csv"))
+    for name in chunks:
+        with open(os.path.join(directory, name), newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
@@ -0,0 +1,117 @@
+# test_criteria.py
+
+# Strength ratios against the published criteria written out term by term: the ratio R found in closed form must
+# put the scaled stresses R σ exactly on the failure surface
+import numpy as np
+import pytest
+import criteria
+
+# X_t, Y_t, X_c, Y_c, S_c of T300/5208 (MPa)
+STRENGTHS = np.array([1500.0, 40.0, 1500.0, 246.0, 68.0])
+
+
+def random_stresses(count=500, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, 3)) * [800, 80, 40]
+
+
+@pytest.mark.parametrize("criterion", list(criteria.CRITERIA))
+@pytest.mark.parametrize("component, sign, strength, mode", [
+    (0, 1, 0, criteria.LT), (0, -1, 2, criteria.LC), (1, 1, 1, criteria.TT), (1, -1, 3, criteria.TC),
+    (2, 1, 4, None), (2, -1, 4, None)])
+def test_uniaxial_stresses_fail_at_their_strength(criterion, component, sign, strength, mode):
+    # Every criterion reduces to the strength along each axis; which mode shear alone is reported as differs
+    stress = np.zeros(3)
+    stress[component] = sign * 0.4 * STRENGTHS[strength]
+    ratio, modes = criteria.strength_ratio(stress, STRENGTHS, criterion)
+    assert ratio == pytest.approx(2.5, rel=1e-12)
+    if mode is not None:
+        assert modes == mode
+
+
+def test_tsai_wu_on_its_surface():
+    X_t, Y_t, X_c, Y_c, S_c = STRENGTHS
+    F_1, F_2 = 1 / X_t - 1 / X_c, 1 / Y_t - 1 / Y_c
+    F_11, F_22, F_66 = 1 / (X_t * X_c), 1 / (Y_t * Y_c), 1 / S_c ** 2
+    F_12 = -0.5 * np.sqrt(F_11 * F_22)
+
+    stress = random_stresses()
+    ratio, _ = criteria.strength_ratio(stress, STRENGTHS, "Tsai-Wu")
+    sigma_1, sigma_2, tau = (ratio[:, None] * stress).T
+    surface = (F_1 * sigma_1 + F_2 * sigma_2 + F_11 * sigma_1 ** 2 + F_22 * sigma_2 ** 2 + F_66 * tau ** 2
+               + 2 * F_12 * sigma_1 * sigma_2)
+    assert np.all(ratio > 0)
+    np.testing.assert_allclose(surface, 1, rtol=1e-10)
+
+
+def test_tsai_hill_on_its_surface():
+    X_t, Y_t, X_c, Y_c, S_c = STRENGTHS
+    stress = random_stresses(seed=1)
+    ratio, _ = criteria.strength_ratio(stress, STRENGTHS, "Tsai-Hill")
+    sigma_1, sigma_2, tau = (ratio[:, None] * stress).T
+    X = np.where(sigma_1 >= 0, X_t, X_c)
+    Y = np.where(sigma_2 >= 0, Y_t, Y_c)
+    np.testing.assert_allclose((sigma_1 / X) ** 2 - sigma_1 * sigma_2 / X ** 2 + (sigma_2 / Y) ** 2 + (tau / S_c) ** 2,
+                               1, rtol=1e-10)
+
+
+def test_hashin_on_its_surface():
+    X_t, Y_t, X_c, Y_c, S_c = STRENGTHS
+    stress = random_stresses(seed=2)
+    ratio, modes = criteria.strength_ratio(stress, STRENGTHS, "Hashin")
+
+    # Hashin (1980) plane stress, with S_c standing in for the transverse shear strength
+    sigma_1, sigma_2, tau = (ratio[:, None] * stress).T
+    fibre = np.where(sigma_1 >= 0, (sigma_1 / X_t) ** 2 + (tau / S_c) ** 2, (sigma_1 / X_c) ** 2)
+    matrix = np.where(sigma_2 >= 0, (sigma_2 / Y_t) ** 2 + (tau / S_c) ** 2,
+                      (sigma_2 / (2 * S_c)) ** 2 + ((Y_c / (2 * S_c)) ** 2 - 1) * sigma_2 / Y_c + (tau / S_c) ** 2)
+
+    # The governing mode sits on the surface and the other one inside it
+    governing = np.where(np.isin(modes, (criteria.LT, criteria.LC)), fibre, matrix)
+    other = np.where(np.isin(modes, (criteria.LT, criteria.LC)), matrix, fibre)
+    np.testing.assert_allclose(governing, 1, rtol=1e-10)
+    assert np.all(other <= 1 + 1e-10)
+
+
+def test_puck_limits():
+    X_t, Y_t, X_c, Y_c, S_c = STRENGTHS
+    ratio, modes = criteria.strength_ratio(np.array([[0, Y_t, 0], [0, -Y_c, 0], [0, 0, S_c]]), STRENGTHS, "Puck")
+    np.testing.assert_allclose(ratio, 1, rtol=1e-12)
+    assert list(modes[:2]) == [criteria.TT, criteria.TC]
+
+
+def test_puck_is_continuous_between_modes_b_and_c():
+    # Modes B and C meet where the compression on the action plane reaches R_A τ / τ_c; the failure surface has no
+    # step there
+    p_compression = criteria.PUCK_INCLINATION[1]
+    S_c, Y_c = STRENGTHS[4], STRENGTHS[3]
+    R_A = S_c / (2 * p_compression) * (np.sqrt(1 + 2 * p_compression * Y_c / S_c) - 1)
+    tau_c = S_c * np.sqrt(1 + 2 * p_compression * R_A / S_c)
+
+    tau = 30.0
+    sigma_2 = -R_A * tau / tau_c
+    stress = np.array([[0, sigma_2 * (1 - 1e-9), tau], [0, sigma_2 * (1 + 1e-9), tau]])
+    ratio, modes = criteria.strength_ratio(stress, STRENGTHS, "Puck")
+    assert list(modes) == [criteria.S, criteria.TC]
+    assert ratio[0] == pytest.approx(ratio[1], rel=1e-6)
+
+
+@pytest.mark.parametrize("criterion", list(criteria.CRITERIA))
+def test_ratio_scales_inversely_with_the_stresses(criterion):
+    stress = random_stresses(seed=3)
+    ratio, modes = criteria.strength_ratio(stress, STRENGTHS, criterion)
+    doubled, doubled_modes = criteria.strength_ratio(2 * stress, STRENGTHS, criterion)
+    np.testing.assert_allclose(doubled, ratio / 2, rtol=1e-10)
+    np.testing.assert_array_equal(doubled_modes, modes)
+
+
+@pytest.mark.parametrize("criterion", list(criteria.CRITERIA))
+def test_unloaded_ply_never_fails(criterion):
+    ratio, _ = criteria.strength_ratio(np.zeros((2, 3)), STRENGTHS, criterion)
+    assert np.all(np.isinf(ratio))
+    failure_index, modes = criteria.failure_index(np.zeros((2, 3)), STRENGTHS, criterion)
+    assert np.all(failure_index == 0) and np.all(modes == 0)
+
+
+def test_unknown_criterion():
+    with pytest.raises(ValueError):
+        criteria.strength_ratio(np.zeros(3), STRENGTHS, "Maximum strain")
@@ -0,0 +1,41 @@
+# test_envelope.py
+
+# First-ply-failure envelopes: every ray ends at the load factor the laminate model fails at in that direction
+import numpy as np
+import pytest
+import criteria
+import envelope
+import laminate
+
+
+def build():
+    model = laminate.LaminateModel()
+    for angle in (0, 45, -45, 90, 90, -45, 45, 0):
+        model.add_ply("T300/5208", 0.125, angle)
+    return model
+
+
+def test_axis_points_are_the_inverse_max_failure_index():
+    model = build()
+    result = envelope.failure_envelope(model, directions=360)
+    assert np.allclose(result.angles[[0, 90]], [0, np.pi / 2])
+
+    # Quasi-isotropic: N₁ and N₂ alone fail the 90° and the 0° plies transversely at the same load
+    _, failure_indices, _ = model.evaluate_load_cases([1, 0, 0, 0, 0, 0])
+    assert result.load_factors[0] == pytest.approx(1 / failure_indices.max(), rel=1e-10)
+    assert result.load_factors[0] == pytest.approx(293724.6, abs=0.1)
+    assert result.load_factors[90] == pytest.approx(result.load_factors[0], rel=1e-10)
+    assert result.plies[0] in (4, 5) and result.mode_labels()[0] == "TT"
+
+
+def test_bending_envelope_takes_the_worst_face():
+    model = build()
+    result = envelope.failure_envelope(model, plane="M1-M2", directions=360, criterion="Tsai-Wu")
+
+    stresses = [model.load_case_stresses([0, 0, 0, 1, 0, 0], side) for side in laminate.LAYER_SIDES]
+    failure_index = max(criteria.failure_index(stress, model.strengths(), "Tsai-Wu")[0].max() for stress in stresses)
+    assert result.load_factors[0] == pytest.approx(1 / failure_index, rel=1e-10)
+
+    # The faces of a ply carry more bending stress than its middle
+    middle = envelope.failure_envelope(model, plane="M1-M2", directions=360, side="Middle", criterion="Tsai-Wu")
+    assert np.all(result.load_factors <= middle.load_factors)
@@ -0,0 +1,263 @@
+# test_laminate.py
+
+# The laminate engine against classical lamination theory worked out ply by ply, the long way round
+import numpy as np
+import pytest
+import laminate
+import material_properties as mp
+
+MATERIALS = ("T300/5208", "B4/5505", "AS/H3501", "Kevlar49/epoxy")
+
+
+def reference_q_bar(material, angle):
+    """ Q̄ = T⁻¹ Q R T R⁻¹ with the stress transformation T and the Reuter matrix R """
+    properties = mp.get_material_properties(material)
+    E_x, E_y, E_s, nu = (properties[key] for key in mp.MATERIAL_KEYS)
+    nu_y = nu * E_y / E_x
+    q = np.array([[E_x, nu_y * E_x, 0], [nu_y * E_x, E_y, 0], [0, 0, E_s * (1 - nu * nu_y)]]) / (1 - nu * nu_y)
+
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    t = np.array([[c * c, s * s, 2 * c * s], [s * s, c * c, -2 * c * s], [-c * s, c * s, c * c - s * s]])
+    r = np.diag([1, 1, 2])
+    return np.linalg.inv(t) @ q @ r @ t @ np.linalg.inv(r)
+
+
+def reference_faces(plies, core_thickness):
+    # The core sits between the lower half of the plies and the upper half, which holds the middle ply
+    height = sum(thickness for _, thickness, _ in plies) + 2 * core_thickness
+    faces, z = [], -height / 2
+    for index, (_, thickness, _) in enumerate(plies):
+        if index == len(plies) // 2:
+            z += 2 * core_thickness
+        faces.append((z, z + thickness))
+        z += thickness
+    return faces
+
+
+def reference_abd(plies, core_thickness=0.0):
+    """ [[A, B], [B, D]] in GPa and mm """
+    abd = np.zeros((6, 6))
+    for (material, _, angle), (z_bottom, z_top) in zip(plies, reference_faces(plies, core_thickness)):
+        q_bar = reference_q_bar(material, angle)
+        abd[:3, :3] += q_bar * (z_top - z_bottom)
+        abd[:3, 3:] += q_bar * (z_top ** 2 - z_bottom ** 2) / 2
+        abd[3:, 3:] += q_bar * (z_top ** 3 - z_bottom ** 3) / 3
+    abd[3:, :3] = abd[:3, 3:]
+    return abd
+
+
+def build(plies, core_thickness=0.0):
+    model = laminate.LaminateModel(core_thickness)
+    for material, thickness, angle in plies:
+        model.add_ply(material, thickness, angle)
+    return model
+
+
+def random_plies(rng, count, materials=MATERIALS[:1]):
+    return [(str(rng.choice(materials)), float(rng.uniform(0.05, 0.4)), float(rng.uniform(-90, 90)))
+            for _ in range(count)]
+
+
+def assert_abd_close(abd, expected, tolerance=1e-12):
+    # Relative to the largest term of each block, since A, B and D differ in size
+    for rows, columns in ((slice(0, 3), slice(0, 3)), (slice(0, 3), slice(3, 6)), (slice(3, 6), slice(3, 6))):
+        scale = max(np.abs(expected[rows, rows]).max(), np.abs(expected[columns, columns]).max())
+        np.testing.assert_allclose(abd[rows, columns], expected[rows, columns], rtol=0, atol=tolerance * scale)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 8, 25])
+@pytest.mark.parametrize("core_thickness", [0.0, 0.75])
+def test_abd_matches_lamination_theory(count, core_thickness):
+    rng = np.random.default_rng(count)
+    plies = random_plies(rng, count)
+    assert_abd_close(build(plies, core_thickness).abd_matrix(), reference_abd(plies, core_thickness))
+
+
+def test_ply_faces():
+    rng = np.random.default_rng(0)
+    plies = random_plies(rng, 7)
+    model = build(plies, 0.5)
+    faces = np.array(reference_faces(plies, 0.5))
+    np.testing.assert_allclose(model.plies["z_bottom"], faces[:, 0], atol=1e-12)
+    np.testing.assert_allclose(model.plies["z_top"], faces[:, 1], atol=1e-12)
+
+
+@pytest.mark.parametrize("side", laminate.LAYER_SIDES)
+def test_stresses_match_lamination_theory(side):
+    rng = np.random.default_rng(1)
+    plies = random_plies(rng, 6)
+    model = build(plies, 0.3)
+    loads = np.array([1.2e5, -4e4, 2.5e4, 15.0, -8.0, 3.0])
+
+    # SI units: ABD in N/m, N and N·m from GPa and mm, strains and curvatures (1/m) from the full solve
+    abd = reference_abd(plies, 0.3) * np.block([[np.full((3, 3), 1e6), np.full((3, 3), 1e3)],
+                                                [np.full((3, 3), 1e3), np.ones((3, 3))]])
+    response = np.linalg.solve(abd, loads)
+    np.testing.assert_allclose(model.midplane_response(loads), response, rtol=1e-9)
+
+    for index, ((material, _, angle), (z_bottom, z_top)) in enumerate(zip(plies, reference_faces(plies, 0.3))):
+        z = {"Middle": (z_bottom + z_top) / 2,
+             "Outer": z_bottom if z_bottom + z_top <= 0 else z_top,
+             "Inner": z_top if z_bottom + z_top <= 0 else z_bottom}[side]
+        strain = response[:3] + z / 1000 * response[3:]
+        stress = reference_q_bar(material, angle) @ strain * 1e3
+
+        # Rotate the stresses into the ply axes
+        c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+        t = np.array([[c * c, s * s, 2 * c * s], [s * s, c * c, -2 * c * s], [-c * s, c * s, c * c - s * s]])
+        np.testing.assert_allclose(model.on_axis_stresses(loads, side)[index], t @ stress,
+                                   rtol=1e-9, atol=1e-9 * np.abs(stress).max())
+
+
+def test_load_cases_match_single_evaluations():
+    rng = np.random.default_rng(2)
+    model = build(random_plies(rng, 5))
+    loads = rng.normal(size=(20, 6)) * [1e5, 1e5, 1e5, 10, 10, 10]
+    expected = np.stack([model.on_axis_stresses(case, "Outer") for case in loads])
+    np.testing.assert_allclose(model.load_case_stresses(loads, "Outer"), expected, rtol=1e-10, atol=1e-8)
+
+
+def direct_abd(plies, core_thickness):
+    # One pass over the whole stack with laminate.abd_matrix, without the running sums
+    faces = np.array(reference_faces(plies, core_thickness))
+    u = {material: laminate.invariants(laminate.on_axis_q(material)) for material in {ply[0] for ply in plies}}
+    q_bar = laminate.off_axis_q(np.stack([u[material] for material, _, _ in plies]),
+                                np.array([angle for _, _, angle in plies]))
+    return laminate.abd_matrix(q_bar, faces[:, 1] - faces[:, 0], faces[:, 0], faces[:, 1])
+
+
+def test_direct_abd_matches_lamination_theory():
+    plies = random_plies(np.random.default_rng(5), 12)
+    assert_abd_close(direct_abd(plies, 0.6), reference_abd(plies, 0.6))
+
+
+@pytest.mark.parametrize("materials", [MATERIALS[:1], MATERIALS], ids=["single", "hybrid"])
+def test_incremental_edits_match_rebuild(materials):
+    # Every edit only updates the running sums of the plies it moves, so the sums must follow a long random
+    # sequence of edits without drifting from a direct sum over the stack. Rounding would build up over the
+    # sequence, so checking every few edits is enough to catch it
+    rng = np.random.default_rng(3)
+    model, plies, core_thickness = laminate.LaminateModel(), [], 0.0
+    for step in range(3000):
+        operation = rng.choice(["add", "add", "insert", "move", "delete", "copy", "core", "clear"],
+                               p=[0.25, 0.2, 0.15, 0.15, 0.15, 0.04, 0.05, 0.01])
+        if operation in ("add", "insert") or not plies:
+            ply = random_plies(rng, 1, materials)[0]
+            index = int(rng.integers(len(plies) + 1)) if operation == "insert" else len(plies)
+            model.add_ply(*ply, index=index)
+            plies.insert(index, ply)
+        elif operation == "move":
+            index, new_index = (int(value) for value in rng.integers(len(plies), size=2))
+            model.move_ply(index, new_index)
+            plies.insert(new_index, plies.pop(index))
+        elif operation == "delete":
+            index = int(rng.integers(len(plies)))
+            model.delete_ply(index)
+            del plies[index]
+        elif operation == "copy" and len(plies) < 60:
+            model.copy_symmetric()
+            plies += plies[::-1]
+        elif operation == "core":
+            core_thickness = float(rng.choice([0.0, 0.4, 1.5]))
+            model.set_core_thickness(core_thickness)
+        elif operation == "clear":
+            model.clear()
+            plies = []
+
+        assert model.layer_count == len(plies)
+        if plies and step % 5 == 0:
+            assert_abd_close(model.abd_matrix(), direct_abd(plies, core_thickness), tolerance=1e-10)
+            assert model.total_thickness == pytest.approx(sum(thickness for _, thickness, _ in plies))
+
+
+def test_rebuild_matches_edits():
+    rng = np.random.default_rng(4)
+    model = build(random_plies(rng, 9), 0.2)
+    model.move_ply(0, 6)
+    model.delete_ply(3)
+    expected = model.abd_matrix()
+    model.rebuild()
+    assert_abd_close(model.abd_matrix(), expected)
+
+
+def test_symmetric_layups_have_no_coupling():
+    model = build([("T300/5208", 0.125, angle) for angle in (0, 45, -45, 90, 90, -45, 45, 0)])
+    assert model.symmetric
+    assert not build([("T300/5208", 0.125, angle) for angle in (0, 90)]).symmetric
+
+
+@pytest.mark.parametrize("angles, core_thickness", [
+    ((0, 45, -45, 90, 90, -45, 45, 0), 0.0), ((0, 90), 0.0), ((0, 45, 90), 0.5), ((30, -30, 0, 90, 15), 0.0)])
+def test_abd_solve_matches_full_inverse(angles, core_thickness):
+    # Symmetric layups take the block-diagonal fast path, the others the full 6 x 6 solve; both must agree with
+    # inverting the whole matrix
+    plies = [("T300/5208", 0.125, angle) for angle in angles]
+    model = build(plies, core_thickness)
+    abd = model.abd_matrix()
+    inverse = np.linalg.inv(abd)
+
+    np.testing.assert_allclose(laminate.solve_abd(abd, np.eye(6)), inverse, rtol=1e-9,
+                               atol=1e-12 * np.abs(inverse).max())
+
+    # The compliance in N/m and N takes the load scaling in and the curvatures out to 1/m
+    response = model.response_matrix()
+    expected = np.diag(laminate.RESPONSE_SCALE) @ inverse @ np.diag(laminate.LOAD_SCALE)
+    np.testing.assert_allclose(response, expected, rtol=1e-9, atol=1e-12 * np.abs(expected).max())
+    a, b, d = model.compliance_matrices()
+    np.testing.assert_allclose(b, response[:3, 3:])
+    np.testing.assert_allclose(d, response[3:, 3:])
+    np.testing.assert_allclose(a, response[:3, :3] * 1e9)
+
+
+def test_batch_solve_mixes_symmetric_and_unsymmetric_laminates():
+    abd = np.stack([build([("T300/5208", 0.125, angle) for angle in angles]).abd_matrix()
+                    for angles in ((0, 90, 90, 0), (0, 90), (45, -45, -45, 45))])
+    rhs = np.random.default_rng(6).normal(size=(3, 6, 4))
+    np.testing.assert_allclose(laminate.solve_abd(abd, rhs), np.linalg.solve(abd, rhs), rtol=1e-9, atol=1e-9)
+
+
+def test_unsymmetric_laminate_couples_bending_and_extension():
+    # A [0/90] laminate curves under pure tension, a [0/90]s one stays flat
+    loads = [1e5, 0, 0, 0, 0, 0]
+    assert build([("T300/5208", 0.125, angle) for angle in (0, 90)]).midplane_response(loads)[3] > 1
+    flat = build([("T300/5208", 0.125, angle) for angle in (0, 90, 90, 0)]).midplane_response(loads)
+    np.testing.assert_array_equal(flat[3:], 0)
+
+
+def test_broken_laminate_solves_to_zero():
+    np.testing.assert_array_equal(laminate.solve_abd(np.zeros((2, 6, 6)), np.ones((2, 6, 1))), 0)
+
+
+@pytest.mark.parametrize("count", [1, 2, 5, 16])
+def test_hybrid_abd_matches_lamination_theory(count):
+    # Every material keeps its own lamination sums, so plies of different stiffness must not be lumped together
+    plies = random_plies(np.random.default_rng(10 + count), count, MATERIALS)
+    assert_abd_close(build(plies, 0.4).abd_matrix(), reference_abd(plies, 0.4))
+
+
+def test_hybrid_edits_that_empty_a_material():
+    plies = [("T300/5208", 0.2, 0), ("Kevlar49/epoxy", 0.3, 45), ("B4/5505", 0.1, -45), ("T300/5208", 0.2, 90)]
+    model = build(plies)
+    model.delete_ply(1)
+    model.move_ply(0, 2)
+    del plies[1]
+    plies.insert(2, plies.pop(0))
+    assert_abd_close(model.abd_matrix(), reference_abd(plies))
+
+    # A material no ply uses any more adds nothing
+    model.delete_ply(1)
+    assert_abd_close(model.abd_matrix(), reference_abd([plies[0], plies[2]]))
+
+
+def test_batched_laminates_in_an_environment():
+    model = build([("T300/5208", 0.125, 0), ("AS/H3501", 0.15, 45), ("T300/5208", 0.1, -30),
+                   ("AS/H3501", 0.125, 90), ("T300/5208", 0.125, 10)], 0.3)
+    loads = np.array([1e5, -2e4, 3e3, 10, -5, 2])
+    environments = np.array([[-150, 0], [0, 0.005], [80, -0.002]])
+    q, _, _, strengths, expansion = model.material_arrays()
+    material = model.plies["material"]
+
+    stress, _, _ = laminate.evaluate_laminates(q[material], strengths[material], model.plies["thickness"],
+                                               model.plies["angle"], model.core_thickness, loads, "Outer",
+                                               expansion[material], environments)
+    assert np.allclose(stress, model.load_case_stresses(loads, "Outer", environments), rtol=1e-12, atol=1e-9)
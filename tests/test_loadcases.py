@@ -0,0 +1,96 @@
+# test_loadcases.py
+
+# Load case sheets: cases are traced back to the row they were read from, blank rows included
+import csv
+import numpy as np
+import criteria
+import laminate
+import loadcases
+import report
+
+LOADS = [(1e5, 0, 0, 0, 0, 0), None, None, (0, 2e5, 0, 0, 0, 0), None, (0, 0, 3e4, 0, 0, 0), (5e4, 5e4, 0, 0, 0, 0)]
+
+
+def write_sheet(path):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(loadcases.RESULTANTS)
+        for load in LOADS:
+            writer.writerow(load if load is not None else [""] * 6)
+    return [row for row, load in enumerate(LOADS, start=2) if load is not None]
+
+
+def build():
+    model = laminate.LaminateModel()
+    for angle in (0, 45, 90, -45, -45, 90, 45, 0):
+        model.add_ply("T300/5208", 0.125, angle)
+    return model
+
+
+def test_rows_skip_blank_lines(tmp_path):
+    path = str(tmp_path / "loads.csv")
+    rows = write_sheet(path)
+    chunks = list(loadcases.read_load_case_rows(path, chunk_size=2))
+
+    assert [len(loads) for loads, _ in chunks] == [2, 2]
+    assert np.concatenate([chunk_rows for _, chunk_rows in chunks]).tolist() == rows
+    loads = np.concatenate([loads for loads, _ in chunks])
+    assert np.array_equal(loads, np.array([load for load in LOADS if load is not None], dtype=float))
+    assert np.array_equal(np.concatenate(list(loadcases.read_load_cases(path, chunk_size=2))), loads)
+
+
+def test_worst_cases_report_sheet_rows(tmp_path):
+    path = str(tmp_path / "loads.csv")
+    rows = write_sheet(path)
+    model = build()
+
+    worst = loadcases.worst_cases(model, loadcases.read_load_case_rows(path, chunk_size=2))
+    plain = loadcases.worst_cases(model, loadcases.read_load_cases(path, chunk_size=2))
+
+    # The transverse case governs, read from row 5 as the second case
+    assert worst.governing_case == plain.governing_case == 1
+    assert worst.governing_case_number == rows[worst.governing_case] == 5
+    assert plain.governing_case_number == 2
+    assert worst.case_numbers.tolist() == [rows[case] for case in worst.cases]
+    assert (worst.case_label, plain.case_label) == ("Row", "Case")
+
+
+def test_report_numbers_cases_by_row(tmp_path):
+    from openpyxl import load_workbook
+
+    path = str(tmp_path / "loads.csv")
+    rows = write_sheet(path)
+    model = build()
+    worst = loadcases.worst_cases(model, loadcases.read_load_case_rows(path))
+    output = str(tmp_path / "report.xlsx")
+    assert report.write_report(output, model, loadcases.read_load_case_rows(path, chunk_size=3), worst=worst)
+
+    workbook = load_workbook(output, read_only=True)
+    load_rows = list(workbook["Load cases"].iter_rows(values_only=True))
+    assert load_rows[0][0] == "Row"
+    assert [row[0] for row in load_rows[1:]] == rows
+    worst_rows = list(workbook["Worst cases"].iter_rows(values_only=True))
+    assert ("Governing row", 5) in [tuple(row[:2]) for row in worst_rows]
+    workbook.close()
+
+
+def test_report_failure_sheet_uses_the_criterion(tmp_path):
+    from openpyxl import load_workbook
+
+    model = build()
+    loads = np.array([load for load in LOADS if load is not None], dtype=float)
+    output = str(tmp_path / "report.xlsx")
+    assert report.write_report(output, model, loads, criterion="Tsai-Wu")
+
+    workbook = load_workbook(output, read_only=True)
+    failure_rows = list(workbook["Failure"].iter_rows(values_only=True))
+    workbook.close()
+    assert failure_rows[0][3:] == ("Max stress FI x", "Max stress FI y", "Max stress FI s", "FI (Tsai-Wu)", "MOF")
+
+    # Plies are listed top-down under every case
+    expected, _ = criteria.failure_index(model.load_case_stresses(loads), model.strengths(), "Tsai-Wu")
+    reported = np.array([row[6] for row in failure_rows[1:]]).reshape(len(loads), -1)[:, ::-1]
+    assert np.allclose(reported, expected)
+    _, components, _ = model.evaluate_load_cases(loads)
+    assert np.allclose(np.array([row[3:6] for row in failure_rows[1:]]).reshape(components.shape[:2] + (3,))[:, ::-1],
+                       components)
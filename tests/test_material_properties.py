@@ -0,0 +1,64 @@
+# test_material_properties.py
+
+# Saving the library to SQLite and opening it again
+import os
+import sqlite3
+import pytest
+import material_properties as mp
+
+PROPERTIES = {"E_x": 181, "E_y": 10.3, "E_s": 7.17, "ν": 0.28, "X_t": 1500, "Y_t": 40, "X_c": 1500, "Y_c": 246,
+              "S_c": 68}
+
+
+def test_save_and_open(tmp_path):
+    library = mp.MaterialLibrary()
+    library.add({"Test/1": PROPERTIES})
+    path = str(tmp_path / "materials.db")
+    library.save(path)
+
+    saved = mp.MaterialLibrary(path)
+    assert saved.get("Test/1")["E_x"] == 181
+    assert saved.get("Test/1")["α_x"] == 0
+    assert saved.names() == library.names()
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_save_replaces_an_existing_file(tmp_path):
+    path = str(tmp_path / "materials.db")
+    first = mp.MaterialLibrary()
+    first.add({"Old": PROPERTIES})
+    first.save(path)
+
+    second = mp.MaterialLibrary()
+    second.add({"New": PROPERTIES})
+    second.save(path)
+    assert "New" in mp.MaterialLibrary(path) and "Old" not in mp.MaterialLibrary(path)
+    assert mp.MaterialLibrary(path).names() == second.names()
+
+
+def test_save_onto_its_own_file(tmp_path):
+    path = str(tmp_path / "materials.db")
+    mp.MaterialLibrary().save(path)
+
+    library = mp.MaterialLibrary(path)
+    library.add({"Added": PROPERTIES})
+    library.save(path)
+    assert "Added" in library
+    assert "Added" in mp.MaterialLibrary(path)
+
+
+class FailingConnection:
+    def backup(self, target):
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_failed_save_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "materials.db")
+    mp.MaterialLibrary().save(path)
+    names = mp.MaterialLibrary(path).names()
+
+    library = mp.MaterialLibrary()
+    library._connection = FailingConnection()
+    with pytest.raises(sqlite3.OperationalError):
+        library.save(path)
+    assert mp.MaterialLibrary(path).names() == names
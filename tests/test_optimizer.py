@@ -0,0 +1,61 @@
+# test_optimizer.py
+
+# Stacking-sequence optimizer: batched candidate evaluation against the laminate model
+import numpy as np
+import pytest
+import criteria
+import laminate
+import optimizer
+
+ANGLES = (0, 45, -45, 90)
+
+
+def candidates(rng, count=20, half=6):
+    return rng.integers(0, len(ANGLES), size=(count, half)), rng.integers(1, half + 1, size=count)
+
+
+def model_failure_index(genes, count, core_thickness, loads, criterion, thickness=0.125):
+    half = [ANGLES[gene] for gene in genes[:count]]
+    model = laminate.LaminateModel(core_thickness)
+    for angle in half[::-1] + half:
+        model.add_ply("T300/5208", thickness, angle)
+    return max(criteria.failure_index(model.load_case_stresses(loads, side), model.strengths(), criterion)[0].max()
+               for side in laminate.LAYER_SIDES)
+
+
+@pytest.mark.parametrize("loads, core_thickness", [((1e5, -3e4, 2e4, 0, 0, 0), 0.0), ((0, 0, 0, 5, -2, 1), 1.0),
+                                                   ((5e4, 0, 1e4, 3, 0, -1), 0.5)])
+@pytest.mark.parametrize("criterion", ["Max stress", "Tsai-Wu"])
+def test_stacks_match_the_laminate_model(loads, core_thickness, criterion):
+    genes, counts = candidates(np.random.default_rng(3))
+    entry = laminate.material_cache.get("T300/5208")
+    loads = np.array(loads, dtype=float)
+
+    max_index = optimizer.evaluate_stacks(genes, counts, ANGLES, entry.q, entry.strengths, 0.125, core_thickness,
+                                          loads, criterion)
+    expected = [model_failure_index(genes[index], counts[index], core_thickness, loads, criterion)
+                for index in range(len(genes))]
+    assert np.allclose(max_index, expected, rtol=1e-10)
+
+
+def test_seeded_runs_repeat():
+    loads = [(1e5, 5e4, 0, 0, 0, 0), (0, 0, 2e4, 1, 0, 0)]
+    runs = [optimizer.optimize("T300/5208", 0.125, loads, max_plies=16, population=40, generations=15, seed=7,
+                               workers=workers) for workers in (1, 1, 2)]
+    for result in runs[1:]:
+        assert result.angles == runs[0].angles
+        assert result.max_failure_index == runs[0].max_failure_index
+        assert (result.evaluations, result.generations) == (600, 15)
+
+
+def test_result_is_checked_by_the_laminate_model():
+    loads = [(1e5, 5e4, 0, 0, 0, 0), (0, 0, 2e4, 1, 0, 0)]
+    result = optimizer.optimize("T300/5208", 0.125, loads, max_plies=16, population=40, generations=15, seed=7,
+                                workers=1)
+    assert result.feasible and not result.cancelled
+
+    model = laminate.LaminateModel()
+    for material, thickness, angle in result.plies:
+        model.add_ply(material, thickness, angle)
+    assert max(model.evaluate_load_cases(loads, side)[1].max() for side in laminate.LAYER_SIDES) == pytest.approx(
+        result.max_failure_index, rel=1e-10)
@@ -0,0 +1,24 @@
+# test_pool.py
+
+# Chunks handed to worker processes come back complete, and a cancelled run starts no new chunk
+import threading
+import pool
+
+
+def test_chunks_come_back_from_any_number_of_workers():
+    for workers in (1, 3):
+        assert sorted(pool.map_chunks(abs, range(-20, 0), workers)) == list(range(1, 21))
+
+
+def test_cancel_starts_no_new_chunk():
+    cancel = threading.Event()
+    results = []
+    for result in pool.map_chunks(abs, range(-20, 0), 1, cancel):
+        results.append(result)
+        cancel.set()
+    assert results == [20]
+
+
+def test_worker_count():
+    assert pool.worker_count(4) == 4
+    assert pool.worker_count() >= 1
@@ -0,0 +1,36 @@
+# test_progressive.py
+
+# Progressive failure of a cross-ply laminate: matrix cracking in the 90° plies, then fibre failure in the 0° plies
+import pytest
+import laminate
+import progressive
+
+LOADS = (1e5, 0, 0, 0, 0, 0)
+
+
+def build():
+    model = laminate.LaminateModel()
+    for angle in (0, 90, 90, 0):
+        model.add_ply("T300/5208", 0.125, angle)
+    return model
+
+
+def test_cross_ply_failure_sequence():
+    model = build()
+    result = progressive.progressive_failure(model, LOADS)
+    assert result.collapsed
+
+    _, failure_indices, _ = model.evaluate_load_cases(LOADS)
+    assert result.first_ply_failure == pytest.approx(1 / failure_indices.max(), rel=1e-10)
+    assert result.first_ply_failure == pytest.approx(1.871, abs=1e-3)
+    assert [(int(ply), mode) for _, ply, mode in result.failures] == [(2, "TT"), (3, "TT"), (1, "LT"), (4, "LT")]
+    assert result.failures[1][0] == result.first_ply_failure
+    assert result.failures[3][0] == result.last_ply_failure == pytest.approx(3.761, abs=1e-3)
+
+
+def test_last_ply_failure_is_within_a_load_step():
+    # With the 90° plies gone the 0° plies carry N₁ alone: σₓ = N₁ / 0.25 mm reaches X_t = 1500 MPa at 3.75
+    load_step = 1e-3
+    result = progressive.progressive_failure(build(), LOADS, load_step=load_step)
+    assert 3.75 <= result.last_ply_failure < 3.75 + load_step
+    assert len(result.load_factors) == len(result.strains) and result.load_factors[-1] == result.last_ply_failure
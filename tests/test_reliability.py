@@ -0,0 +1,57 @@
+# test_reliability.py
+
+# Monte Carlo first-ply failure against the deterministic laminate it scatters about
+import numpy as np
+import pytest
+import criteria
+import laminate
+import material_properties as mp
+import reliability
+
+NONE = reliability.Scatter(0, 0, 0, 0, 0)
+
+
+def build(material="T300/5208"):
+    model = laminate.LaminateModel()
+    for angle in (0, 90, 90, 0):
+        model.add_ply(material, 0.125, angle)
+    return model
+
+
+def nominal_failures(model, loads, environment=None):
+    stress = model.load_case_stresses(loads, "Middle", environment)[0]
+    ratios, _ = criteria.strength_ratio(stress, model.strengths(), "Max stress")
+    return ratios <= 1
+
+
+@pytest.mark.parametrize("loads, environment", [((1e5, 0, 0, 0, 0, 0), None), ((1e5, 0, 0, 0, 0, 0), (-150, 0)),
+                                                ((2e5, 0, 0, 0, 0, 0), None), ((2e5, 0, 0, 0, 0, 0), (0, 0.01))])
+def test_no_scatter_matches_the_nominal_laminate(loads, environment):
+    # The cool-down alone fails the 90° plies at 1e5, the swelling alone saves them at 2e5
+    model = build()
+    result = reliability.run_reliability(model, loads, 50, NONE, seed=1, chunk_size=20, workers=1,
+                                         environment=environment)
+
+    failed = nominal_failures(model, loads, environment)
+    assert result.samples == 50
+    assert result.failures == (50 if failed.any() else 0)
+    assert np.array_equal(result.ply_failures, np.where(failed, 50, 0))
+
+
+def test_properties_come_from_the_material_cache():
+    # A material the workers could not look up by name still runs from the cached arrays
+    mp.library.add({"Reliability/cache": {"E_x": 181, "E_y": 10.3, "E_s": 7.17, "ν": 0.28, "X_t": 1500,
+                                          "Y_t": 40, "X_c": 1500, "Y_c": 246, "S_c": 68}})
+    model = build("Reliability/cache")
+    loads = (2e5, 0, 0, 0, 0, 0)
+    result = reliability.run_reliability(model, loads, 10, NONE, seed=1, workers=1)
+    assert np.array_equal(result.ply_failures, np.where(nominal_failures(model, loads), 10, 0))
+
+def test_samples_repeat_for_a_seed():
+    model = build()
+    first = reliability.run_reliability(model, (1.2e5, 0, 0, 0, 0, 0), 200, seed=7, chunk_size=50, workers=1,
+                                        environment=(-50, 0))
+    second = reliability.run_reliability(model, (1.2e5, 0, 0, 0, 0, 0), 200, seed=7, chunk_size=50, workers=1,
+                                         environment=(-50, 0))
+    assert 0 < first.failures < 200
+    assert np.array_equal(first.ply_failures, second.ply_failures)
@@ -0,0 +1,71 @@
+# test_resultfile.py
+
+# Result files: the stored tensors hold what the models compute, and a file only opens for its own layup
+import csv
+import json
+import numpy as np
+import pytest
+import criteria
+import laminate
+import layup
+import resultfile
+
+PLIES = [("T300/5208", 0.125, 0), ("AS/H3501", 0.15, 45), ("T300/5208", 0.1, -45), ("T300/5208", 0.125, 90)]
+LOADS = np.array([[1e5, 0, 0, 0, 0, 0], [0, 5e4, 1e4, 0, 0, 0], [2e4, -1e4, 0, 5, -3, 1]])
+
+
+def build():
+    model = laminate.LaminateModel(0.2)
+    for material, thickness, angle in PLIES:
+        model.add_ply(material, thickness, angle)
+    return model
+
+
+def test_profile_stresses_match_the_through_thickness_profile():
+    model = build()
+    stress = model.profile_stresses(LOADS, 4, (-100, 0.002))
+    assert stress.shape == (3, 4, 4, 3)
+    for case, loads in enumerate(LOADS):
+        profile = model.through_thickness(loads, 4, (-100, 0.002))
+        assert np.allclose(stress[case], profile.values("on_axis_stress"), rtol=1e-12, atol=1e-9)
+
+
+def test_batch_results_hold_every_point_through_the_plies(tmp_path):
+    laminate_path, loads_path = str(tmp_path / "laminate.json"), str(tmp_path / "loads.csv")
+    with open(laminate_path, "w", encoding="utf-8") as file:
+        json.dump({"core_thickness": 0.2, "plies": [{"material": material, "thickness": thickness, "angle": angle}
+                                                    for material, thickness, angle in PLIES]}, file)
+    with open(loads_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["N1", "N2", "N6", "M1", "M2", "M6"])
+        writer.writerows(LOADS.tolist())
+
+    path = str(tmp_path / "results.dat")
+    layup.main(["batch", laminate_path, loads_path, "--results", path, "--points", "5", "--criterion", "Tsai-Wu",
+                "--delta-t", "-100", "-q"])
+
+    model = build()
+    stored = resultfile.open_results(path, layup=resultfile.model_digest(model))
+    assert stored.shape == (3, 4, 5, 4)
+    assert stored.axes == ["case", "ply", "point", "value"]
+    assert stored.header["fractions"] == [0.0, 0.25, 0.5, 0.75, 1.0]
+
+    stress = model.profile_stresses(LOADS, 5, (-100, 0))
+    failure_indices, _ = criteria.failure_index(stress, model.strengths()[:, None, :], "Tsai-Wu")
+    assert np.allclose(stored.data[..., :3], stress, rtol=1e-12, atol=1e-9)
+    assert np.allclose(stored.data[..., 3], failure_indices, rtol=1e-12)
+
+    # The worst case over the sample points of every ply
+    values, cases = stored.worst()
+    assert np.array_equal(cases, np.argmax(failure_indices, axis=0))
+    assert np.allclose(values, failure_indices.max(axis=0))
+
+
+def test_result_file_of_another_layup_is_refused(tmp_path):
+    path = str(tmp_path / "results.dat")
+    with resultfile.ResultWriter(path, (2, 4), resultfile.layup_digest(PLIES[:2])) as results:
+        results.append(np.ones((3, 2, 4)))
+
+    assert resultfile.open_results(path).shape == (3, 2, 4)
+    with pytest.raises(ValueError):
+        resultfile.open_results(path, layup=resultfile.layup_digest(PLIES))
@@ -0,0 +1,82 @@
+# test_sensitivity.py
+
+# Analytic gradients against central finite differences of the full calculation
+import numpy as np
+import pytest
+import laminate
+import sensitivity
+
+MATERIALS = ("T300/5208", "Kevlar49/epoxy", "AS/H3501")
+
+
+def build(materials, angles, thicknesses, core_thickness):
+    model = laminate.LaminateModel(core_thickness)
+    for material, angle, thickness in zip(materials, angles, thicknesses):
+        model.add_ply(material, thickness, angle)
+    return model
+
+
+def evaluate(materials, variables, side):
+    """ On-axis stresses and ABD, flattened, at the variables in the order of sensitivity.variable_names """
+    count = len(materials)
+    angles, thicknesses, core_thickness, loads = (variables[:count], variables[count:2 * count],
+                                                  variables[2 * count], variables[2 * count + 1:])
+    model = build(materials, angles, thicknesses, core_thickness)
+    return np.concatenate([model.on_axis_stresses(loads, side).ravel(), model.abd_matrix().ravel()])
+
+
+# A single ply on a core sits wholly above the midplane; without the core its Outer and Inner points would swap
+# faces under any change of the core, where the stresses have a kink
+@pytest.mark.parametrize("count, core_thickness", [(1, 0.2), (2, 0.0), (5, 0.3), (8, 0.0)])
+@pytest.mark.parametrize("side", laminate.LAYER_SIDES)
+def test_gradients_match_finite_differences(count, core_thickness, side):
+    rng = np.random.default_rng(count)
+    materials = [str(material) for material in rng.choice(MATERIALS, count)]
+    angles = rng.uniform(-80, 80, count)
+    thicknesses = rng.uniform(0.1, 0.3, count)
+    loads = np.array([1e5, -3e4, 2e4, 12.0, -6.0, 4.0])
+    variables = np.concatenate([angles, thicknesses, [core_thickness], loads])
+
+    result = sensitivity.sensitivities(build(materials, angles, thicknesses, core_thickness), loads, side)
+    assert result.variables == sensitivity.variable_names(count)
+    analytic = np.concatenate([result.stress_gradients.reshape(-1, len(variables)),
+                               result.abd_gradients.reshape(len(variables), -1).T])
+
+    # Steps of 1e-4 degrees, 1e-6 mm and 1 N/m or N
+    steps = np.concatenate([np.full(count, 1e-4), np.full(count + 1, 1e-6), np.ones(6)])
+    numerical = np.column_stack([
+        (evaluate(materials, variables + step * unit, side) - evaluate(materials, variables - step * unit, side))
+        / (2 * step) for step, unit in zip(steps, np.eye(len(variables)))])
+
+    # Stresses and every ABD term are compared relative to the largest value of their kind, since an entry can be
+    # zero up to rounding, e.g. the mid-plane stress of a single ply in bending
+    scale = np.abs(numerical).max(axis=1)
+    scale[:3 * count] = np.abs(numerical[:3 * count]).max()
+    error = np.abs(analytic - numerical).max(axis=1)
+    assert np.all(error <= 1e-6 * scale + 1e-9), np.max(error / (scale + 1e-12))
+
+
+def test_failure_index_gradients_follow_the_governing_branch():
+    model = build(["T300/5208"] * 4, [0, 45, -45, 90], [0.125] * 4, 0.0)
+    loads = np.array([-2e5, 3e4, 1e4, 0, 0, 0])
+    result = sensitivity.sensitivities(model, loads)
+    strengths = model.strengths()
+
+    # Compression in x uses X_c, tension in y Y_t, shear S_c with the sign of the shear
+    stress = result.stresses
+    slopes = np.stack([np.where(stress[:, 0] >= 0, 1 / strengths[:, 0], -1 / strengths[:, 2]),
+                       np.where(stress[:, 1] >= 0, 1 / strengths[:, 1], -1 / strengths[:, 3]),
+                       np.sign(stress[:, 2]) / strengths[:, 4]], axis=-1)
+    np.testing.assert_allclose(result.failure_index_gradients, slopes[:, :, None] * result.stress_gradients)
+
+    # The failure indices are linear in the loads
+    np.testing.assert_allclose(result.failure_index_gradients[..., result.index("N1")] * loads[0]
+                               + result.failure_index_gradients[..., result.index("N2")] * loads[1]
+                               + result.failure_index_gradients[..., result.index("N6")] * loads[2],
+                               result.failure_indices, rtol=1e-10)
+
+
+def test_unknown_variable():
+    result = sensitivity.sensitivities(build(["T300/5208"], [0], [0.125], 0.0), np.ones(6))
+    with pytest.raises(ValueError):
+        result.index("angle:2")
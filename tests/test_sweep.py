@@ -0,0 +1,91 @@
+# test_sweep.py
+
+# Resuming sweeps: a run only continues where it stopped if it would compute the same results
+import os
+import numpy as np
+import pytest
+import criteria
+import laminate
+import material_properties as mp
+import sweep
+
+PROPERTIES = {"E_x": 181, "E_y": 10.3, "E_s": 7.17, "ν": 0.28, "X_t": 1500, "Y_t": 40, "X_c": 1500, "Y_c": 246,
+              "S_c": 68}
+
+
+def spec(material="T300/5208"):
+    plies = [(material, 0.125, angle) for angle in (0, 45, -45, 90, 90, -45, 45, 0)]
+    return sweep.SweepSpec(plies, 0.0, (1e5, 0, 0, 0, 0, 0), [("angle:2,7", [0, 30, 60]), ("N2", [0, 5e4])])
+
+
+def rows(directory):
+    return [(int(row["index"]), float(row["Max FI"])) for row in sweep.iter_results(directory)]
+
+
+def test_sweep_matches_direct_evaluation(tmp_path):
+    directory = str(tmp_path / "sweep")
+    assert sweep.run_sweep(spec(), directory, chunk_size=4, workers=1) == 6
+
+    model = laminate.LaminateModel()
+    for angle in (0, 30, -45, 90, 90, -45, 30, 0):
+        model.add_ply("T300/5208", 0.125, angle)
+    _, failure_indices, _ = model.evaluate_load_cases([1e5, 5e4, 0, 0, 0, 0])
+    assert rows(directory)[3][1] == pytest.approx(failure_indices.max(), rel=1e-6)
+
+
+def test_sweep_uses_the_criterion(tmp_path):
+    directory = str(tmp_path / "sweep")
+    sweep.run_sweep(spec(), directory, chunk_size=4, workers=1, criterion="Tsai-Wu")
+
+    model = laminate.LaminateModel()
+    for angle in (0, 30, -45, 90, 90, -45, 30, 0):
+        model.add_ply("T300/5208", 0.125, angle)
+    failure_indices, _ = criteria.failure_index(model.load_case_stresses([1e5, 5e4, 0, 0, 0, 0]), model.strengths(),
+                                                "Tsai-Wu")
+    assert rows(directory)[3][1] == pytest.approx(failure_indices.max(), rel=1e-6)
+
+    # The criterion is part of what a resumed run has to match
+    with pytest.raises(ValueError, match="different sweep"):
+        sweep.run_sweep(spec(), directory, chunk_size=4, workers=1)
+    with pytest.raises(ValueError, match="Unknown failure criterion"):
+        sweep.run_sweep(spec(), str(tmp_path / "other"), workers=1, criterion="Unknown")
+
+
+def test_resume_skips_finished_chunks(tmp_path):
+    directory = str(tmp_path / "sweep")
+    sweep.run_sweep(spec(), directory, chunk_size=2, workers=1)
+    expected = rows(directory)
+
+    os.remove(sweep.chunk_path(directory, 1))
+    done = []
+    sweep.run_sweep(spec(), directory, chunk_size=2, workers=1, progress=lambda count, total: done.append(count))
+    assert done[0] == 4
+    assert rows(directory) == expected
+
+
+def test_resume_refuses_changed_material_properties(tmp_path):
+    directory = str(tmp_path / "sweep")
+    mp.library.add({"Sweep/resume": PROPERTIES})
+    sweep.run_sweep(spec("Sweep/resume"), directory, chunk_size=2, workers=1)
+
+    mp.library.add({"Sweep/resume": dict(PROPERTIES, E_x=140)})
+    with pytest.raises(ValueError, match="material properties"):
+        sweep.run_sweep(spec("Sweep/resume"), directory, chunk_size=2, workers=1)
+
+    mp.library.add({"Sweep/resume": PROPERTIES})
+    sweep.run_sweep(spec("Sweep/resume"), directory, chunk_size=2, workers=1)
+
+
+def test_resume_refuses_a_different_spec(tmp_path):
+    directory = str(tmp_path / "sweep")
+    sweep.run_sweep(spec(), directory, chunk_size=2, workers=1)
+    with pytest.raises(ValueError, match="different sweep"):
+        sweep.run_sweep(spec(), directory, chunk_size=3, workers=1)
+    with pytest.raises(ValueError, match="different sweep"):
+        sweep.run_sweep(spec("AS/H3501"), directory, chunk_size=2, workers=1)
+
+
+def test_material_digest():
+    q, strengths = np.eye(3)[None], np.ones((1, 5))
+    assert sweep.material_digest(q, strengths) == sweep.material_digest(q.copy(), strengths.copy())
+    assert sweep.material_digest(q, strengths) != sweep.material_digest(2 * q, strengths)
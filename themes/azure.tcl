@@ -1,12 +1,20 @@
 # Copyright © 2021 rdbende <rdbende@gmail.com>
 
-source [file join [file dirname [info script]] theme light.tcl]
-source [file join [file dirname [info script]] theme dark.tcl]
+# Only the theme in use is built: a theme file is sourced, and its images decoded, on the first set_theme call
+# that needs it
+set ::azure_theme_dir [file join [file dirname [info script]] theme]
+
+proc load_theme {mode} {
+	if {[lsearch -exact [ttk::style theme names] "azure-$mode"] < 0} {
+		source [file join $::azure_theme_dir $mode.tcl]
+	}
+}
 
 option add *tearOff 0
 
 proc set_theme {mode} {
 	if {$mode == "dark"} {
+		load_theme dark
 		ttk::style theme use "azure-dark"
 
 		array set colors {
@@ -46,6 +54,7 @@ proc set_theme {mode} {
         option add *Menu.selectcolor $colors(-fg)
     
 	} elseif {$mode == "light"} {
+		load_theme light
 		ttk::style theme use "azure-light"
 
         array set colors {